@@ -0,0 +1,545 @@
+"""
+API Client: Pooled Keep-Alive Sessions
+======================================
+
+Shared HTTP client used by all five parts.
+
+Every host (jsonplaceholder, open-meteo, coinpaprika, ...) gets its own
+requests.Session with a tunable connection pool, so repeated calls reuse
+an open TCP+TLS connection instead of paying a new handshake each time.
+
+requests already asks for compressed bodies with every coding the
+installed decoders support (gzip and deflate always, br with brotli,
+zstd with backports.zstd); the header is set explicitly only so that
+configure(compression=False) can ask for identity bodies instead. How
+many bytes that saves is up to the server: the real APIs compress, and
+so does standin_server. request_profiles adds per-endpoint query
+defaults that shrink the payload itself.
+"""
+
+import copy
+import os
+import socket
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+import cassette
+import circuit_breaker
+import hedging
+import json_decode
+import json_stream
+import metrics
+import rate_limiter
+import request_profiles
+import response_cache
+import single_flight
+
+
+# ---------------- SETTINGS ----------------
+DEFAULT_POOL_SIZE = 10
+
+_settings = {
+    "pool_size": DEFAULT_POOL_SIZE,
+    "keep_alive": True,
+    "pool_block": False,
+    "compression": True,
+}
+
+_sessions = {}
+_lock = threading.Lock()
+
+_handshakes = {}
+_handshake_lock = threading.Lock()
+
+
+def configure(pool_size=None, keep_alive=None, pool_block=None,
+              compression=None):
+    """
+    Change pool settings. Existing sessions are closed and rebuilt lazily.
+
+    compression=False asks servers for uncompressed (identity) bodies.
+    """
+    with _lock:
+        if pool_size is not None:
+            if pool_size < 1:
+                raise ValueError("pool_size must be at least 1")
+            _settings["pool_size"] = pool_size
+        if keep_alive is not None:
+            _settings["keep_alive"] = keep_alive
+        if pool_block is not None:
+            _settings["pool_block"] = pool_block
+        if compression is not None:
+            _settings["compression"] = compression
+        _close_sessions()
+
+
+# ---------------- HOST REDIRECTS ----------------
+# "api.coinpaprika.com=http://127.0.0.1:8080,api.open-meteo.com=..."
+REDIRECTS_ENV = "API_REDIRECTS"
+
+_redirects = {}
+
+
+def redirect(host, base):
+    """
+    Send every request for `host` to `base` (scheme://host:port) instead,
+    e.g. redirect("api.coinpaprika.com", "http://127.0.0.1:8080") to point
+    the parts at the benchmark stand-in server. Paths and queries are kept.
+    """
+    parts = urlsplit(base)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"Redirect target must be scheme://host[:port], got {base!r}")
+    _redirects[host.lower()] = (parts.scheme, parts.netloc)
+
+
+def clear_redirects():
+    _redirects.clear()
+
+
+def resolve(url):
+    """The URL a request for `url` is actually sent to."""
+    if not _redirects:
+        return url
+    parts = urlsplit(url)
+    target = _redirects.get((parts.hostname or "").lower())
+    if target is None:
+        return url
+    return urlunsplit(target + (parts.path, parts.query, parts.fragment))
+
+
+def _redirects_from_env():
+    for pair in os.environ.get(REDIRECTS_ENV, "").split(","):
+        if pair.strip():
+            host, _, base = pair.partition("=")
+            redirect(host.strip(), base.strip())
+
+
+_redirects_from_env()
+
+
+# ---------------- COUNTING CONNECTIONS ----------------
+def _count_handshake(scheme, host, port):
+    key = (scheme, host, port)
+    with _handshake_lock:
+        _handshakes[key] = _handshakes.get(key, 0) + 1
+
+
+class _TimedConnection:
+    """
+    Report dns/connect/tls timings of every new connection to metrics.
+
+    The host is resolved here (instead of inside urllib3) so DNS time can
+    be told apart from the TCP connect. Every resolved address is tried
+    in turn, as urllib3 itself would.
+    """
+
+    def _new_conn(self):
+        started = time.perf_counter()
+        host = self._dns_host
+        try:
+            infos = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        except OSError:
+            addresses = [host]  # let urllib3 raise its usual error below
+        resolved = time.perf_counter()
+
+        # Like urllib3's create_connection: try every address in turn
+        try:
+            for i, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError):
+                    if i == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = host
+
+        connected = time.perf_counter()
+        self._connect_seconds = connected - started
+        metrics.connection_phase("dns", resolved - started)
+        metrics.connection_phase("connect", connected - resolved)
+        return sock
+
+    def connect(self):
+        _count_handshake(self._scheme, self.host, self.port)
+        self._connect_seconds = 0.0
+        started = time.perf_counter()
+        super().connect()
+        if self._scheme == "https":
+            tls = time.perf_counter() - started - self._connect_seconds
+            metrics.connection_phase("tls", tls)
+
+
+class _CountingHTTPConnection(_TimedConnection, HTTPConnection):
+    _scheme = "http"
+
+
+class _CountingHTTPSConnection(_TimedConnection, HTTPSConnection):
+    _scheme = "https"
+
+
+class _HedgeAwarePool:
+    """
+    A hedge briefly needs one connection more than pool_size allows (the
+    loser is still out). When it comes back to a full pool it is closed
+    here without urllib3's "pool is full" warning, and counted instead.
+    """
+
+    overflow_closed = 0
+
+    def _put_conn(self, conn):
+        pool = self.pool
+        if (conn is not None and pool is not None and pool.full()
+                and hedging.in_attempt()):
+            conn.close()
+            self.overflow_closed += 1
+            return
+        super()._put_conn(conn)
+
+
+class _CountingHTTPPool(_HedgeAwarePool, HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSPool(_HedgeAwarePool, HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connections count every (re)connect. While a
+    cassette is active, requests are recorded to it or replayed from it.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPPool,
+            "https": _CountingHTTPSPool,
+        }
+
+    def send(self, request, **kwargs):
+        tape = cassette.active()
+        if tape is None:
+            return super().send(request, **kwargs)
+        return cassette.send(tape, super().send, request, **kwargs)
+
+
+# ---------------- SESSIONS ----------------
+def host_key(url):
+    """Return the scheme://host[:port] part of a URL."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _new_session():
+    session = requests.Session()
+    adapter = PooledAdapter(
+        pool_connections=1,
+        pool_maxsize=_settings["pool_size"],
+        pool_block=_settings["pool_block"],
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    if not _settings["keep_alive"]:
+        session.headers["Connection"] = "close"
+
+    # The same value requests sends by default; spelled out so that
+    # compression=False can switch it off. urllib3 decodes these chunk by
+    # chunk as the body is read, so streamed responses stay streamed
+    session.headers["Accept-Encoding"] = (
+        DEFAULT_ACCEPT_ENCODING if _settings["compression"] else "identity"
+    )
+
+    return session
+
+
+def get_session(url):
+    """Return the shared Session for the host of `url`."""
+    key = host_key(url)
+    session = _sessions.get(key)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _new_session()
+            _sessions[key] = session
+        return session
+
+
+def get(url, params=None, **kwargs):
+    """
+    Drop-in replacement for requests.get that reuses pooled connections.
+
+    Calls wait for the host's rate limiter (if one is set) and fail fast
+    with circuit_breaker.CircuitOpenError while the host's circuit is open.
+    The endpoint's request_profiles defaults are added to `params`, and
+    GETs to a host with a hedging.Hedger are hedged (except streams).
+    """
+    hedger = None if kwargs.get("stream") else hedging.hedger_for(url)
+    params = request_profiles.apply(url, params)
+    if hedger is not None:
+        return hedger.call(lambda: _get(url, params, kwargs),
+                           discard=requests.Response.close)
+    return _get(url, params, kwargs)
+
+
+def _get(url, params, kwargs):
+    # Breakers and limiters belong to the API host, not a redirect target
+    breaker = circuit_breaker.breaker_for(url)
+    if breaker is not None:
+        breaker.before_call()
+
+    limiter = rate_limiter.limiter_for(url)
+    if limiter is not None:
+        limiter.acquire()
+
+    url = resolve(url)
+    timed = metrics.enabled()
+    if timed:
+        metrics.begin()
+        started = time.perf_counter()
+
+    try:
+        response = get_session(url).get(url, params=params, **kwargs)
+    except requests.RequestException as e:
+        if breaker is not None:
+            breaker.record_failure()
+        if timed:
+            metrics.record(metrics.host_of(url), metrics.take_phases(),
+                           total=time.perf_counter() - started,
+                           error=type(e).__name__)
+        raise
+
+    if timed:
+        _record_timings(url, response, started, kwargs.get("stream", False))
+
+    if breaker is not None:
+        if circuit_breaker.is_failure_status(response.status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+    return response
+
+
+def _record_timings(url, response, started, stream):
+    phases = metrics.take_phases()
+    # response.elapsed runs from sending the request to parsed headers,
+    # including any new connection
+    headers_at = response.elapsed.total_seconds()
+    connecting = sum(phases.values())
+    phases["ttfb"] = max(headers_at - connecting, 0.0)
+
+    if stream:
+        # the body is timed by whoever iterates it
+        metrics.record(metrics.host_of(url), phases, response.status_code)
+        return
+
+    total = time.perf_counter() - started
+    phases["body"] = max(total - headers_at, 0.0)
+    metrics.record(metrics.host_of(url), phases, response.status_code,
+                   len(response.content), total, wire=wire_bytes(response))
+
+
+def wire_bytes(response):
+    """Body bytes read off the socket so far, before decompression."""
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def get_json(url, params=None, cache=None, coalesce=True, fields=None,
+             revalidate=False, **kwargs):
+    """
+    GET a URL and return its parsed JSON body. Raises on HTTP errors.
+
+    With a response_cache.ResponseCache, fresh entries are returned (as a
+    copy the caller may change) without a request and stale ones are
+    revalidated with a conditional GET (revalidate=True does that for
+    fresh entries too).
+    Concurrent calls for the same URL, params, cache and options share one
+    request (each getting its own copy of the result) unless
+    coalesce=False. Pass `fields` (dotted paths or a json_decode.Projection)
+    to decode and keep only those parts of the body.
+    """
+    projection = json_decode.as_projection(fields)
+    key = response_cache.make_key(url, params)
+    if projection is not None:
+        key += "#fields=" + projection.signature
+    entry = None
+
+    if cache is not None:
+        entry, fresh = cache.get(key, revalidate=revalidate)
+        if fresh:
+            return entry.value()
+
+    def fetch():
+        return _fetch_json(url, params, cache, key, entry, projection, kwargs)
+
+    if not coalesce:
+        return fetch()
+    flight = single_flight.flight_key(key, cache, kwargs)
+    return single_flight.default_group.do(flight, fetch)
+
+
+def decode_body(response, projection=None):
+    """Decode a response body with the fastest available JSON backend."""
+    started = time.perf_counter()
+    try:
+        if projection is not None:
+            data = projection.decode(response.content)
+        else:
+            data = json_decode.loads(response.content)
+    except ValueError as e:
+        raise requests.exceptions.JSONDecodeError(str(e), response.text, 0)
+    metrics.observe(metrics.host_of(response.url), "decode",
+                    time.perf_counter() - started)
+    return data
+
+
+def _fetch_json(url, params, cache, key, entry, projection, kwargs):
+    if cache is None:
+        response = get(url, params=params, **kwargs)
+        response.raise_for_status()
+        return decode_body(response, projection)
+
+    kwargs = dict(kwargs)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry is not None:
+        headers.update(entry.validators())
+
+    try:
+        response = get(url, params=params, headers=headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            cache.revalidated(entry, response.headers)
+            return entry.value()
+
+        response.raise_for_status()
+        data = decode_body(response, projection)
+    except Exception:
+        cache.record_miss()
+        raise
+
+    # A projected entry is stored as its own (much smaller) JSON document
+    body = response.content if projection is None else json_decode.dumps(data)
+    cache.store(key, data, len(body), response.headers, body=body)
+    return data
+
+
+def stream_json_items(url, params=None, limit=None, chunk_size=16 * 1024,
+                      cache=None, **kwargs):
+    """
+    Yield the items of a JSON array response one at a time as they arrive.
+
+    With limit=N the connection is closed as soon as N items have been
+    read, so the rest of the body is never downloaded. A fully read
+    response goes back to the pool as usual.
+
+    With a response_cache.ResponseCache, a fresh entry for the URL is
+    served from memory. A miss streams, and the streamed body is neither
+    stored in the cache nor shared with concurrent callers (single_flight):
+    use get_json() when repeat reads matter more than the first item.
+    """
+    if limit is not None and limit <= 0:
+        return
+
+    if cache is not None:
+        entry, fresh = cache.get(response_cache.make_key(url, params))
+        if fresh and isinstance(entry.data, list):
+            yield from copy.deepcopy(entry.data[:limit])
+            return
+
+    response = get(url, params=params, stream=True, **kwargs)
+    started = time.perf_counter()
+    received = 0
+
+    def chunks():
+        nonlocal received
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            received += len(chunk)
+            yield chunk
+
+    try:
+        response.raise_for_status()
+        for count, item in enumerate(json_stream.iter_array_items(chunks()), 1):
+            yield item
+            if limit is not None and count >= limit:
+                break
+    finally:
+        # Closes the socket if the body was not fully read
+        response.close()
+        # Body time here includes parsing and the consumer's own work
+        host = metrics.host_of(response.url)
+        metrics.observe(host, "body", time.perf_counter() - started)
+        metrics.count_bytes(host, received, wire_bytes(response))
+
+
+def close_all():
+    """Close every pooled connection."""
+    with _lock:
+        _close_sessions()
+
+
+def _close_sessions():
+    for session in _sessions.values():
+        session.close()
+    _sessions.clear()
+    with _handshake_lock:
+        _handshakes.clear()
+
+
+# ---------------- POOL STATS ----------------
+def _host_pools(session):
+    pools = []
+    for adapter in session.adapters.values():
+        manager = adapter.poolmanager
+        for key in manager.pools.keys():
+            pool = manager.pools.get(key)
+            if pool is not None and pool not in pools:
+                pools.append(pool)
+    return pools
+
+
+def pool_stats():
+    """
+    Per-host connection reuse counters.
+
+    - requests   : requests sent through the pool
+    - handshakes : connections opened (TCP, plus TLS for https)
+    - pool_hits  : requests that reused an idle keep-alive connection
+    - pool_misses: requests that had to open a new connection
+    - overflow_closed: hedged connections closed because the pool was full
+    """
+    stats = {}
+    with _lock:
+        items = list(_sessions.items())
+
+    for key, session in items:
+        sent = opened = overflow = 0
+        for pool in _host_pools(session):
+            sent += pool.num_requests
+            opened += _handshakes.get((pool.scheme, pool.host, pool.port), 0)
+            overflow += getattr(pool, "overflow_closed", 0)
+
+        stats[key] = {
+            "requests": sent,
+            "handshakes": opened,
+            "pool_hits": max(sent - opened, 0),
+            "pool_misses": opened,
+            "overflow_closed": overflow,
+        }
+    return stats
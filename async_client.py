@@ -0,0 +1,330 @@
+"""
+Async Client: Shared aiohttp Pool
+=================================
+
+asyncio counterpart of api_client for code running inside an event loop.
+
+One aiohttp ClientSession per event loop holds a single connection pool,
+so thousands of concurrent lookups share at most `limit` connections and
+queue on the pool instead of opening a socket each. Nothing in here
+blocks the loop: waits use asyncio.sleep and I/O is awaited.
+
+Responses share response_cache entries with the blocking client, and
+requests get the same request_profiles defaults and hedging. aiohttp asks for every
+compression coding it can decode by default (compression=False turns
+that off) and inflates bodies as they arrive.
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+
+import aiohttp
+
+import api_client
+import cassette
+import circuit_breaker
+import hedging
+import json_decode
+import metrics
+import rate_limiter
+import request_profiles
+import response_cache
+import single_flight
+
+
+# ---------------- SETTINGS ----------------
+DEFAULT_LIMIT = 100
+DEFAULT_LIMIT_PER_HOST = 20
+DEFAULT_KEEPALIVE = 30
+
+# Everything a failed lookup can raise (bad JSON raises ValueError)
+REQUEST_ERRORS = (
+    aiohttp.ClientError,
+    asyncio.TimeoutError,
+    ValueError,
+    circuit_breaker.CircuitOpenError,
+)
+
+_settings = {
+    "limit": DEFAULT_LIMIT,
+    "limit_per_host": DEFAULT_LIMIT_PER_HOST,
+    "keepalive_timeout": DEFAULT_KEEPALIVE,
+    "compression": True,
+}
+
+# event loop -> (its ClientSession, the task closing it at loop shutdown)
+_sessions = weakref.WeakKeyDictionary()
+_sessions_lock = threading.Lock()
+
+
+def configure(limit=None, limit_per_host=None, keepalive_timeout=None,
+              compression=None):
+    """
+    Change pool settings for sessions created after this call.
+
+    compression=False asks servers for uncompressed (identity) bodies.
+    """
+    if limit is not None:
+        _settings["limit"] = limit
+    if limit_per_host is not None:
+        _settings["limit_per_host"] = limit_per_host
+    if keepalive_timeout is not None:
+        _settings["keepalive_timeout"] = keepalive_timeout
+    if compression is not None:
+        _settings["compression"] = compression
+
+
+# ---------------- TIMINGS ----------------
+# _fetch_json passes a dict as trace_request_ctx (None while metrics are
+# off) and these callbacks fill in the connection phases. aiohttp opens
+# TLS inside the connection step, so for https "connect" includes it.
+async def _on_dns_start(session, ctx, params):
+    ctx.dns_started = time.perf_counter()
+
+
+async def _on_dns_end(session, ctx, params):
+    phases = ctx.trace_request_ctx
+    if phases is not None:
+        phases["dns"] = phases.get("dns", 0.0) + time.perf_counter() - ctx.dns_started
+
+
+async def _on_connect_start(session, ctx, params):
+    ctx.connect_started = time.perf_counter()
+
+
+async def _on_connect_end(session, ctx, params):
+    phases = ctx.trace_request_ctx
+    if phases is not None:
+        elapsed = time.perf_counter() - ctx.connect_started
+        phases["connect"] = max(elapsed - phases.get("dns", 0.0), 0.0)
+
+
+def _trace_config():
+    config = aiohttp.TraceConfig()
+    config.on_dns_resolvehost_start.append(_on_dns_start)
+    config.on_dns_resolvehost_end.append(_on_dns_end)
+    config.on_connection_create_start.append(_on_connect_start)
+    config.on_connection_create_end.append(_on_connect_end)
+    return config
+
+
+# ---------------- SESSION ----------------
+def get_session():
+    """Return the ClientSession of the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _sessions_lock:
+        found = _sessions.get(loop)
+        if found is not None and not found[0].closed:
+            return found[0]
+
+        # Sessions of loops that are gone can no longer be used or closed;
+        # sessions of other live loops are left alone
+        for old in [old for old in _sessions if old.is_closed()]:
+            del _sessions[old]
+
+        connector = aiohttp.TCPConnector(
+            limit=_settings["limit"],
+            limit_per_host=_settings["limit_per_host"],
+            keepalive_timeout=_settings["keepalive_timeout"],
+        )
+        # Without an explicit header aiohttp offers gzip, deflate and any
+        # of br/zstd it has a decoder for
+        headers = None
+        if not _settings["compression"]:
+            headers = {"Accept-Encoding": "identity"}
+        session = aiohttp.ClientSession(connector=connector, headers=headers,
+                                        trace_configs=[_trace_config()])
+        closer = loop.create_task(_close_at_shutdown(session))
+        _sessions[loop] = (session, closer)
+        return session
+
+
+async def _close_at_shutdown(session):
+    # asyncio.run() cancels leftover tasks before it closes the loop, so a
+    # session nobody closed explicitly still closes on its own loop
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await session.close()
+
+
+async def close():
+    """Close this event loop's session (call before the loop shuts down)."""
+    with _sessions_lock:
+        found = _sessions.pop(asyncio.get_running_loop(), None)
+    if found is None:
+        return
+    session, closer = found
+    closer.cancel()
+    if not session.closed:
+        await session.close()
+
+
+def _query(params):
+    # aiohttp only accepts str/int/float values; mirror how requests
+    # encodes booleans and drops None.
+    if not params:
+        return None
+    items = params.items() if hasattr(params, "items") else params
+    query = []
+    for name, value in items:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        query.extend((name, str(v)) for v in values if v is not None)
+    return query
+
+
+# ---------------- REQUESTS ----------------
+async def get_json(url, params=None, timeout=10, cache=None, headers=None,
+                   coalesce=True, fields=None):
+    """
+    GET a URL and return its parsed JSON body. Raises on HTTP errors.
+
+    Same caching, coalescing and `fields` projection rules as
+    api_client.get_json, including conditional GETs.
+    """
+    projection = json_decode.as_projection(fields)
+    key = response_cache.make_key(url, params)
+    if projection is not None:
+        key += "#fields=" + projection.signature
+    entry = None
+
+    if cache is not None:
+        entry, fresh = await cache.get_async(key)
+        if fresh:
+            return entry.value()
+
+    def fetch():
+        return _fetch_json(url, params, timeout, cache, headers, key, entry,
+                           projection)
+
+    if not coalesce:
+        return await fetch()
+    flight = single_flight.flight_key(key, cache,
+                                      {"timeout": timeout, "headers": headers})
+    return await single_flight.default_async_group.do(flight, fetch)
+
+
+async def get_bytes(url, params=None, timeout=10, headers=None):
+    """
+    GET a URL and return the raw body bytes. Raises on HTTP errors.
+
+    Nothing is decoded or cached, e.g. for worker_pool, which decodes in
+    another process.
+    """
+    return await _fetch_json(url, params, timeout, None, headers, None, None,
+                             None, raw=True)
+
+
+async def _fetch_json(url, params, timeout, cache, headers, key, entry,
+                      projection, raw=False):
+    def attempt():
+        return _fetch_once(url, params, timeout, cache, headers, key, entry,
+                           projection, raw)
+
+    hedger = hedging.hedger_for(url)
+    if hedger is None:
+        return await attempt()
+    return await hedger.call_async(attempt)
+
+
+async def _fetch_once(url, params, timeout, cache, headers, key, entry,
+                      projection, raw=False):
+    params = request_profiles.apply(url, params)
+    headers = dict(headers or {})
+    if entry is not None:
+        headers.update(entry.validators())
+
+    # Breakers and limiters belong to the API host, not a redirect target
+    breaker = circuit_breaker.breaker_for(url)
+    if breaker is not None:
+        try:
+            breaker.before_call()
+        except circuit_breaker.CircuitOpenError:
+            if cache is not None:
+                cache.record_miss()
+            raise
+
+    limiter = rate_limiter.limiter_for(url)
+    if limiter is not None:
+        await limiter.acquire_async()
+
+    url = api_client.resolve(url)
+
+    session = get_session()
+    status = None
+    timings = {} if metrics.enabled() else None
+    size = None
+    wire = None
+    error = None
+    started = time.perf_counter()
+    options = dict(
+        params=_query(params),
+        headers=headers,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        trace_request_ctx=timings,
+    )
+    tape = cassette.active()
+    try:
+        if tape is None:
+            request = session.get(url, **options)
+        else:
+            request = cassette.aiohttp_get(tape, session, url, **options)
+        async with request as response:
+            status = response.status
+            headers_at = time.perf_counter()
+            if timings is not None:
+                connecting = sum(timings.values())
+                timings["ttfb"] = max(headers_at - started - connecting, 0.0)
+
+            if breaker is not None:
+                if circuit_breaker.is_failure_status(status):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+
+            if response.status == 304 and entry is not None:
+                await cache.revalidated_async(entry, response.headers)
+                return entry.value()
+
+            response.raise_for_status()
+            body = await response.read()
+            size = len(body)
+            # before decompression (older aiohttp only counts decoded bytes)
+            wire = getattr(response.content, "total_raw_bytes", None)
+            if raw:
+                if timings is not None:
+                    timings["body"] = time.perf_counter() - headers_at
+                return body
+            decode_started = time.perf_counter()
+            if projection is not None:
+                data = projection.decode(body)
+                body = json_decode.dumps(data)
+            else:
+                data = json_decode.loads(body)
+            if timings is not None:
+                timings["body"] = decode_started - headers_at
+                timings["decode"] = time.perf_counter() - decode_started
+    except asyncio.CancelledError:
+        error = "CancelledError"
+        if breaker is not None and status is None:
+            breaker.record_cancelled()
+        raise
+    except Exception as e:
+        if status is None:
+            error = type(e).__name__  # no response at all
+        if breaker is not None and status is None:
+            breaker.record_failure()
+        if cache is not None:
+            cache.record_miss()
+        raise
+    finally:
+        if timings is not None:
+            metrics.record(metrics.host_of(url), timings, status, size,
+                           time.perf_counter() - started, error, wire)
+
+    if cache is not None:
+        await cache.store_async(key, data, len(body), response.headers,
+                                body=body)
+    return data
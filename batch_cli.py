@@ -0,0 +1,363 @@
+"""
+Batch CLI: Scripted Lookups with NDJSON Output
+==============================================
+
+Run many part3/part5 lookups without the interactive menus:
+
+    python batch_cli.py queries.txt
+    cat queries.txt | python batch_cli.py --workers 16 --ordered > out.ndjson
+
+One query per line, as "<kind> <value>" (or a JSON object with "kind"
+and "value"); blank lines and # comments are skipped:
+
+    user 3
+    posts 1
+    todos true
+    coin btc-bitcoin
+    city delhi
+    city 48.85, 2.35
+
+Queries run concurrently through the same fetch functions the menus use.
+Each result is written as one JSON line as soon as it is ready, in the
+repo's {"success": ..., "data"/"error": ...} shape. Only a bounded window
+of queries is read ahead, so memory stays flat for any input size. A
+throughput and latency summary goes to stderr at the end.
+
+With --processes N the fetches run on one asyncio loop instead, and
+decoding, validation and JSON encoding run in N worker processes
+(worker_pool), so CPU-heavy runs are not limited to one core.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import async_client
+import histogram
+import json_decode
+import part3_user_input as part3
+import part5_real_api as part5
+import weather_batch
+import worker_pool
+
+
+DEFAULT_WORKERS = 8
+
+# City lookups running at the same time share multi-location requests
+_weather_batcher = weather_batch.WeatherBatcher()
+
+
+# ---------------- QUERY HANDLERS ----------------
+def _user(value):
+    return part3.fetch_user(int(value))
+
+
+def _posts(value):
+    return list(part3.iter_posts(int(value)))
+
+
+def _todos(value):
+    status = str(value).strip().lower()
+    if status not in ("true", "false"):
+        raise ValueError("todo status must be true or false")
+    return list(part3.iter_todos(status))
+
+
+def _coin(value):
+    return part5.fetch_crypto_price(str(value), fields=part5.TICKER_FIELDS)
+
+
+def _city(value):
+    return part5.fetch_weather(str(value), batcher=_weather_batcher)
+
+
+HANDLERS = {
+    "user": _user,
+    "posts": _posts,
+    "todos": _todos,
+    "coin": _coin,
+    "crypto": _coin,
+    "city": _city,
+    "weather": _city,
+}
+
+
+def parse_query(line):
+    """Return (kind, value) for a query line, or None for blanks/comments."""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    if line.startswith("{"):
+        query = json.loads(line)
+        kind, value = query.get("kind"), query.get("value")
+    else:
+        kind, _, value = line.partition(" ")
+        value = value.strip()
+
+    kind = str(kind).lower()
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown query kind {kind!r}")
+    if value in (None, ""):
+        raise ValueError(f"Missing value for {kind!r}")
+    return kind, value
+
+
+def run_query(number, line):
+    """Run one query line; always returns a result dict, never raises."""
+    started = time.perf_counter()
+    result = {"line": number}
+    try:
+        query = parse_query(line)
+        if query is None:
+            return None
+        result["kind"], result["query"] = query
+        result["data"] = HANDLERS[query[0]](query[1])
+        result["success"] = True
+    except Exception as e:
+        result["success"] = False
+        result["error"] = str(e) or type(e).__name__
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+# ---------------- RUNNER ----------------
+class Summary:
+    def __init__(self):
+        self.ok = 0
+        self.failed = 0
+        self.latency = histogram.Histogram()
+        self.started = time.perf_counter()
+
+    def add(self, result):
+        if result["success"]:
+            self.ok += 1
+        else:
+            self.failed += 1
+        self.latency.record(result["elapsed_ms"] / 1000)
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        total = self.ok + self.failed
+        lines = [
+            f"queries     : {total} ({self.ok} ok, {self.failed} failed)",
+            f"wall time   : {elapsed:.3f}s",
+            f"throughput  : {total / elapsed if elapsed else 0:.1f} queries/s",
+        ]
+        if total:
+            stats = self.latency.summary()
+            lines.append("latency ms  : " + ", ".join(
+                f"{name} {stats[name] * 1000:.1f}"
+                for name in ("p50", "p95", "p99", "max")
+            ))
+        return "\n".join(lines)
+
+
+def run(lines, out, workers=DEFAULT_WORKERS, ordered=False, window=None):
+    """
+    Run query lines concurrently and write one NDJSON line per result to
+    `out` (a binary stream). At most `window` queries are in flight or
+    waiting to be written. Returns the Summary.
+    """
+    window = window or workers * 4
+    summary = Summary()
+    pending = deque()
+
+    def emit(futures):
+        written = False
+        for future in futures:
+            result = future.result()
+            if result is not None:
+                summary.add(result)
+                out.write(json_decode.dumps(result) + b"\n")
+                written = True
+        if written:
+            out.flush()
+
+    def drain(block):
+        """Write finished results; with block=True wait for at least one."""
+        if ordered:
+            done = []
+            while pending and (block or pending[0].done()):
+                done.append(pending.popleft())
+                block = False
+        else:
+            done, _ = wait(pending, timeout=None if block else 0,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.remove(future)
+        emit(done)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for number, line in enumerate(lines, 1):
+            pending.append(pool.submit(run_query, number, line))
+            drain(block=len(pending) >= window)
+        while pending:
+            drain(block=True)
+
+    return summary
+
+
+# ---------------- PROCESS MODE ----------------
+# kind -> value -> (url, params, models class name, fields) for the
+# worker's "record" task; same requests and data as the handlers above
+def _user_request(value):
+    return f"{part3.BASE_URL}/users/{int(value)}", None, "User", None
+
+
+def _posts_request(value):
+    return f"{part3.BASE_URL}/posts", {"userId": int(value)}, "Post", None
+
+
+def _todos_request(value):
+    status = str(value).strip().lower()
+    if status not in ("true", "false"):
+        raise ValueError("todo status must be true or false")
+    return f"{part3.BASE_URL}/todos", {"completed": status}, "Todo", None
+
+
+def _coin_request(value):
+    return (part5.ticker_url(str(value)), None, "CoinTicker",
+            part5.TICKER_FIELDS.paths)
+
+
+def _city_request(value):
+    return (part5.WEATHER_URL, part5.weather_params(str(value)),
+            "CurrentWeather", None)
+
+
+REQUESTS = {
+    "user": _user_request,
+    "posts": _posts_request,
+    "todos": _todos_request,
+    "coin": _coin_request,
+    "crypto": _coin_request,
+    "city": _city_request,
+    "weather": _city_request,
+}
+
+
+def _encode(result, data=None):
+    """One NDJSON line; `data` is JSON the worker has already encoded."""
+    line = json_decode.dumps(result)
+    if data is None:
+        return line + b"\n"
+    return line[:-1] + b',"data":' + data + b"}\n"
+
+
+async def run_query_async(pool, number, line):
+    """Like run_query, but returns (result, encoded data or None)."""
+    started = time.perf_counter()
+    result = {"line": number}
+    data = None
+    try:
+        query = parse_query(line)
+        if query is None:
+            return None, None
+        result["kind"], result["query"] = query
+        url, params, record, fields = REQUESTS[query[0]](query[1])
+        data = await pool.fetch(url, "record", (record, fields), params=params)
+        result["success"] = True
+    except Exception as e:
+        result["success"] = False
+        result["error"] = str(e) or type(e).__name__
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return result, data
+
+
+async def _run_async(lines, out, processes, ordered, window):
+    summary = Summary()
+    pending = deque()
+
+    def emit(tasks):
+        written = False
+        for task in tasks:
+            result, data = task.result()
+            if result is not None:
+                summary.add(result)
+                out.write(_encode(result, data))
+                written = True
+        if written:
+            out.flush()
+
+    async def drain(block):
+        if ordered:
+            done = []
+            while pending and (block or pending[0].done()):
+                if not pending[0].done():
+                    await asyncio.wait([pending[0]])
+                done.append(pending.popleft())
+                block = False
+        else:
+            done, _ = await asyncio.wait(pending, timeout=None if block else 0,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.remove(task)
+        emit(done)
+
+    try:
+        async with worker_pool.WorkerPool(processes=processes) as pool:
+            for number, line in enumerate(lines, 1):
+                pending.append(asyncio.ensure_future(
+                    run_query_async(pool, number, line)))
+                await drain(block=len(pending) >= window)
+            while pending:
+                await drain(block=True)
+    finally:
+        await async_client.close()
+    return summary
+
+
+def run_processes(lines, out, processes, concurrency=DEFAULT_WORKERS,
+                  ordered=False, window=None):
+    """
+    run() with fetches on an asyncio loop (`concurrency` queries in
+    flight) and decoding in `processes` worker processes.
+    """
+    return asyncio.run(_run_async(lines, out, processes, ordered,
+                                  window or concurrency))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("file", nargs="?", default="-",
+                        help="query file (default: stdin)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="threads, or queries in flight with --processes")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="decode in this many worker processes")
+    parser.add_argument("--ordered", action="store_true",
+                        help="write results in input order")
+    parser.add_argument("--quiet", action="store_true",
+                        help="no summary on stderr")
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.processes < 0:
+        parser.error("--processes cannot be negative")
+
+    source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+    try:
+        if args.processes:
+            summary = run_processes(source, sys.stdout.buffer, args.processes,
+                                    concurrency=args.workers,
+                                    ordered=args.ordered)
+        else:
+            summary = run(source, sys.stdout.buffer, workers=args.workers,
+                          ordered=args.ordered)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+    if not args.quiet:
+        print(summary.report(), file=sys.stderr)
+    return 0 if summary.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,460 @@
+"""
+Bench: Request-Path Benchmarks Against a Local Stand-In
+=======================================================
+
+Measures the request paths of all five parts without touching the public
+APIs. A standin_server.py process is started with the chosen latency,
+error rate and payload padding, and every API host is redirected to it.
+Each scenario then runs at each concurrency level.
+
+    python bench.py
+    python bench.py -s get_weather get_crypto_price -c 1 16 -n 500 --latency 0.02
+    python bench.py --tls --error-rate 0.02
+    python bench.py --no-compression     # ask for identity bodies
+    python bench.py --stall-rate 0.03 --stall 2 --hedge
+    python bench.py --save bench_baseline.json
+    python bench.py --compare bench_baseline.json
+
+Reported per scenario and concurrency:
+- throughput and p50/p95/p99 latency
+- client CPU per request (the server runs in its own process)
+- allocations per request (tracemalloc peak, measured in a separate
+  sequential pass so tracing does not skew the timings)
+- how many requests actually reached the server, and the response bytes
+  it sent per timed call (after compression)
+
+--hedge turns on hedging for every API host and prints, per host, how
+often hedges fired and won and the p99 with and without them.
+
+--save writes the results as a JSON baseline. --compare checks a run
+against one and exits non-zero when a metric is worse than the tolerance.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import api_client
+import circuit_breaker
+import hedging
+import histogram
+import json_decode
+import part3_user_input as part3
+import part4_error_handling as part4
+import part5_real_api as part5
+import response_cache
+import standin_server
+
+
+JSONPLACEHOLDER = "https://jsonplaceholder.typicode.com"
+CITY_NAMES = list(part5.CITIES)
+COIN_NAMES = list(part5.CRYPTO_IDS)
+
+DEFAULT_CONCURRENCY = (1, 8, 32)
+DEFAULT_REQUESTS = 200
+DEFAULT_TOLERANCE = 0.10
+
+
+# ---------------- SCENARIOS ----------------
+# Each takes a request number and returns something truthy on success
+def _part1_get(i):
+    response = api_client.get(f"{JSONPLACEHOLDER}/posts/{i % 100 + 1}", timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+
+def _part2_stream(i):
+    url = f"{JSONPLACEHOLDER}/posts"
+    items = api_client.stream_json_items(url, params={"userId": i % 10 + 1},
+                                         timeout=10)
+    return sum(1 for _ in items)
+
+
+def _safe_api_request(i):
+    return part4.safe_api_request(f"{JSONPLACEHOLDER}/users/{i % 10 + 1}")["success"]
+
+
+def _fetch_user(i):
+    return part3.fetch_user(i % 10 + 1)
+
+
+def _fetch_posts(i):
+    return part3.fetch_posts(i % 10 + 1)
+
+
+def _fetch_todos(i):
+    return part3.fetch_todos("true" if i % 2 else "false")
+
+
+def _get_weather(i):
+    return part5.get_weather(CITY_NAMES[i % len(CITY_NAMES)]) is not None
+
+
+def _get_crypto_price(i):
+    coin = COIN_NAMES[i % len(COIN_NAMES)]
+    return part5.get_crypto_price(coin, fields=part5.TICKER_FIELDS) is not None
+
+
+SCENARIOS = {
+    "part1_get": _part1_get,
+    "part2_stream": _part2_stream,
+    "safe_api_request": _safe_api_request,
+    "fetch_user": _fetch_user,
+    "fetch_posts": _fetch_posts,
+    "fetch_todos": _fetch_todos,
+    "get_weather": _get_weather,
+    "get_crypto_price": _get_crypto_price,
+}
+
+
+# ---------------- STAND-IN SERVER ----------------
+def make_certificate(directory):
+    """Self-signed certificate for 127.0.0.1 (needs the openssl CLI)."""
+    if shutil.which("openssl") is None:
+        raise RuntimeError("--tls needs the openssl command line tool")
+    cert = os.path.join(directory, "standin.pem")
+    key = os.path.join(directory, "standin.key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+         "-days", "1", "-subj", "/CN=127.0.0.1",
+         "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+@contextlib.contextmanager
+def standin(latency=0.0, jitter=0.0, error_rate=0.0, padding=0, tls=False,
+            stall_rate=0.0, stall=1.0):
+    """Run standin_server.py in a subprocess and redirect every API host to it."""
+    with tempfile.TemporaryDirectory() as tmp:
+        command = [sys.executable, standin_server.__file__, "--port", "0",
+                   "--latency", str(latency), "--jitter", str(jitter),
+                   "--error-rate", str(error_rate), "--padding", str(padding),
+                   "--stall-rate", str(stall_rate), "--stall", str(stall)]
+        if tls:
+            cert, key = make_certificate(tmp)
+            command += ["--certfile", cert, "--keyfile", key]
+            os.environ["REQUESTS_CA_BUNDLE"] = cert
+
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        try:
+            url = process.stdout.readline().split()[-1]
+            for host in standin_server.HOSTS:
+                api_client.redirect(host, url)
+            yield url
+        finally:
+            process.terminate()
+            process.wait()
+            api_client.clear_redirects()
+            api_client.close_all()
+            if tls:
+                os.environ.pop("REQUESTS_CA_BUNDLE", None)
+
+
+def server_stats(url):
+    """The stand-in's counters so far (requests, errors, bytes)."""
+    context = None
+    if url.startswith("https"):
+        context = ssl.create_default_context(cafile=os.environ["REQUESTS_CA_BUNDLE"])
+    with urllib.request.urlopen(f"{url}/__stats", context=context) as response:
+        return json.load(response)
+
+
+@contextlib.contextmanager
+def quiet(cache_enabled):
+    """Silence the parts' prints/logging; drop the response cache unless kept."""
+    cache = response_cache.default_cache
+    max_bytes = cache.max_bytes
+    if not cache_enabled:
+        cache.clear()
+        cache.max_bytes = 0  # nothing fits, so nothing is stored
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+        cache.max_bytes = max_bytes
+        cache.clear()
+
+
+# ---------------- MEASUREMENT ----------------
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def measure(call, requests, concurrency, served=None, warmup=10):
+    """
+    Time `requests` calls at the given concurrency. `served` is a callable
+    returning the server's counters, to report how many calls actually
+    reached it and how many bytes they cost.
+    """
+    latency = histogram.Histogram()
+
+    def attempt(i):
+        try:
+            return bool(call(i))
+        except Exception:
+            return False
+
+    def timed(i):
+        started = time.perf_counter()
+        ok = attempt(i)
+        latency.record(time.perf_counter() - started)
+        return ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(attempt, range(warmup)))  # open connections, warm caches
+        served_before = served() if served else None
+
+        cpu_started = time.process_time()
+        started = time.perf_counter()
+        results = list(pool.map(timed, range(requests)))
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+
+    metrics = {
+        "requests": requests,
+        "errors": results.count(False),
+        "throughput": round(requests / wall, 1),
+        "p50_ms": _ms(latency.percentile(50)),
+        "p95_ms": _ms(latency.percentile(95)),
+        "p99_ms": _ms(latency.percentile(99)),
+        "mean_ms": _ms(latency.mean()),
+        "cpu_ms_per_request": _ms(cpu / requests),
+    }
+    if served:
+        served_after = served()
+        metrics["server_requests"] = (served_after["requests"]
+                                      - served_before["requests"])
+        metrics["wire_kb_per_request"] = round(
+            (served_after["bytes"] - served_before["bytes"]) / requests / 1024, 3)
+    return metrics
+
+
+def measure_allocations(call, samples):
+    """Average tracemalloc peak and retained bytes per call, in KiB."""
+    tracemalloc.start()
+    try:
+        start_current, _ = tracemalloc.get_traced_memory()
+        peaks = 0
+        for i in range(samples):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            try:
+                call(i)
+            except Exception:
+                pass  # failures allocate too; the timed pass counts them
+            _, peak = tracemalloc.get_traced_memory()
+            peaks += peak - before
+        end_current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "alloc_peak_kb": round(peaks / samples / 1024, 2),
+        "retained_kb": round((end_current - start_current) / samples / 1024, 2),
+    }
+
+
+def run(scenarios, concurrency, requests, server_url, cache_enabled=False,
+        alloc_samples=20):
+    results = {}
+    for name in scenarios:
+        call = SCENARIOS[name]
+        for level in concurrency:
+            with quiet(cache_enabled):
+                metrics = measure(call, requests, level,
+                                  served=lambda: server_stats(server_url))
+                metrics.update(measure_allocations(call, alloc_samples))
+            results[f"{name}@{level}"] = metrics
+            print(format_row(f"{name}@{level}", metrics), flush=True)
+    return results
+
+
+# ---------------- REPORTING ----------------
+_COLUMNS = (
+    ("run", 24, None),
+    ("req/s", 9, "throughput"),
+    ("p50 ms", 8, "p50_ms"),
+    ("p95 ms", 8, "p95_ms"),
+    ("p99 ms", 8, "p99_ms"),
+    ("cpu ms", 7, "cpu_ms_per_request"),
+    ("alloc KB", 9, "alloc_peak_kb"),
+    ("wire KB", 8, "wire_kb_per_request"),
+    ("errors", 7, "errors"),
+    ("served", 7, "server_requests"),
+)
+
+
+def format_header():
+    return " ".join(title.rjust(width) if key else title.ljust(width)
+                    for title, width, key in _COLUMNS)
+
+
+def format_row(label, metrics):
+    cells = []
+    for _, width, key in _COLUMNS:
+        if key is None:
+            cells.append(label.ljust(width))
+        else:
+            cells.append(f"{metrics[key]:>{width}}")
+    return " ".join(cells)
+
+
+def format_hedges(host, counts):
+    return (f"{host}: {counts['hedged']} hedged of {counts['calls']} "
+            f"({counts['hedge_rate']:.1%}), {counts['hedge_wins']} won, "
+            f"{counts['budget_denied']} over budget; p99 "
+            f"{counts['p99_unhedged_ms']} -> {counts['p99_ms']} ms "
+            f"({counts['unhedged_running']} first requests still running)")
+
+
+# Lower is better unless listed here
+_HIGHER_IS_BETTER = {"throughput"}
+COMPARED = ("throughput", "p50_ms", "p95_ms", "p99_ms", "cpu_ms_per_request",
+            "alloc_peak_kb", "wire_kb_per_request")
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Print changes against a baseline; return the list of regressions."""
+    regressions = []
+    for run_name, metrics in results.items():
+        old = baseline.get("results", {}).get(run_name)
+        if old is None:
+            print(f"{run_name}: not in baseline")
+            continue
+
+        changes = []
+        for key in COMPARED:
+            if not old.get(key):
+                continue
+            change = (metrics[key] - old[key]) / old[key]
+            worse = -change if key in _HIGHER_IS_BETTER else change
+            flag = ""
+            if worse > tolerance:
+                flag = " !"
+                regressions.append((run_name, key, old[key], metrics[key]))
+            changes.append(f"{key} {change:+.0%}{flag}")
+        print(f"{run_name}: " + ", ".join(changes))
+    return regressions
+
+
+def metadata(args):
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "json_backend": json_decode.BACKEND,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {
+            "requests": args.requests,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "padding": args.padding,
+            "stall_rate": args.stall_rate,
+            "stall": args.stall,
+            "hedge": args.hedge,
+            "tls": args.tls,
+            "cache": args.cache,
+            "compression": not args.no_compression,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the request paths "
+                                                 "against a local stand-in server")
+    parser.add_argument("-s", "--scenarios", nargs="+", choices=list(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument("-c", "--concurrency", nargs="+", type=int,
+                        default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("-n", "--requests", type=int, default=DEFAULT_REQUESTS,
+                        help="timed requests per scenario and concurrency")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--padding", type=int, default=0)
+    parser.add_argument("--stall-rate", type=float, default=0.0,
+                        help="share of requests the server holds for --stall seconds")
+    parser.add_argument("--stall", type=float, default=1.0)
+    parser.add_argument("--hedge", action="store_true",
+                        help="hedge slow requests to every API host")
+    parser.add_argument("--tls", action="store_true",
+                        help="serve over HTTPS with a throwaway certificate")
+    parser.add_argument("--cache", action="store_true",
+                        help="keep the response cache on (default: every call "
+                             "reaches the server)")
+    parser.add_argument("--no-compression", action="store_true",
+                        help="ask for uncompressed bodies")
+    parser.add_argument("--save", metavar="FILE", help="write results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare with a baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    if min(args.concurrency) < 1 or args.requests < 1:
+        parser.error("concurrency and requests must be at least 1")
+
+    # Measure the raw request paths: no fail-fast, enough pooled connections
+    circuit_breaker.configure(enabled=False)
+    # hedges add up to one more connection per caller
+    pool_size = max(args.concurrency) * (2 if args.hedge else 1)
+    api_client.configure(pool_size=pool_size,
+                         compression=not args.no_compression)
+
+    if args.hedge:
+        for host in standin_server.HOSTS:
+            hedging.set_hedge(host)
+
+    with standin(args.latency, args.jitter, args.error_rate, args.padding,
+                 args.tls, args.stall_rate, args.stall) as url:
+        print(f"Stand-in server: {url}\n")
+        print(format_header())
+        results = run(args.scenarios, args.concurrency, args.requests, url,
+                      cache_enabled=args.cache)
+        if args.hedge:
+            # Stalled first requests that lost count once they end
+            hedging.settle(timeout=args.stall + 10)
+
+    if args.hedge:
+        print()
+        for host, counts in sorted(hedging.stats().items()):
+            if counts["calls"]:
+                print(format_hedges(host, counts))
+
+    report = {"meta": metadata(args), "results": results}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (tolerance {args.tolerance:.0%}):")
+        if baseline.get("meta", {}).get("settings") != report["meta"]["settings"]:
+            print("note: the baseline was recorded with different settings")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
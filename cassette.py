@@ -0,0 +1,490 @@
+"""
+Cassette: Record and Replay HTTP Traffic
+========================================
+
+Captures every request made through api_client and async_client, with
+its response, to one compact file. It can then serve those responses
+back without touching the network. Offline runs and load tests become
+repeatable: same bodies, same errors (timeouts included), and optionally
+the same timings.
+
+    API_CASSETTE=demo.cassette API_CASSETTE_MODE=record python part4_error_handling.py
+    API_CASSETTE=demo.cassette python part4_error_handling.py          # replays
+    API_CASSETTE=demo.cassette API_CASSETTE_SPEED=1 python part1_basic_request.py
+
+or in code:
+
+    with cassette.use("demo.cassette", mode="record"):
+        part5.get_weather("delhi")
+
+Modes: "record" (always hit the network and write a new cassette),
+"replay" (never hit the network; a request that was not recorded fails
+with a connection error) and "auto" (replay if the file exists, record
+otherwise). API_CASSETTE_SPEED scales recorded response times on replay:
+0 (the default) answers at once, 1 keeps the recorded timings and 2
+doubles them.
+
+Recordings are keyed by method and the URL actually sent (after
+API_REDIRECTS, query sorted), so a cassette recorded against the stand-in
+server replays only with the same redirects set.
+
+A request recorded several times replays its responses in order, then
+cycles through them, so retries and polling loops replay as they ran.
+
+File layout: a header, then each response (metadata plus raw body)
+written as it arrives, then an index of (key hash, offset) sorted by
+hash, then a footer pointing at the index. Replay memory-maps the file
+and binary-searches the index, so lookups cost the same however big the
+cassette is, and only the bodies actually served are paged in.
+"""
+
+import asyncio
+import atexit
+import bisect
+import contextlib
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import response_cache
+
+
+CASSETTE_ENV = "API_CASSETTE"
+MODE_ENV = "API_CASSETTE_MODE"
+SPEED_ENV = "API_CASSETTE_SPEED"
+MODES = ("record", "replay", "auto")
+
+MAGIC = b"CASSETT1"
+_ENTRY = struct.Struct("<II")          # metadata length, body length
+_INDEX = struct.Struct("<8sQ")         # key hash, entry offset
+_FOOTER = struct.Struct("<QQ8s")       # index offset, entry count, MAGIC
+
+# Not replayed: bodies are stored decoded and framed by the cassette
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding",
+                    "connection", "keep-alive"}
+_CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+
+class CassetteError(Exception):
+    """The file is not a readable cassette."""
+
+
+# ---------------- KEYS ----------------
+def request_key(method, url, params=None, headers=None):
+    """A recording's key: method, normalized URL, and whether it was conditional."""
+    key = f"{method.upper()} {response_cache.make_key(url, params)}"
+    if headers and any(name in headers for name in _CONDITIONAL_HEADERS):
+        key += " conditional"
+    return key
+
+
+def _digest(key):
+    return hashlib.blake2b(key.encode(), digest_size=8).digest()
+
+
+def _unconditional(key):
+    return key[:-len(" conditional")] if key.endswith(" conditional") else None
+
+
+# ---------------- FILE FORMAT ----------------
+class _Writer:
+    """Appends entries to `path`.tmp and renames it into place on close."""
+
+    def __init__(self, path):
+        self.path = path
+        self._tmp = path + ".tmp"
+        self._file = open(self._tmp, "wb")
+        self._file.write(MAGIC)
+        self._index = []
+        self._lock = threading.Lock()
+
+    def add(self, key, meta, body=b""):
+        meta = json.dumps(dict(meta, k=key), separators=(",", ":")).encode()
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(_ENTRY.pack(len(meta), len(body)))
+            self._file.write(meta)
+            self._file.write(body)
+            self._index.append((_digest(key), offset))
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            index_offset = self._file.tell()
+            # Sorted by hash, and by offset (= recording order) within a key
+            for digest, offset in sorted(self._index):
+                self._file.write(_INDEX.pack(digest, offset))
+            self._file.write(_FOOTER.pack(index_offset, len(self._index), MAGIC))
+            self._file.close()
+            os.replace(self._tmp, self.path)
+
+
+class _Digests:
+    """The index's key hashes as a sequence, for bisect over the mmap."""
+
+    def __init__(self, data, start, count):
+        self._data = data
+        self._start = start
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        at = self._start + i * _INDEX.size
+        return self._data[at:at + 8]
+
+    def offset(self, i):
+        return _INDEX.unpack_from(self._data, self._start + i * _INDEX.size)[1]
+
+
+class _Reader:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._file.close()
+            raise CassetteError(f"{path} is empty")
+        if (len(self._data) < len(MAGIC) + _FOOTER.size
+                or self._data[:len(MAGIC)] != MAGIC):
+            self.close()
+            raise CassetteError(f"{path} is not a cassette")
+        index_offset, count, magic = _FOOTER.unpack_from(
+            self._data, len(self._data) - _FOOTER.size)
+        if magic != MAGIC:
+            self.close()
+            raise CassetteError(f"{path} is incomplete (recording not closed?)")
+        self._digests = _Digests(self._data, index_offset, count)
+        self.count = count
+
+    def offsets(self, key):
+        """Offsets of every entry recorded under `key`, in recording order."""
+        digest = _digest(key)
+        i = bisect.bisect_left(self._digests, digest)
+        found = []
+        while i < len(self._digests) and self._digests[i] == digest:
+            found.append(self._digests.offset(i))
+            i += 1
+        return found
+
+    def entry(self, offset):
+        """(metadata dict, body bytes) of the entry at `offset`."""
+        meta_len, body_len = _ENTRY.unpack_from(self._data, offset)
+        start = offset + _ENTRY.size
+        meta = json.loads(self._data[start:start + meta_len])
+        body = self._data[start + meta_len:start + meta_len + body_len]
+        return meta, body
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+
+# ---------------- CASSETTE ----------------
+class Cassette:
+    def __init__(self, path, mode="auto", speed=0.0):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if mode == "auto":
+            mode = "replay" if os.path.exists(path) else "record"
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+        self._writer = _Writer(path) if mode == "record" else None
+        self._reader = _Reader(path) if mode == "replay" else None
+        self._plays = {}
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self):
+        return self._writer is not None
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader is not None:
+            self._reader.close()
+
+    # ---- recording ----
+    def record(self, key, status=None, reason="", headers=(), body=b"",
+               elapsed=0.0, error=None, message=""):
+        """Store one response, or the error ("timeout"/"connection") a request ended in."""
+        meta = {"t": round(elapsed, 6)}
+        if error is not None:
+            meta.update(e=error, m=message)
+        else:
+            meta.update(s=status, r=reason,
+                        h=[[name, value] for name, value in headers
+                           if name.lower() not in _DROPPED_HEADERS])
+        self._writer.add(key, meta, bytes(body))
+        with self._lock:
+            self.recorded += 1
+
+    # ---- replay ----
+    def play(self, key):
+        """
+        (metadata, body) of the next recording for `key`, or None. A
+        conditional request falls back to the plain recordings.
+        """
+        offsets = self._reader.offsets(key)
+        if not offsets and _unconditional(key):
+            key = _unconditional(key)
+            offsets = self._reader.offsets(key)
+
+        with self._lock:
+            if not offsets:
+                self.misses += 1
+                return None
+            self.hits += 1
+            played = self._plays.get(key, 0)
+            self._plays[key] = played + 1
+
+        meta, body = self._reader.entry(offsets[played % len(offsets)])
+        if meta.get("k") not in (key, None):
+            with self._lock:
+                self.misses += 1
+            return None  # hash collision
+        return meta, body
+
+    def delay(self, meta):
+        return meta.get("t", 0.0) * self.speed
+
+    def stats(self):
+        with self._lock:
+            return {"path": self.path, "mode": self.mode, "hits": self.hits,
+                    "misses": self.misses, "recorded": self.recorded}
+
+
+_active = None
+_active_lock = threading.Lock()
+
+
+def active():
+    """The cassette in use, or None."""
+    return _active
+
+
+def start(path, mode="auto", speed=0.0):
+    """Use a cassette for every request from now on (replacing any other)."""
+    global _active
+    tape = Cassette(path, mode, speed)
+    with _active_lock:
+        old, _active = _active, tape
+    if old is not None:
+        old.close()
+    return tape
+
+
+@atexit.register
+def stop():
+    """Stop using the cassette; a recording is written out."""
+    global _active
+    with _active_lock:
+        tape, _active = _active, None
+    if tape is not None:
+        tape.close()
+    return tape
+
+
+@contextlib.contextmanager
+def use(path, mode="auto", speed=0.0):
+    tape = start(path, mode, speed)
+    try:
+        yield tape
+    finally:
+        stop()
+
+
+def _start_from_env():
+    path = os.environ.get(CASSETTE_ENV)
+    if path:
+        start(path, os.environ.get(MODE_ENV, "auto"),
+              float(os.environ.get(SPEED_ENV) or 0))
+
+
+# ---------------- REQUESTS (api_client) ----------------
+def _error_kind(e):
+    # aiohttp.ServerTimeoutError is an asyncio.TimeoutError
+    timeouts = (requests.Timeout, asyncio.TimeoutError)
+    return "timeout" if isinstance(e, timeouts) else "connection"
+
+
+def send(tape, transport, request, **kwargs):
+    """
+    Record `request` as sent by transport(request, **kwargs) (an adapter's
+    send), or replay it from `tape`.
+    """
+    key = request_key(request.method, request.url, headers=request.headers)
+    if tape.recording:
+        return _record(tape, key, transport, request, kwargs)
+    return _replay(tape, key, request)
+
+
+def _record(tape, key, transport, request, kwargs):
+    started = time.perf_counter()
+    try:
+        response = transport(request, **kwargs)
+        # Read the whole body now; streaming callers get it in slices
+        body = response.content
+    except requests.RequestException as e:
+        tape.record(key, elapsed=time.perf_counter() - started,
+                    error=_error_kind(e), message=str(e))
+        raise
+    tape.record(key, response.status_code, response.reason,
+                response.headers.items(), body, time.perf_counter() - started)
+    return response
+
+
+def _replay(tape, key, request):
+    found = tape.play(key)
+    if found is None:
+        raise requests.ConnectionError(
+            f"No recording for {key} in {tape.path}", request=request)
+    meta, body = found
+    if tape.speed:
+        time.sleep(tape.delay(meta))
+
+    if "e" in meta:
+        error = (requests.ReadTimeout if meta["e"] == "timeout"
+                 else requests.ConnectionError)
+        raise error(meta.get("m") or "replayed error", request=request)
+
+    response = requests.Response()
+    response.status_code = meta["s"]
+    response.reason = meta.get("r", "")
+    response.headers = CaseInsensitiveDict(meta.get("h", ()))
+    response.raw = io.BytesIO(body)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.elapsed = timedelta(seconds=tape.delay(meta))
+    return response
+
+
+# ---------------- AIOHTTP (async_client) ----------------
+# aiohttp is imported where it is used, so the requests-only path
+# (api_client and the parts built on it) runs without it installed
+def aiohttp_get(tape, session, url, params=None, headers=None, **kwargs):
+    """session.get(...) through `tape`, for `async with`."""
+    key = request_key("GET", url, params, headers)
+    if tape.recording:
+        return _AsyncRecording(tape, key,
+                               session.get(url, params=params, headers=headers,
+                                           **kwargs))
+    return _AsyncReplay(tape, key, url)
+
+
+class _AsyncRecording:
+    def __init__(self, tape, key, request):
+        self._tape = tape
+        self._key = key
+        self._request = request
+        self._response = None
+
+    async def __aenter__(self):
+        import aiohttp
+
+        self._started = time.perf_counter()
+        try:
+            self._response = await self._request.__aenter__()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._tape.record(self._key, elapsed=time.perf_counter() - self._started,
+                              error=_error_kind(e), message=str(e))
+            raise
+        return self._response
+
+    async def __aexit__(self, *exc_info):
+        import aiohttp
+
+        response = self._response
+        try:
+            body = await response.read()  # cached if the caller read it
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self._tape.record(self._key, elapsed=time.perf_counter() - self._started,
+                              error=_error_kind(e), message=str(e))
+        else:
+            self._tape.record(self._key, response.status, response.reason or "",
+                              response.headers.items(), body,
+                              time.perf_counter() - self._started)
+        return await self._request.__aexit__(*exc_info)
+
+
+class _AsyncReplay:
+    def __init__(self, tape, key, url):
+        self._tape = tape
+        self._key = key
+        self._url = url
+
+    async def __aenter__(self):
+        import aiohttp
+
+        found = self._tape.play(self._key)
+        if found is None:
+            raise aiohttp.ClientConnectionError(
+                f"No recording for {self._key} in {self._tape.path}")
+        meta, body = found
+        if self._tape.speed:
+            await asyncio.sleep(self._tape.delay(meta))
+        if "e" in meta:
+            if meta["e"] == "timeout":
+                raise asyncio.TimeoutError(meta.get("m") or "replayed timeout")
+            raise aiohttp.ClientConnectionError(meta.get("m") or "replayed error")
+        return ReplayedResponse(self._url, meta, body)
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class _Content:
+    def __init__(self, size):
+        self.total_bytes = size
+        self.total_raw_bytes = size
+
+
+class ReplayedResponse:
+    """The parts of aiohttp.ClientResponse that async_client uses."""
+
+    def __init__(self, url, meta, body):
+        from multidict import CIMultiDict, CIMultiDictProxy
+        from yarl import URL
+
+        self.url = URL(url)
+        self.status = meta["s"]
+        self.reason = meta.get("r", "")
+        self.headers = CIMultiDictProxy(CIMultiDict(meta.get("h", ())))
+        self.content = _Content(len(body))
+        self._body = bytes(body)
+
+    async def read(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            import aiohttp
+            from multidict import CIMultiDict, CIMultiDictProxy
+
+            info = aiohttp.RequestInfo(self.url, "GET",
+                                       CIMultiDictProxy(CIMultiDict()), self.url)
+            raise aiohttp.ClientResponseError(info, (), status=self.status,
+                                              message=self.reason,
+                                              headers=self.headers)
+
+
+_start_from_env()
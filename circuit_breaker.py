@@ -0,0 +1,188 @@
+"""
+Circuit Breaker: Fail Fast on Unhealthy Hosts
+=============================================
+
+One breaker per host, with three states:
+
+- closed   : calls go through; outcomes are tracked over a rolling window
+- open     : the error rate crossed the threshold, so calls fail at once
+             with CircuitOpenError instead of waiting for a timeout
+- half-open: after open_seconds a few trial calls are let through; one
+             success closes the circuit, one failure opens it again
+
+Failures are transport errors and 429/5xx responses. Any other response,
+including a 404, shows the host is up and counts as a success.
+"""
+
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from requests.exceptions import RequestException
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+DEFAULTS = {
+    "failure_threshold": 0.5,
+    "min_calls": 10,
+    "window": 30.0,
+    "open_seconds": 15.0,
+    "half_open_calls": 1,
+}
+
+
+class CircuitOpenError(RequestException):
+    """Raised instead of calling a host whose circuit is open."""
+
+    def __init__(self, host, retry_in):
+        super().__init__(f"Circuit open for {host}; retry in {retry_in:.1f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def is_failure_status(status):
+    return status == 429 or status >= 500
+
+
+# ---------------- BREAKER ----------------
+class CircuitBreaker:
+    def __init__(self, host="", failure_threshold=0.5, min_calls=10,
+                 window=30.0, open_seconds=15.0, half_open_calls=1):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = CLOSED
+        self._calls = deque()  # (timestamp, failed)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+        self.times_opened = 0
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now."""
+        with self._lock:
+            now = time.monotonic()
+
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.host, remaining)
+                self.state = HALF_OPEN
+                self._trials = 0
+
+            if self.state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.host, 0.0)
+                self._trials += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._close()
+            else:
+                self._record(False)
+
+    def record_failure(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._open()
+                return
+
+            self._record(True)
+            total = len(self._calls)
+            if (total >= self.min_calls
+                    and self._failures / total >= self.failure_threshold):
+                self._open()
+
+    def record_cancelled(self):
+        """A call was abandoned before it finished; free its trial slot."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def _record(self, failed):
+        now = time.monotonic()
+        self._calls.append((now, failed))
+        self._failures += failed
+
+        cutoff = now - self.window
+        while self._calls and self._calls[0][0] < cutoff:
+            _, old_failed = self._calls.popleft()
+            self._failures -= old_failed
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def _close(self):
+        self.state = CLOSED
+        self._calls.clear()
+        self._failures = 0
+
+    def stats(self):
+        with self._lock:
+            total = len(self._calls)
+            return {
+                "state": self.state,
+                "calls_in_window": total,
+                "error_rate": self._failures / total if total else 0.0,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+            }
+
+
+# ---------------- PER-HOST REGISTRY ----------------
+_settings = dict(DEFAULTS)
+_settings["enabled"] = True
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+def configure(enabled=None, **settings):
+    """Change defaults for breakers created afterwards (and reset them)."""
+    unknown = set(settings) - set(DEFAULTS)
+    if unknown:
+        raise TypeError(f"Unknown breaker settings: {sorted(unknown)}")
+
+    with _lock:
+        if enabled is not None:
+            _settings["enabled"] = enabled
+        _settings.update(settings)
+        _breakers.clear()
+
+
+def breaker_for(url):
+    """Return the breaker for the URL's host, or None if breakers are off."""
+    if not _settings["enabled"]:
+        return None
+
+    host = urlsplit(url).hostname or ""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(host)
+            if breaker is None:
+                options = {k: _settings[k] for k in DEFAULTS}
+                breaker = CircuitBreaker(host, **options)
+                _breakers[host] = breaker
+    return breaker
+
+
+def stats():
+    with _lock:
+        return {host: breaker.stats() for host, breaker in _breakers.items()}
@@ -0,0 +1,222 @@
+"""
+Columnar: Batch Results as Column Arrays
+========================================
+
+Hundreds of tickers or city readings are easier to compare as columns
+than as a list of dicts. A ColumnTable keeps one array per field:
+
+- with NumPy installed, numeric columns are float64 ndarrays, so sorting,
+  filtering and aggregates (rankings, market-cap sums, temperature
+  extremes) run vectorized in C
+- without it, numeric columns are array.array("d") and the same methods
+  fall back to plain Python
+
+Tables are built straight from parsed responses (or model records) with
+ticker_table() and weather_table(). A payload that fails model validation
+is left out of the table rather than aborting the whole batch.
+"""
+
+import operator
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import models
+
+
+_OPS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+
+# ---------------- COLUMN BUILDERS ----------------
+def _numeric(values, count):
+    if np is not None:
+        return np.fromiter(values, dtype=np.float64, count=count)
+    return array("d", values)
+
+
+def _text(values):
+    if np is not None:
+        return np.array(list(values), dtype=object)
+    return list(values)
+
+
+# ---------------- TABLE ----------------
+class ColumnTable:
+    def __init__(self, columns, numeric=()):
+        self.columns = dict(columns)
+        self.numeric = tuple(numeric)
+
+        lengths = {len(col) for col in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_rows(cls, rows, numeric, text=()):
+        """Build from row objects (records or dicts) by attribute/key name."""
+        rows = list(rows)
+        get = (operator.getitem if rows and isinstance(rows[0], dict)
+               else getattr)
+
+        def number(row, name):
+            value = get(row, name)
+            return float("nan") if value is None else value
+
+        columns = {}
+        for name in text:
+            columns[name] = _text(get(row, name) for row in rows)
+        for name in numeric:
+            columns[name] = _numeric((number(row, name) for row in rows),
+                                     len(rows))
+        return cls(columns, numeric)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    # ---- row selection ----
+    def take(self, indices):
+        """New table with only the rows at `indices`, in that order."""
+        if np is not None:
+            indices = np.asarray(indices, dtype=np.intp)
+            columns = {name: col[indices] for name, col in self.columns.items()}
+        else:
+            columns = {}
+            for name, col in self.columns.items():
+                picked = [col[i] for i in indices]
+                columns[name] = (array("d", picked) if name in self.numeric
+                                 else picked)
+        return ColumnTable(columns, self.numeric)
+
+    def sort(self, by, descending=False):
+        col = self.columns[by]
+        if by not in self.numeric:
+            # Text (object arrays too): a stable sort, ties keep their order
+            order = sorted(range(len(self)), key=col.__getitem__,
+                           reverse=descending)
+        elif np is not None:
+            order = np.argsort(-col if descending else col, kind="stable")
+        else:
+            # NaN sorts last either way, as np.argsort does
+            sign = -1 if descending else 1
+
+            def key(i):
+                value = col[i]
+                return (True, 0.0) if value != value else (False, sign * value)
+            order = sorted(range(len(self)), key=key)
+        return self.take(order)
+
+    def filter(self, by, op, value):
+        """Rows where `by <op> value`, e.g. filter("price", ">", 100)."""
+        compare = _OPS[op]
+        col = self.columns[by]
+        if np is not None:
+            return self.take(np.flatnonzero(compare(col, value)))
+        return self.take([i for i, v in enumerate(col) if compare(v, value)])
+
+    def dropna(self, by):
+        """Rows where `by` has a value (NaN marks a missing one)."""
+        col = self.columns[by]
+        if np is not None:
+            return self.take(np.flatnonzero(~np.isnan(col)))
+        return self.take([i for i, v in enumerate(col) if v == v])
+
+    def top(self, n, by):
+        return self.sort(by, descending=True).take(range(min(n, len(self))))
+
+    # ---- aggregates (NaN values are skipped) ----
+    def _values(self, by):
+        col = self.columns[by]
+        if np is not None:
+            return col[~np.isnan(col)]
+        return [v for v in col if v == v]
+
+    def sum(self, by):
+        values = self._values(by)
+        return float(values.sum()) if np is not None else float(sum(values))
+
+    def mean(self, by):
+        values = self._values(by)
+        if len(values) == 0:
+            return float("nan")
+        return self.sum(by) / len(values)
+
+    def min(self, by):
+        return float(min(self._values(by)))
+
+    def max(self, by):
+        return float(max(self._values(by)))
+
+    # ---- output ----
+    def rows(self):
+        names = list(self.columns)
+        for i in range(len(self)):
+            yield {name: self.columns[name][i] for name in names}
+
+    def format(self, formats):
+        """Text table; `formats` maps column name -> (header, format spec)."""
+        headers = [header for header, _ in formats.values()]
+        cells = [
+            [format(row[name], spec) for name, (_, spec) in formats.items()]
+            for row in self.rows()
+        ]
+        widths = [
+            max([len(h)] + [len(r[i]) for r in cells])
+            for i, h in enumerate(headers)
+        ]
+        lines = ["  ".join(h.ljust(w) for h, w in zip(headers, widths))]
+        lines.append("  ".join("-" * w for w in widths))
+        for row in cells:
+            lines.append("  ".join(c.rjust(w) for c, w in zip(row, widths)))
+        return "\n".join(lines)
+
+
+# ---------------- BUILDERS FOR BATCH RESULTS ----------------
+TICKER_NUMERIC = ("price", "market_cap", "percent_change_24h")
+WEATHER_NUMERIC = ("temperature", "windspeed", "winddirection")
+
+
+def _records(record_cls, items):
+    """(position, record) for each item that is or decodes to a record."""
+    for i, item in enumerate(items):
+        if isinstance(item, record_cls):
+            yield i, item
+            continue
+        try:
+            yield i, record_cls.from_dict(item)
+        except models.ValidationError:
+            continue
+
+
+def ticker_table(items):
+    """Tickers (models.CoinTicker or raw payloads) as a ColumnTable."""
+    return ColumnTable.from_rows(
+        (record for _, record in _records(models.CoinTicker, items)),
+        numeric=TICKER_NUMERIC,
+        text=("name", "symbol"),
+    )
+
+
+def weather_table(cities, items):
+    """Readings (models.CurrentWeather or raw payloads), one per city."""
+    cities = list(cities)
+    valid = list(_records(models.CurrentWeather, items))
+    table = ColumnTable.from_rows(
+        (record for _, record in valid),
+        numeric=WEATHER_NUMERIC,
+    )
+    columns = {"city": _text(cities[i] for i, _ in valid)}
+    columns.update(table.columns)
+    return ColumnTable(columns, table.numeric)
@@ -0,0 +1,182 @@
+"""
+Disk Cache: Persistent Response Store
+=====================================
+
+SQLite-backed second tier for response_cache.ResponseCache.
+
+Entries survive restarts and are shared by every process pointing at the
+same file, so a freshly started worker serves warm data straight away.
+The database runs in WAL mode: readers never block each other or the
+writer, and writers queue up behind a busy timeout instead of failing.
+Total body size is capped; the least recently read entries go first.
+
+A hit only writes its read time back when the stored one is more than
+TOUCH_INTERVAL seconds old, so most hits stay plain reads. Any SQLite
+error (locked past the busy timeout, corrupt file, full disk) is counted
+and treated as a miss or a skipped write, never raised to the caller.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Eviction only needs a rough read order, not a write per hit
+TOUCH_INTERVAL = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key           TEXT PRIMARY KEY,
+    body          BLOB NOT NULL,
+    size          INTEGER NOT NULL,
+    etag          TEXT,
+    last_modified TEXT,
+    expires_at    REAL NOT NULL,
+    accessed_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at);
+"""
+
+
+class DiskCache:
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, busy_timeout=5.0):
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+        self.busy_timeout = busy_timeout
+        self.errors = 0
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    # ---- connections (one per thread) ----
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _failed(self):
+        self.errors += 1
+
+    # ---- reads ----
+    def get(self, key):
+        """Return a dict with body/etag/last_modified/expires_at, or None."""
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT body, etag, last_modified, expires_at, accessed_at"
+                " FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            if now - row[4] > TOUCH_INTERVAL:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?",
+                             (now, key))
+        except sqlite3.Error:
+            self._failed()
+            return None
+        return {
+            "body": bytes(row[0]),
+            "etag": row[1],
+            "last_modified": row[2],
+            "expires_at": row[3],
+        }
+
+    # ---- writes ----
+    def put(self, key, body, expires_at, etag=None, last_modified=None):
+        """Store a body; `expires_at` is a wall-clock (time.time()) deadline."""
+        size = len(body)
+        if size > self.max_bytes:
+            return
+
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.Error:
+            self._failed()
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (key, body, size, etag, last_modified, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, size, etag, last_modified, expires_at, time.time()),
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except BaseException as e:
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            if not isinstance(e, sqlite3.Error):
+                raise
+            self._failed()
+
+    def _write(self, sql, args=()):
+        try:
+            self._connect().execute(sql, args)
+        except sqlite3.Error:
+            self._failed()
+
+    def touch(self, key, expires_at, etag=None, last_modified=None):
+        """Extend an entry after a 304, keeping any validators not resent."""
+        self._write(
+            "UPDATE entries SET expires_at = ?, accessed_at = ?,"
+            " etag = COALESCE(?, etag),"
+            " last_modified = COALESCE(?, last_modified)"
+            " WHERE key = ?",
+            (expires_at, time.time(), etag, last_modified, key),
+        )
+
+    def delete(self, key):
+        self._write("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._write("DELETE FROM entries")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at"
+        )
+        doomed = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    # ---- info ----
+    def stats(self):
+        try:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            self._failed()
+            count, total = None, None
+        return {"entries": count, "bytes": total, "max_bytes": self.max_bytes,
+                "errors": self.errors}
@@ -0,0 +1,47 @@
+"""
+Fan-Out: Bounded Concurrent Calls
+=================================
+
+Run many blocking lookups at once on a thread pool with a concurrency cap.
+
+Results come back in input order, one dict per item, using the same
+{"success": ..., "data"/"error": ...} shape as part4's safe_api_request,
+so one failing item never hides the others.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def _call(func):
+    try:
+        return {"success": True, "data": func()}
+    except Exception as e:
+        return {"success": False, "error": str(e) or type(e).__name__}
+
+
+def run_ordered(calls, max_workers=DEFAULT_MAX_WORKERS):
+    """Run zero-argument callables concurrently; return results in order."""
+    calls = list(calls)
+    if not calls:
+        return []
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    workers = min(max_workers, len(calls))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_call, calls))
+
+
+def map_ordered(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """Call func(item) for every item; each result also carries its item."""
+    items = list(items)
+    results = run_ordered(
+        [lambda item=item: func(item) for item in items],
+        max_workers=max_workers,
+    )
+    for item, result in zip(items, results):
+        result["item"] = item
+    return results
@@ -0,0 +1,288 @@
+"""
+Gazetteer: City Names, Coordinates and Nearest Places
+=====================================================
+
+An in-process index over a local list of places (gazetteer.csv, about
+200 world cities), used to turn what a user types into coordinates:
+
+- resolve("bengaluru") / resolve("london, ca"): a hash lookup on the
+  normalized name (case, accents and spacing ignored), alternate names
+  included. Ambiguous names pick the most populous place unless a
+  ", <country code>" suffix says otherwise. A prefix ("san fran") works
+  too when only one place starts with it; "new" (New Delhi, New York,
+  ...) is rejected with the candidates listed.
+- locate("28.61, 77.21"): plain coordinates are accepted as they are.
+- nearest(lat, lon): closest places, from a k-d tree over points on the
+  unit sphere, so lookups stay logarithmic and work across the date line.
+- snap(lat, lon, resolution): rounds coordinates to a grid, so nearby
+  lookups turn into one request and one cache key.
+
+Point API_GAZETTEER_PATH at a bigger file to load more places: the same
+CSV layout, or a GeoNames dump such as cities15000.txt (tab separated).
+"""
+
+import bisect
+import csv
+import heapq
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import namedtuple
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "gazetteer.csv")
+GAZETTEER_ENV = "API_GAZETTEER_PATH"
+
+# Degrees; 0.1 is about 11 km, close to the grid of Open-Meteo's models
+DEFAULT_GRID = 0.1
+
+EARTH_RADIUS_KM = 6371.0088
+MIN_PREFIX = 3
+AMBIGUOUS_SHOWN = 5   # candidates listed when a prefix matches several places
+
+
+# ---------------- HELPERS ----------------
+def normalize(name):
+    """Lowercase, accents stripped, punctuation and extra spaces removed."""
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text.casefold())
+    return " ".join(text.split())
+
+
+_COORDINATES = re.compile(
+    r"^\s*([-+]?\d+(?:\.\d+)?)\s*[,;\s]\s*([-+]?\d+(?:\.\d+)?)\s*$")
+
+
+def parse_coordinates(text):
+    """(lat, lon) for text like "28.61, 77.21", or None if it is not that."""
+    match = _COORDINATES.match(str(text))
+    if match is None:
+        return None
+    lat, lon = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise LookupError(f"Coordinates out of range: {text}")
+    return lat, lon
+
+
+def snap(lat, lon, resolution=DEFAULT_GRID):
+    """
+    Nearest grid point to (lat, lon), `resolution` degrees apart. Uses
+    round(), so a point halfway between two grid lines goes to the even
+    multiple, subject to float error (48.85 -> 48.8, 2.35 -> 2.4).
+    """
+    if not resolution:
+        return lat, lon
+    lat = max(-90.0, min(90.0, round(lat / resolution) * resolution))
+    lon = round(lon / resolution) * resolution
+    lon = (lon + 180.0) % 360.0 - 180.0
+    # Drop float noise so equal cells give equal cache keys
+    return round(lat, 6) + 0.0, round(lon, 6) + 0.0
+
+
+def _unit_vector(lat, lon):
+    phi, lam = math.radians(lat), math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance."""
+    a, b = _unit_vector(lat1, lon1), _unit_vector(lat2, lon2)
+    return _chord_to_km(math.dist(a, b))
+
+
+# ---------------- K-D TREE ----------------
+class KDTree:
+    """Static k-d tree over 3-d points with k-nearest queries."""
+
+    def __init__(self, points):
+        self.points = list(points)
+        self._root = self._build(list(range(len(self.points))), 0)
+
+    def _build(self, indexes, depth):
+        if not indexes:
+            return None
+        axis = depth % 3
+        indexes.sort(key=lambda i: self.points[i][axis])
+        middle = len(indexes) // 2
+        return (indexes[middle], axis,
+                self._build(indexes[:middle], depth + 1),
+                self._build(indexes[middle + 1:], depth + 1))
+
+    def nearest(self, point, k=1):
+        """[(distance, index)] of the k closest points, closest first."""
+        best = []  # max-heap of (-distance, index)
+
+        def visit(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            distance = math.dist(point, self.points[index])
+            if len(best) < k:
+                heapq.heappush(best, (-distance, index))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, index))
+
+            gap = point[axis] - self.points[index][axis]
+            near, far = (left, right) if gap < 0 else (right, left)
+            visit(near)
+            if len(best) < k or abs(gap) < -best[0][0]:
+                visit(far)
+
+        if k > 0:
+            visit(self._root)
+        return sorted((-d, i) for d, i in best)
+
+
+# ---------------- GAZETTEER ----------------
+class Place(namedtuple("Place", "name country lat lon population")):
+    __slots__ = ()
+
+    @property
+    def label(self):
+        return f"{self.name}, {self.country}" if self.country else self.name
+
+
+class Gazetteer:
+    def __init__(self, places, alternate_names=None):
+        """`alternate_names` maps a place's index to its other names."""
+        self.places = list(places)
+        alternate_names = alternate_names or {}
+
+        by_name = {}
+        for index, place in enumerate(self.places):
+            names = [place.name] + list(alternate_names.get(index, ()))
+            for key in {normalize(name) for name in names if name}:
+                by_name.setdefault(key, []).append(index)
+
+        # Most populous first, so ambiguous names pick the big city
+        for indexes in by_name.values():
+            indexes.sort(key=lambda i: -self.places[i].population)
+        self._by_name = by_name
+        self._sorted_names = sorted(by_name)
+
+        self._tree = KDTree(_unit_vector(p.lat, p.lon) for p in self.places)
+
+    def __len__(self):
+        return len(self.places)
+
+    # ---- loading ----
+    @classmethod
+    def from_file(cls, path):
+        """Load a gazetteer CSV, or a GeoNames dump (*.txt, tab separated)."""
+        if path.endswith(".txt"):
+            return cls._from_geonames(path)
+
+        places, alternates = [], {}
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("alternate_names"):
+                    alternates[len(places)] = row["alternate_names"].split("|")
+                places.append(Place(row["name"], row.get("country", ""),
+                                    float(row["latitude"]),
+                                    float(row["longitude"]),
+                                    int(row.get("population") or 0)))
+        return cls(places, alternates)
+
+    @classmethod
+    def _from_geonames(cls, path):
+        # name, asciiname, lat, lon, country code and population columns;
+        # the long multilingual alternate-name lists are skipped
+        places, alternates = [], {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 15:
+                    continue
+                if cols[2] and cols[2] != cols[1]:
+                    alternates[len(places)] = [cols[2]]
+                places.append(Place(cols[1], cols[8], float(cols[4]),
+                                    float(cols[5]), int(cols[14] or 0)))
+        return cls(places, alternates)
+
+    # ---- names ----
+    def lookup(self, name):
+        """Every place called `name` ("name, CC" filters by country)."""
+        key = normalize(name)
+        indexes = self._by_name.get(key)
+        if indexes is None and "," in str(name):
+            place_name, _, country = str(name).rpartition(",")
+            country = country.strip().upper()
+            indexes = [i for i in self._by_name.get(normalize(place_name), ())
+                       if self.places[i].country == country]
+        return [self.places[i] for i in indexes or ()]
+
+    def complete(self, prefix, limit=10):
+        """Names starting with `prefix`, most populous place first."""
+        key = normalize(prefix)
+        start = bisect.bisect_left(self._sorted_names, key)
+        found = []
+        for name in self._sorted_names[start:]:
+            if not name.startswith(key):
+                break
+            found.append(self._by_name[name][0])
+        found = sorted(set(found), key=lambda i: -self.places[i].population)
+        return [self.places[i] for i in found[:limit]]
+
+    def resolve(self, name):
+        """The best place for a free-form name. Raises LookupError."""
+        matches = self.lookup(name)
+        if not matches and len(normalize(name)) >= MIN_PREFIX:
+            matches = self.complete(name, limit=AMBIGUOUS_SHOWN + 1)
+            if len(matches) > 1:
+                shown = "; ".join(p.label for p in matches[:AMBIGUOUS_SHOWN])
+                more = ", ..." if len(matches) > AMBIGUOUS_SHOWN else ""
+                raise LookupError(f"Ambiguous city name {name!r}: "
+                                  f"{shown}{more}")
+        if not matches:
+            raise LookupError(f"City not found: {name}")
+        return matches[0]
+
+    # ---- coordinates ----
+    def nearest(self, lat, lon, k=1):
+        """[(place, km)] of the k places closest to (lat, lon)."""
+        found = self._tree.nearest(_unit_vector(lat, lon), k)
+        return [(self.places[i], _chord_to_km(chord)) for chord, i in found]
+
+    def locate(self, query):
+        """(lat, lon) for "lat, lon" text or a place name. Raises LookupError."""
+        coords = parse_coordinates(query)
+        if coords is not None:
+            return coords
+        place = self.resolve(query)
+        return place.lat, place.lon
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_gazetteer():
+    """The shared Gazetteer, loaded on first use."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                path = os.environ.get(GAZETTEER_ENV) or DEFAULT_PATH
+                _default = Gazetteer.from_file(path)
+    return _default
+
+
+def resolve(name):
+    return default_gazetteer().resolve(name)
+
+
+def locate(query):
+    return default_gazetteer().locate(query)
+
+
+def nearest(lat, lon, k=1):
+    return default_gazetteer().nearest(lat, lon, k)
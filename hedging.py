@@ -0,0 +1,379 @@
+"""
+Hedging: Race a Second Request Against a Slow One
+=================================================
+
+Most responses come back in a few hundred milliseconds, but now and then
+one connection stalls and the caller sits out the whole timeout. A hedge
+cuts that tail. If a GET has not answered after `delay`, a second copy
+goes out, the first response wins and the other is dropped.
+
+- The delay is a percentile (p90 by default) of the host's recent
+  response times, kept in a histogram.Histogram. Only the slowest few
+  percent of requests ever get a hedge. The percentile has to sit below
+  the share of stalled requests: with 5% stalls, p95 already lands on the
+  stall itself and the hedge goes out too late to win. Until min_samples
+  responses have been seen, max_delay is used.
+- A budget (retry_policy.RetryBudget) caps the extra load: every call
+  adds `budget_ratio` tokens and every hedge spends one.
+- In asyncio the losing request is cancelled. A blocking request cannot
+  be interrupted, so the loser finishes (or times out) on its worker
+  thread and its response is closed and thrown away. Its connection is
+  closed quietly if the pool is already full again by then
+  (api_client's pool_stats() counts these as "overflow_closed").
+
+Hedging is opt-in per host and only used for GETs (all the clients
+send). Hosts are the ones in the URLs the code asks for, before
+API_REDIRECTS:
+
+    hedging.set_hedge("api.coinpaprika.com", percentile=90, max_delay=1.0)
+    part5.get_crypto_price("bitcoin")
+    hedging.stats()   # hedges fired and won, p99 with and without hedging
+
+"p99_unhedged_ms" is what callers would have waited for the first
+request alone. A blocking first request still running when the hedge wins
+is recorded when it ends; settle() waits for those before stats() is
+read. A cancelled asyncio one never ends, so its call is left out of both
+p99s ("unhedged_unknown" says how many).
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import histogram
+import retry_policy
+
+
+DEFAULTS = {
+    "percentile": 90,
+    "min_delay": 0.01,
+    "max_delay": 1.0,
+    "min_samples": 20,
+    "budget_ratio": 0.1,
+    "budget_per_second": 0.5,
+}
+
+# Threads running blocking attempts; a stalled loser holds one until it ends
+MAX_WORKERS = 64
+
+_attempt = threading.local()
+
+
+def in_attempt():
+    """True on a worker thread while it runs a hedged blocking attempt."""
+    return getattr(_attempt, "active", False)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+# ---------------- HEDGER ----------------
+class Hedger:
+    def __init__(self, host="", percentile=90, min_delay=0.01, max_delay=1.0,
+                 min_samples=20, budget_ratio=0.1, budget_per_second=0.5):
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        self.host = host
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.budget = retry_policy.RetryBudget(
+            ratio=budget_ratio, min_per_second=budget_per_second)
+
+        self.latency = histogram.Histogram()    # successful attempts
+        self.observed = histogram.Histogram()   # what callers waited
+        self.unhedged = histogram.Histogram()   # first attempts alone
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.denied = 0
+        self.unknown = 0     # calls whose first attempt was cancelled
+        self._running = set()   # first attempts that lost but still run
+        self._lock = threading.Lock()
+
+    def delay(self):
+        """Seconds to wait for the first attempt before sending a hedge."""
+        if self.latency.count < self.min_samples:
+            return self.max_delay
+        wait_for = self.latency.percentile(self.percentile)
+        return min(self.max_delay, max(self.min_delay, wait_for))
+
+    # ---- bookkeeping ----
+    def _begin(self):
+        self.budget.record_request()
+        with self._lock:
+            self.calls += 1
+
+    def _spend(self):
+        allowed = self.budget.try_spend()
+        with self._lock:
+            if allowed:
+                self.hedged += 1
+            else:
+                self.denied += 1
+        return allowed
+
+    def _finish(self, started, hedge_won, compared=True):
+        waited = time.perf_counter() - started
+        if compared:
+            self.observed.record(waited)
+        if hedge_won:
+            with self._lock:
+                self.hedge_wins += 1
+        return waited
+
+    def _timed(self, attempt, end=None):
+        # Appends the time it ended to `end`, for call()
+        started = time.perf_counter()
+        ok = False
+        _attempt.active = True
+        try:
+            result = attempt()
+            ok = True
+            return result
+        finally:
+            _attempt.active = False
+            ended = time.perf_counter()
+            if end is not None:
+                end.append(ended)
+            self._record_attempt(ended - started, ok, False)
+
+    async def _timed_async(self, attempt, first):
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await attempt()
+            ok = True
+            return result
+        except asyncio.CancelledError:
+            # How long it would have run is unknown
+            first = False
+            raise
+        finally:
+            self._record_attempt(time.perf_counter() - started, ok, first)
+
+    def _record_attempt(self, elapsed, ok, first):
+        # Failures come back at odd times (refused at once, or after the
+        # full timeout), so only responses shape the delay
+        if ok:
+            self.latency.record(elapsed)
+        if first:
+            self.unhedged.record(elapsed)
+
+    # ---- threads ----
+    def call(self, attempt, discard=None):
+        """
+        Return attempt()'s result, hedged: if it is slower than delay(), a
+        second attempt() runs alongside and the first to succeed wins.
+        discard(result) is called with the loser's result, if it has one.
+        Raises the first error when no attempt succeeds.
+        """
+        self._begin()
+        started = time.perf_counter()
+        primary_end = []
+        primary = _pool().submit(self._timed, attempt, primary_end)
+        done, _ = wait([primary], timeout=self.delay())
+        if done or not self._spend():
+            try:
+                return primary.result()
+            finally:
+                # No hedge: the caller waited for the first attempt alone
+                self.unhedged.record(self._finish(started, False))
+
+        hedge = _pool().submit(self._timed, attempt)
+        winner, error = None, None
+        pending = {primary, hedge}
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                elif winner is None:
+                    winner = future
+                elif discard is not None:
+                    discard(future.result())
+
+        if discard is not None:
+            for future in pending:
+                _discard_when_done(future, discard)
+        waited = self._finish(started, winner is hedge)
+
+        if winner is primary:
+            self.unhedged.record(waited)
+        elif primary in pending:
+            # Still running: its full time goes in once it ends
+            self._record_when_done(primary, primary_end, started)
+        else:
+            self.unhedged.record(primary_end[0] - started)
+
+        if winner is None:
+            raise error
+        return winner.result()
+
+    # ---- asyncio ----
+    async def call_async(self, attempt):
+        """
+        Coroutine version of call(): attempt() returns an awaitable, and
+        the losing attempt is cancelled.
+        """
+        self._begin()
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(self._timed_async(attempt, True))
+        tasks = {primary}
+        winner, error = None, None
+        try:
+            await asyncio.wait(tasks, timeout=self.delay())
+            if not primary.done() and self._spend():
+                tasks.add(asyncio.ensure_future(self._timed_async(attempt, False)))
+
+            pending = set(tasks)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                    elif winner is None:
+                        winner = task
+        finally:
+            # A first attempt cancelled while running leaves the call out
+            # of the p99 comparison
+            cancelled = not primary.done()
+            for task in tasks:
+                task.cancel()
+
+        if cancelled:
+            with self._lock:
+                self.unknown += 1
+        self._finish(started, winner is not None and winner is not primary,
+                     compared=not cancelled)
+        if winner is None:
+            raise error
+        return winner.result()
+
+    def _record_when_done(self, primary, end, started):
+        with self._lock:
+            self._running.add(primary)
+
+        def done(future):
+            # _timed() has appended its end time by now
+            self.unhedged.record(end[0] - started)
+            with self._lock:
+                self._running.discard(future)
+        primary.add_done_callback(done)
+
+    def settle(self, timeout=None):
+        """
+        Wait up to `timeout` seconds for first attempts that lost to a
+        hedge but are still running, so stats() includes them. Returns
+        how many are still running.
+        """
+        with self._lock:
+            running = list(self._running)
+        _, not_done = wait(running, timeout=timeout)
+        return len(not_done)
+
+    def stats(self):
+        with self._lock:
+            calls, hedged = self.calls, self.hedged
+            wins, denied = self.hedge_wins, self.denied
+            unknown, running = self.unknown, len(self._running)
+        p99 = self.observed.percentile(99)
+        p99_unhedged = self.unhedged.percentile(99)
+        saved = None
+        if p99 is not None and p99_unhedged is not None:
+            saved = p99_unhedged - p99
+        return {
+            "calls": calls,
+            "hedged": hedged,
+            "hedge_wins": wins,
+            "budget_denied": denied,
+            "hedge_rate": round(hedged / calls, 4) if calls else 0.0,
+            "win_rate": round(wins / hedged, 4) if hedged else 0.0,
+            "delay_ms": _ms(self.delay()),
+            "p99_ms": _ms(p99),
+            "p99_unhedged_ms": _ms(p99_unhedged),
+            "p99_saved_ms": _ms(saved),
+            "unhedged_unknown": unknown,
+            "unhedged_running": running,
+            "budget_tokens": round(self.budget.tokens, 3),
+        }
+
+
+def _discard_when_done(future, discard):
+    def done(f):
+        if not f.cancelled() and f.exception() is None:
+            discard(f.result())
+    future.add_done_callback(done)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(MAX_WORKERS,
+                                               thread_name_prefix="hedge")
+    return _executor
+
+
+# ---------------- PER-HOST REGISTRY ----------------
+_hedgers = {}
+_lock = threading.Lock()
+
+
+def _host(url_or_host):
+    if "://" in url_or_host:
+        return urlsplit(url_or_host).hostname or ""
+    return url_or_host.lower()
+
+
+def set_hedge(host, **options):
+    """Hedge GETs to `host` (a hostname or any URL on it); returns the Hedger."""
+    unknown = set(options) - set(DEFAULTS)
+    if unknown:
+        raise TypeError(f"Unknown hedge settings: {sorted(unknown)}")
+
+    settings = dict(DEFAULTS, **options)
+    hedger = Hedger(_host(host), **settings)
+    with _lock:
+        _hedgers[hedger.host] = hedger
+    return hedger
+
+
+def remove_hedge(host):
+    with _lock:
+        _hedgers.pop(_host(host), None)
+
+
+def hedger_for(url):
+    """Return the Hedger for the URL's host, or None if it is not hedged."""
+    if not _hedgers:
+        return None
+    return _hedgers.get(_host(url))
+
+
+def settle(timeout=None):
+    """Hedger.settle() for every host, sharing one overall timeout."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _lock:
+        hedgers = list(_hedgers.values())
+    running = 0
+    for hedger in hedgers:
+        left = None if deadline is None else max(0.0, deadline - time.monotonic())
+        running += hedger.settle(left)
+    return running
+
+
+def stats():
+    with _lock:
+        return {host: hedger.stats() for host, hedger in _hedgers.items()}
@@ -0,0 +1,156 @@
+"""
+JSON Decode: Fast Backends and Field Projection
+===============================================
+
+One place that turns response bodies into Python objects.
+
+Backends, fastest first, used when installed:
+    orjson  -> msgspec -> stdlib json
+
+Projections materialize only the paths a caller reads, for example the
+five ticker fields display_crypto prints out of a payload with dozens.
+With msgspec installed the projection is decoded straight from the bytes
+into small typed structs, and every other field is skipped without ever
+being built. Otherwise the body is decoded normally and then trimmed, so
+the cached copy is still small.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+# ---------------- BACKENDS ----------------
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+# Every backend raises a ValueError subclass on a malformed body
+_BACKENDS = {"json": (_stdlib_loads, _stdlib_dumps)}
+
+if msgspec is not None:
+    _BACKENDS["msgspec"] = (msgspec.json.decode, msgspec.json.encode)
+
+if orjson is not None:
+    _BACKENDS["orjson"] = (orjson.loads, orjson.dumps)
+
+BACKEND = next(name for name in ("orjson", "msgspec", "json") if name in _BACKENDS)
+_loads, _dumps = _BACKENDS[BACKEND]
+
+
+def available_backends():
+    return list(_BACKENDS)
+
+
+def set_backend(name):
+    """Switch the decoder used by loads()/dumps(), e.g. for benchmarks."""
+    global BACKEND, _loads, _dumps
+    if name not in _BACKENDS:
+        raise ValueError(f"Backend {name!r} is not installed")
+    BACKEND = name
+    _loads, _dumps = _BACKENDS[name]
+
+
+def loads(data):
+    """Decode JSON bytes or str with the active backend."""
+    return _loads(data)
+
+
+def dumps(obj):
+    """Encode to compact JSON bytes with the active backend."""
+    return _dumps(obj)
+
+
+# ---------------- PROJECTIONS ----------------
+def _path_tree(paths):
+    tree = {}
+    for path in paths:
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is None:
+                raise ValueError(f"Path {path!r} overlaps a leaf path")
+            node = child
+        if node.get(parts[-1]):
+            raise ValueError(f"Path {path!r} overlaps a nested path")
+        node[parts[-1]] = None
+    return tree
+
+
+def _project(data, tree):
+    if not isinstance(data, dict):
+        return data
+
+    out = {}
+    for name, sub in tree.items():
+        if name in data:
+            out[name] = data[name] if sub is None else _project(data[name], sub)
+    return out
+
+
+class Projection:
+    """
+    A compiled set of dotted paths, e.g.
+        Projection(["name", "symbol", "quotes.USD.price"])
+    """
+
+    def __init__(self, paths):
+        self.paths = tuple(sorted(paths))
+        self.tree = _path_tree(self.paths)
+        self.signature = ",".join(self.paths)
+        self._struct = self._build_struct(self.tree) if msgspec else None
+
+    def _build_struct(self, tree, name="Projection"):
+        fields = []
+        for field, sub in tree.items():
+            kind = Any if sub is None else self._build_struct(sub, f"{name}_{field}")
+            fields.append((field, kind, msgspec.UNSET))
+        return msgspec.defstruct(name, fields, forbid_unknown_fields=False)
+
+    def apply(self, data):
+        """Trim an already decoded object down to the projected paths."""
+        if isinstance(data, list):
+            return [_project(item, self.tree) for item in data]
+        return _project(data, self.tree)
+
+    def decode(self, body):
+        """Decode bytes, materializing only the projected paths."""
+        if self._struct is not None:
+            try:
+                decoded = msgspec.json.decode(body, type=self._struct)
+                return msgspec.to_builtins(decoded)
+            except msgspec.ValidationError:
+                pass  # e.g. a list or an unexpected shape: trim the slow way
+        return self.apply(loads(body))
+
+    def __repr__(self):
+        return f"Projection({list(self.paths)!r})"
+
+
+_compiled = {}
+
+
+def as_projection(fields):
+    """Accept a Projection, an iterable of dotted paths, or None."""
+    if fields is None or isinstance(fields, Projection):
+        return fields
+
+    key = tuple(sorted(fields))
+    projection = _compiled.get(key)
+    if projection is None:
+        projection = _compiled[key] = Projection(key)
+    return projection
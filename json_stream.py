@@ -0,0 +1,105 @@
+"""
+JSON Stream: Incremental Array Parsing
+======================================
+
+Yield the items of a top-level JSON array while the body is still
+downloading, instead of building the whole list with response.json().
+
+Only the item being parsed (plus one network chunk) is kept in memory,
+so memory stays flat no matter how long the array is, and a consumer that
+stops early never pays for the rest of the payload.
+"""
+
+import codecs
+import json
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_AFTER_ITEM = ",]" + _WHITESPACE
+
+
+class StreamError(ValueError):
+    """The body is not a well-formed JSON array."""
+
+
+def _skip(buf, pos, chars):
+    while pos < len(buf) and buf[pos] in chars:
+        pos += 1
+    return pos
+
+
+def iter_array_items(chunks):
+    """
+    Parse a JSON array from an iterable of bytes (or str) chunks and yield
+    each item as soon as it is complete.
+    """
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    started = False
+    finished = False
+    expect_item = True
+
+    chunks = iter(chunks)
+    while True:
+        chunk = next(chunks, None)
+        final = chunk is None
+        if final:
+            buf += text.decode(b"", final=True)
+        else:
+            buf += text.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+        if not started:
+            pos = _skip(buf, pos, _WHITESPACE)
+            if pos < len(buf):
+                if buf[pos] != "[":
+                    raise StreamError("Expected a JSON array")
+                started = True
+                pos += 1
+
+        while started and not finished:
+            pos = _skip(buf, pos, _WHITESPACE)
+            if pos >= len(buf):
+                break
+
+            if buf[pos] == "]":
+                finished = True
+                pos += 1
+                break
+            if buf[pos] == ",":
+                if expect_item:
+                    raise StreamError(f"Unexpected ',' at offset {pos}")
+                expect_item = True
+                pos += 1
+                continue
+            if not expect_item:
+                raise StreamError(f"Expected ',' or ']' at offset {pos}")
+
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise StreamError("Truncated JSON array")
+                break  # item not complete yet
+
+            # A number may be cut off mid-token ("-1.5e" of "-1.5e3"), so an
+            # item only counts once the delimiter after it has arrived.
+            if end == len(buf) or buf[end] not in _AFTER_ITEM:
+                if not final:
+                    break
+                if end < len(buf):
+                    raise StreamError(f"Unexpected data at offset {end}")
+
+            yield item
+            pos = end
+            expect_item = False
+
+        # Drop everything already parsed to keep memory flat
+        buf = buf[pos:]
+        pos = 0
+
+        if finished:
+            return
+        if final:
+            raise StreamError("Truncated JSON array")
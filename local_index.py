@@ -0,0 +1,207 @@
+"""
+Local Index: Sync Once, Query Locally
+=====================================
+
+JSONPlaceholder is small (10 users, 100 posts, 200 todos, 500 comments),
+so instead of one network query per question we can load each collection
+once and answer lookups from hash indexes in memory:
+
+    store = LocalStore(max_age=300)
+    store.posts_by_user(1)        # posts indexed by userId
+    store.todos_by_status(True)   # todos indexed by completed
+    store.comments_for_post(1)    # comments indexed by postId
+
+Each collection is synced on first use and re-synced once it is older
+than `max_age` seconds (the staleness bound). Every sync checks each page
+with the server, even when the shared response cache still holds a fresh
+copy (its TTL can be longer than max_age). Pages kept in the cache are
+sent as conditional GETs, so an unchanged page costs a 304 rather than a
+download. Only items that actually changed are re-indexed.
+"""
+
+import threading
+import time
+
+import pagination
+import response_cache
+
+
+# name -> fields with a hash index
+INDEXES = {
+    "users": (),
+    "posts": ("userId",),
+    "todos": ("userId", "completed"),
+    "comments": ("postId",),
+}
+
+DEFAULT_MAX_AGE = 300
+SYNC_PAGE_SIZE = 100
+
+
+def _truthy(value):
+    if isinstance(value, str):
+        return value.strip().lower() == "true"
+    return bool(value)
+
+
+# ---------------- ONE COLLECTION ----------------
+class _Collection:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.by_id = {}
+        self.indexes = {field: {} for field in fields}
+        self.synced_at = None
+
+    def _add(self, item):
+        self.by_id[item["id"]] = item
+        for field in self.fields:
+            self.indexes[field].setdefault(item.get(field), {})[item["id"]] = item
+
+    def _remove(self, item):
+        del self.by_id[item["id"]]
+        for field in self.fields:
+            bucket = self.indexes[field].get(item.get(field))
+            if bucket is not None:
+                bucket.pop(item["id"], None)
+                if not bucket:
+                    del self.indexes[field][item.get(field)]
+
+    def _replace(self, old, new):
+        self.by_id[new["id"]] = new
+        for field in self.fields:
+            if old.get(field) == new.get(field):
+                # same bucket: replace in place, keeping the item's position
+                self.indexes[field][new.get(field)][new["id"]] = new
+            else:
+                self.indexes[field][old.get(field)].pop(old["id"])
+                if not self.indexes[field][old.get(field)]:
+                    del self.indexes[field][old.get(field)]
+                self.indexes[field].setdefault(new.get(field), {})[new["id"]] = new
+
+    def apply(self, items):
+        """Merge a full listing; returns (added, changed, removed) counts."""
+        added = changed = 0
+        seen = set()
+        for item in items:
+            seen.add(item["id"])
+            old = self.by_id.get(item["id"])
+            if old is None:
+                self._add(item)
+                added += 1
+            elif old != item:
+                self._replace(old, item)
+                changed += 1
+
+        gone = [item for id_, item in self.by_id.items() if id_ not in seen]
+        for item in gone:
+            self._remove(item)
+        return added, changed, len(gone)
+
+    def lookup(self, field, value):
+        return list(self.indexes[field].get(value, {}).values())
+
+
+# ---------------- STORE ----------------
+class LocalStore:
+    def __init__(self, max_age=DEFAULT_MAX_AGE, cache=response_cache.default_cache,
+                 page_size=SYNC_PAGE_SIZE, prefetch=pagination.DEFAULT_PREFETCH,
+                 clock=time.monotonic):
+        self.max_age = max_age
+        self.cache = cache
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.clock = clock
+        self._collections = {name: _Collection(name, fields)
+                             for name, fields in INDEXES.items()}
+        self._lock = threading.Lock()        # guards the indexes
+        self._sync_lock = threading.Lock()   # one download at a time
+        self.syncs = 0
+
+    def _collection(self, name):
+        if name not in self._collections:
+            raise ValueError(f"Unknown collection {name!r}")
+        return self._collections[name]
+
+    def age(self, name):
+        """Seconds since `name` was synced, or None if it never was."""
+        synced_at = self._collection(name).synced_at
+        return None if synced_at is None else self.clock() - synced_at
+
+    def is_stale(self, name):
+        age = self.age(name)
+        return age is None or age > self.max_age
+
+    def sync(self, names=None, force=False):
+        """
+        Load (or refresh) collections; returns {name: (added, changed, removed)}
+        for the ones actually synced.
+        """
+        names = list(INDEXES) if names is None else list(names)
+        report = {}
+        with self._sync_lock:
+            for name in names:
+                collection = self._collection(name)
+                if not force and not self.is_stale(name):
+                    continue  # another thread just synced it
+                # Download outside the index lock so readers are not blocked.
+                # Cached pages are revalidated: the cache TTL may exceed max_age
+                items = list(pagination.iter_collection(
+                    name, page_size=self.page_size, prefetch=self.prefetch,
+                    cache=self.cache, revalidate=True,
+                ))
+                with self._lock:
+                    report[name] = collection.apply(items)
+                    collection.synced_at = self.clock()
+                    self.syncs += 1
+        return report
+
+    def _fresh(self, name):
+        if self.is_stale(name):
+            self.sync([name])
+        return self._collections[name]
+
+    # ---- lookups ----
+    def all(self, name):
+        collection = self._fresh(name)
+        with self._lock:
+            return list(collection.by_id.values())
+
+    def get(self, name, item_id):
+        collection = self._fresh(name)
+        with self._lock:
+            return collection.by_id.get(item_id)
+
+    def find(self, name, field, value):
+        collection = self._fresh(name)
+        with self._lock:
+            return collection.lookup(field, value)
+
+    def user(self, user_id):
+        return self.get("users", user_id)
+
+    def posts_by_user(self, user_id):
+        return self.find("posts", "userId", user_id)
+
+    def todos_by_status(self, completed, user_id=None):
+        todos = self.find("todos", "completed", _truthy(completed))
+        if user_id is not None:
+            todos = [todo for todo in todos if todo["userId"] == user_id]
+        return todos
+
+    def comments_for_post(self, post_id):
+        return self.find("comments", "postId", post_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    "items": len(collection.by_id),
+                    "age": self.age(name),
+                    "stale": self.is_stale(name),
+                }
+                for name, collection in self._collections.items()
+            }
+
+
+default_store = LocalStore()
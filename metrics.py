@@ -0,0 +1,257 @@
+"""
+Metrics: Per-Request Phase Timings
+==================================
+
+Every outbound call made through api_client and async_client reports
+where its time went:
+
+    dns      name resolution (new connections only)
+    connect  TCP connect (new connections only)
+    tls      TLS handshake (new https connections only)
+    ttfb     request sent -> response headers received
+    body     body download
+    decode   JSON decode
+
+plus status, bytes (decoded, and on the wire before decompression) and
+retries. Each host gets one histogram per phase
+(histogram.Histogram, fixed memory) and a few counters. Recording a
+request costs a handful of perf_counter() calls and dict updates, so the
+instrumentation is meant to stay on. Export with to_json() or
+to_prometheus().
+
+Hooks added with add_hook(fn) receive every finished request as a dict,
+e.g. to log slow calls.
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import histogram
+
+
+PHASES = ("dns", "connect", "tls", "ttfb", "body", "decode")
+
+# Prometheus bucket bounds in seconds
+PROMETHEUS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                      0.5, 1.0, 2.5, 5.0, 10.0)
+
+_settings = {"enabled": True}
+_hosts = {}
+_hooks = []
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def configure(enabled=None):
+    if enabled is not None:
+        _settings["enabled"] = enabled
+
+
+def enabled():
+    return _settings["enabled"]
+
+
+def host_of(url):
+    """The host label used for `url` (host[:port] it is actually sent to)."""
+    return urlsplit(url).netloc.lower()
+
+
+def add_hook(fn):
+    """Call fn(record) for every finished request."""
+    _hooks.append(fn)
+
+
+def remove_hook(fn):
+    if fn in _hooks:
+        _hooks.remove(fn)
+
+
+# ---------------- PER HOST ----------------
+class HostMetrics:
+    def __init__(self):
+        self.phases = {phase: histogram.Histogram() for phase in PHASES}
+        self.total = histogram.Histogram()
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.wire_bytes = 0
+        self.retries = 0
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def add(self, phases, status, size, total, error, wire=None):
+        for phase, seconds in phases.items():
+            self.phases[phase].record(seconds)
+        if total is not None:
+            self.total.record(total)
+        with self._lock:
+            self.requests += 1
+            if error is not None:
+                self.errors += 1
+            if status is not None:
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+            if size:
+                self.bytes += size
+            if wire:
+                self.wire_bytes += wire
+
+    def add_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def to_dict(self):
+        with self._lock:
+            out = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "bytes": self.bytes,
+                "wire_bytes": self.wire_bytes,
+                "retries": self.retries,
+                "statuses": dict(self.statuses),
+            }
+        out["total"] = self.total.summary()
+        out["phases"] = {phase: h.summary() for phase, h in self.phases.items()
+                         if h.count}
+        return out
+
+
+def host_metrics(host):
+    metrics = _hosts.get(host)
+    if metrics is None:
+        with _lock:
+            metrics = _hosts.setdefault(host, HostMetrics())
+    return metrics
+
+
+# ---------------- CONNECTION PHASES ----------------
+# Connections are opened on the calling thread, in the middle of a
+# request, so they report into that thread's pending phases.
+def begin():
+    """Start collecting connection phases for the request on this thread."""
+    _local.phases = {}
+
+
+def connection_phase(phase, seconds):
+    phases = getattr(_local, "phases", None)
+    if phases is not None:
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+
+def take_phases():
+    phases = getattr(_local, "phases", None) or {}
+    _local.phases = None
+    return phases
+
+
+# ---------------- RECORDING ----------------
+def record(host, phases, status=None, size=None, total=None, error=None,
+           wire=None):
+    """
+    Aggregate one finished request (phases in seconds). `size` is the
+    decoded body length, `wire` what was received before decompression.
+    """
+    if not _settings["enabled"]:
+        return
+    host_metrics(host).add(phases, status, size, total, error, wire)
+    if _hooks:
+        entry = {"host": host, "status": status, "bytes": size,
+                 "wire_bytes": wire, "total": total, "error": error,
+                 "phases": dict(phases)}
+        for hook in list(_hooks):
+            hook(entry)
+
+
+def observe(host, phase, seconds):
+    """Add one phase timing measured outside record() (body, decode)."""
+    if _settings["enabled"]:
+        host_metrics(host).phases[phase].record(seconds)
+
+
+def count_bytes(host, size, wire=None):
+    if _settings["enabled"] and (size or wire):
+        metrics = host_metrics(host)
+        with metrics._lock:
+            metrics.bytes += size or 0
+            metrics.wire_bytes += wire or 0
+
+
+def count_retry(host):
+    if _settings["enabled"]:
+        host_metrics(host).add_retry()
+
+
+def reset():
+    with _lock:
+        _hosts.clear()
+
+
+# ---------------- EXPORT ----------------
+def to_json():
+    with _lock:
+        items = list(_hosts.items())
+    return {host: metrics.to_dict() for host, metrics in sorted(items)}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _prometheus_histogram(lines, name, labels, h):
+    cumulative = h.cumulative(PROMETHEUS_BUCKETS)
+    for bound, count in zip(PROMETHEUS_BUCKETS, cumulative):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+    lines.append(f"{name}_sum{{{labels}}} {h.sum}")
+    lines.append(f"{name}_count{{{labels}}} {h.count}")
+
+
+def to_prometheus():
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        items = sorted(_hosts.items())
+
+    lines = [
+        "# HELP api_request_phase_seconds Time spent in each phase of a request.",
+        "# TYPE api_request_phase_seconds histogram",
+    ]
+    for host, metrics in items:
+        for phase, h in metrics.phases.items():
+            if h.count:
+                labels = f'host="{_label(host)}",phase="{phase}"'
+                _prometheus_histogram(lines, "api_request_phase_seconds",
+                                      labels, h)
+
+    lines += [
+        "# HELP api_request_duration_seconds Whole request, start to body read.",
+        "# TYPE api_request_duration_seconds histogram",
+    ]
+    for host, metrics in items:
+        if metrics.total.count:
+            _prometheus_histogram(lines, "api_request_duration_seconds",
+                                  f'host="{_label(host)}"', metrics.total)
+
+    counters = (
+        ("api_requests_total", "Requests by host and status.", None),
+        ("api_request_errors_total", "Requests that failed without a response.",
+         "errors"),
+        ("api_response_bytes_total", "Response body bytes after decompression.",
+         "bytes"),
+        ("api_response_wire_bytes_total",
+         "Response body bytes as received, before decompression.",
+         "wire_bytes"),
+        ("api_retries_total", "Retries scheduled after a failed attempt.",
+         "retries"),
+    )
+    for name, help_text, attribute in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        for host, metrics in items:
+            labels = f'host="{_label(host)}"'
+            with metrics._lock:
+                if attribute is None:
+                    for status, count in sorted(metrics.statuses.items()):
+                        lines.append(f'{name}{{{labels},status="{status}"}} {count}')
+                else:
+                    lines.append(f"{name}{{{labels}}} {getattr(metrics, attribute)}")
+
+    return "\n".join(lines) + "\n"
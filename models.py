@@ -0,0 +1,205 @@
+"""
+Models: Typed Compact Records
+=============================
+
+Slotted dataclasses for the payloads the parts work with, instead of raw
+nested dicts:
+
+    User, Post, Todo, Comment     (JSONPlaceholder)
+    CoinTicker                    (coinpaprika /v1/tickers/<id>)
+    CurrentWeather                (Open-Meteo forecast, current_weather)
+
+Each field may name a dotted source path (CoinTicker.price comes from
+"quotes.USD.price"). Every record class gets one compiled decoder that
+walks those paths, checks types and raises ValidationError listing every
+problem at once. Attribute reads are plain slot lookups, and typos or
+missing fields fail at decode time rather than deep in a view.
+
+Records are built when read: response_cache keeps the decoded dicts
+(that is what it revalidates and writes to disk), so a record saves no
+memory by itself. Slots only pay off for records a caller holds on to,
+such as ticker_feed's latest ticker per coin.
+
+Record.projection() returns the json_decode.Projection of a class's
+source paths, so a fetch can decode only what the record needs.
+"""
+
+from dataclasses import MISSING, dataclass, field, fields
+
+import json_decode
+
+
+class ValidationError(ValueError):
+    """A payload is missing required fields or has wrong types."""
+
+    def __init__(self, record, errors):
+        super().__init__(f"Invalid {record}: " + "; ".join(errors))
+        self.record = record
+        self.errors = errors
+
+    def __reduce__(self):
+        # Rebuilt from its parts, e.g. when raised in a worker process
+        return type(self), (self.record, self.errors)
+
+    @property
+    def missing(self):
+        return [e.split(":")[0] for e in self.errors if e.endswith(": missing")]
+
+
+def src(path, default=MISSING):
+    """Declare a field read from a dotted `path` in the payload."""
+    return field(default=default, metadata={"path": path})
+
+
+# ---------------- DECODER ----------------
+_ABSENT = object()
+
+_ACCEPTED = {
+    float: (int, float),
+    int: (int,),
+    str: (str,),
+    bool: (bool,),
+}
+
+_decoders = {}
+
+
+def _compile(cls):
+    specs = []
+    for f in fields(cls):
+        path = f.metadata.get("path", f.name)
+        required = f.default is MISSING and f.default_factory is MISSING
+        default = None if required else f.default
+        accepted = _ACCEPTED.get(f.type, (f.type,))
+        reject_bool = f.type in (int, float)
+        specs.append((path, tuple(path.split(".")), accepted, reject_bool,
+                      required, default))
+
+    name = cls.__name__
+
+    def decode(data):
+        values = []
+        errors = []
+        for path, parts, accepted, reject_bool, required, default in specs:
+            value = data
+            for part in parts:
+                if isinstance(value, dict):
+                    value = value.get(part, _ABSENT)
+                else:
+                    value = _ABSENT
+                    break
+
+            if value is _ABSENT or value is None:
+                if required:
+                    errors.append(f"{path}: missing")
+                values.append(default)
+            elif not isinstance(value, accepted) or (
+                    reject_bool and isinstance(value, bool)):
+                errors.append(f"{path}: expected {accepted[-1].__name__}, "
+                              f"got {type(value).__name__}")
+                values.append(default)
+            else:
+                values.append(value)
+
+        if errors:
+            raise ValidationError(name, errors)
+        return cls(*values)
+
+    return decode
+
+
+def _decoder(cls):
+    decode = _decoders.get(cls)
+    if decode is None:
+        decode = _decoders[cls] = _compile(cls)
+    return decode
+
+
+# ---------------- BASE ----------------
+class Record:
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from a decoded payload. Raises ValidationError."""
+        return _decoder(cls)(data)
+
+    @classmethod
+    def many(cls, items):
+        decode = _decoder(cls)
+        return [decode(item) for item in items]
+
+    @classmethod
+    def from_json(cls, body):
+        """Decode JSON bytes, materializing only this record's fields."""
+        data = cls.projection().decode(body)
+        if isinstance(data, list):
+            return cls.many(data)
+        return cls.from_dict(data)
+
+    @classmethod
+    def projection(cls):
+        paths = [f.metadata.get("path", f.name) for f in fields(cls)]
+        return json_decode.as_projection(paths)
+
+
+# ---------------- JSONPLACEHOLDER ----------------
+@dataclass(slots=True)
+class User(Record):
+    id: int
+    name: str
+    username: str
+    email: str
+    phone: str
+    website: str
+    city: str = src("address.city", None)
+    company: str = src("company.name", None)
+
+
+@dataclass(slots=True)
+class Post(Record):
+    id: int
+    user_id: int = src("userId")
+    title: str = src("title")
+    body: str = src("body")
+
+
+@dataclass(slots=True)
+class Todo(Record):
+    id: int
+    user_id: int = src("userId")
+    title: str = src("title")
+    completed: bool = src("completed")
+
+
+@dataclass(slots=True)
+class Comment(Record):
+    id: int
+    post_id: int = src("postId")
+    name: str = src("name")
+    email: str = src("email")
+    body: str = src("body")
+
+
+# ---------------- COINPAPRIKA ----------------
+@dataclass(slots=True)
+class CoinTicker(Record):
+    name: str
+    symbol: str
+    price: float = src("quotes.USD.price")
+    market_cap: float = src("quotes.USD.market_cap")
+    percent_change_24h: float = src("quotes.USD.percent_change_24h")
+    id: str = None
+    rank: int = None
+
+
+# ---------------- OPEN-METEO ----------------
+@dataclass(slots=True)
+class CurrentWeather(Record):
+    temperature: float = src("current_weather.temperature")
+    windspeed: float = src("current_weather.windspeed")
+    winddirection: float = src("current_weather.winddirection")
+    weathercode: int = src("current_weather.weathercode", None)
+    time: str = src("current_weather.time", None)
+    latitude: float = None
+    longitude: float = None
@@ -0,0 +1,125 @@
+"""
+Pagination: Prefetching Collection Iterator
+===========================================
+
+Walk a whole JSONPlaceholder collection (/posts, /todos, /comments,
+/users) page by page with `_start`/`_limit`, while the next pages are
+already being fetched on a small thread pool.
+
+- Items come out in collection order, one at a time.
+- The first page is requested alone, so the first item arrives after a
+  single small round trip, even for a full dump.
+- Every full page doubles the read-ahead window, up to `prefetch` pages.
+  A short result (10 posts of one user) never fires a burst of empty
+  requests.
+- Back-pressure: a new page is only requested when the caller takes one,
+  so at most `prefetch` pages are ever buffered or in flight.
+- A short page marks the end, and no page past it is requested once it
+  has come back. With limit=, only the pages needed to reach it are
+  fetched. Stopping early (break) cancels whatever has not started yet.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import api_client
+
+
+BASE_URL = "https://jsonplaceholder.typicode.com"
+COLLECTIONS = ("posts", "todos", "comments", "users")
+
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_PREFETCH = 4
+
+
+def collection_url(name):
+    if name not in COLLECTIONS:
+        raise ValueError(f"Unknown collection {name!r}, "
+                         f"expected one of {', '.join(COLLECTIONS)}")
+    return f"{BASE_URL}/{name}"
+
+
+def _fetch_page(url, params, start, size, timeout, cache, revalidate):
+    page_params = dict(params or {})
+    page_params["_start"] = start
+    page_params["_limit"] = size
+    page = api_client.get_json(url, params=page_params, timeout=timeout,
+                               cache=cache, revalidate=revalidate)
+    if not isinstance(page, list):
+        raise ValueError(f"Expected a JSON array from {url}")
+    return page
+
+
+def iter_pages(url, params=None, page_size=DEFAULT_PAGE_SIZE,
+               prefetch=DEFAULT_PREFETCH, timeout=10, cache=None,
+               revalidate=False, max_items=None):
+    """
+    Yield each page (a list) in order, fetching up to `prefetch` ahead.
+    revalidate=True checks cached pages with the server even when fresh.
+    max_items stops requesting pages once that many items are covered.
+    """
+    if page_size < 1 or prefetch < 1:
+        raise ValueError("page_size and prefetch must be at least 1")
+
+    pool = ThreadPoolExecutor(max_workers=prefetch)
+    pending = deque()
+    next_start = 0
+    window = 1
+
+    def end_seen():
+        # A prefetched page that came back short means nothing follows it
+        return any(f.done() and f.exception() is None
+                   and len(f.result()) < page_size for f in pending)
+
+    def fill():
+        nonlocal next_start
+        if end_seen():
+            return
+        while len(pending) < window:
+            if max_items is not None and next_start >= max_items:
+                return
+            pending.append(pool.submit(_fetch_page, url, params, next_start,
+                                       page_size, timeout, cache, revalidate))
+            next_start += page_size
+
+    try:
+        fill()
+        while pending:
+            page = pending.popleft().result()
+            if len(page) < page_size:
+                if page:
+                    yield page
+                return
+
+            window = min(window * 2, prefetch)
+            fill()
+            yield page
+    finally:
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def iter_items(url, params=None, limit=None, page_size=DEFAULT_PAGE_SIZE,
+               prefetch=DEFAULT_PREFETCH, timeout=10, cache=None,
+               revalidate=False):
+    """Yield items across pages, stopping after `limit` items if given."""
+    if limit is not None:
+        if limit <= 0:
+            return
+        page_size = min(page_size, limit)
+
+    count = 0
+    for page in iter_pages(url, params, page_size=page_size,
+                           prefetch=prefetch, timeout=timeout, cache=cache,
+                           revalidate=revalidate, max_items=limit):
+        for item in page:
+            yield item
+            count += 1
+            if count == limit:
+                return
+
+
+def iter_collection(name, params=None, **kwargs):
+    """iter_items() over a JSONPlaceholder collection by name, e.g. "todos"."""
+    return iter_items(collection_url(name), params, **kwargs)
@@ -14,13 +14,13 @@ Part 1: Basic GET Request
 Difficulty: Beginner
 """
 
-import requests
+import api_client
 
 # =========================
 # Exercise 1: Fetch post 5
 # =========================
 url1 = "https://jsonplaceholder.typicode.com/posts/5"
-response1 = requests.get(url1)
+response1 = api_client.get(url1)
 
 print("=== Exercise 1: Fetch Post 5 ===\n")
 print(f"URL: {url1}")
@@ -33,7 +33,7 @@ print(response1.json())
 # Exercise 2: Fetch all users
 # =========================
 url2 = "https://jsonplaceholder.typicode.com/users"
-response2 = requests.get(url2)
+response2 = api_client.get(url2)
 
 print("\n=== Exercise 2: Fetch All Users ===\n")
 print(f"URL: {url2}")
@@ -46,7 +46,7 @@ print(response2.json())
 # Exercise 3: Fetch non-existing post
 # =========================
 url3 = "https://jsonplaceholder.typicode.com/posts/999"
-response3 = requests.get(url3)
+response3 = api_client.get(url3)
 
 print("\n=== Exercise 3: Fetch Non-Existing Post ===\n")
 print(f"URL: {url3}")
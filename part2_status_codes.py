@@ -14,7 +14,9 @@ Part 2: Status Codes and JSON Parsing
 Difficulty: Beginner+
 """
 
-import requests
+import api_client
+import local_index
+import models
 
 print("=== Understanding Status Codes ===\n")
 
@@ -23,7 +25,7 @@ print("=== Understanding Status Codes ===\n")
 # =========================
 print("--- Example 1: Valid Request ---")
 url_valid = "https://jsonplaceholder.typicode.com/posts/1"
-response = requests.get(url_valid)
+response = api_client.get(url_valid)
 
 print(f"URL: {url_valid}")
 print(f"Status Code: {response.status_code}")
@@ -35,7 +37,7 @@ print(f"Success? {response.status_code == 200}")
 # =========================
 print("\n--- Example 2: Invalid Request (404) ---")
 url_invalid = "https://jsonplaceholder.typicode.com/posts/99999"
-response_404 = requests.get(url_invalid)
+response_404 = api_client.get(url_invalid)
 
 print(f"URL: {url_invalid}")
 print(f"Status Code: {response_404.status_code}")
@@ -47,7 +49,7 @@ print(f"Found? {response_404.status_code == 200}")
 # =========================
 print("\n--- Example 3: Parsing JSON ---")
 url = "https://jsonplaceholder.typicode.com/users/1"
-response = requests.get(url)
+response = api_client.get(url)
 data = response.json()
 
 print(f"Full Name: {data['name']}")
@@ -56,17 +58,26 @@ print(f"Email: {data['email']}")
 print(f"City: {data['address']['city']}")
 print(f"Company: {data['company']['name']}")
 
+# The same fields through a typed record (nested paths are flattened)
+user = models.User.from_dict(data)
+print(f"Record: {user.name} lives in {user.city}, works at {user.company}")
+
 
 # =========================
 # Example 4: List of Items
 # =========================
 print("\n--- Example 4: List of Items ---")
 url_list = "https://jsonplaceholder.typicode.com/posts?userId=1"
-response = requests.get(url_list)
-posts = response.json()
 
-print(f"User 1 has {len(posts)} posts:")
-for i, post in enumerate(posts[:3], 1):
+# Stream the list: count every post but only keep the first 3 in memory
+first_posts = []
+total = 0
+for total, post in enumerate(api_client.stream_json_items(url_list), 1):
+    if len(first_posts) < 3:
+        first_posts.append(post)
+
+print(f"User 1 has {total} posts:")
+for i, post in enumerate(first_posts, 1):
     print(f"  {i}. {post['title'][:40]}...")
 
 
@@ -75,7 +86,7 @@ for i, post in enumerate(posts[:3], 1):
 # =================================================
 print("\n=== Exercise 1: User 5 Phone Number ===")
 url_user5 = "https://jsonplaceholder.typicode.com/users/5"
-response = requests.get(url_user5)
+response = api_client.get(url_user5)
 
 if response.status_code == 200:
     user = response.json()
@@ -90,7 +101,7 @@ else:
 # =================================================
 print("\n=== Exercise 2: Resource Check ===")
 url_check = "https://jsonplaceholder.typicode.com/posts/200"
-response = requests.get(url_check)
+response = api_client.get(url_check)
 
 if response.status_code == 200 and response.json():
     print("Resource exists:")
@@ -104,10 +115,14 @@ else:
 # =================================================
 print("\n=== Exercise 3: Count Comments ===")
 url_comments = "https://jsonplaceholder.typicode.com/posts/1/comments"
-response = requests.get(url_comments)
 
-comments = response.json()
-print(f"Post 1 has {len(comments)} comments.")
+comment_count = sum(1 for _ in api_client.stream_json_items(url_comments))
+print(f"Post 1 has {comment_count} comments.")
+
+# Many such questions: sync all comments once, then answer from an index
+store = local_index.LocalStore()
+counts = {post_id: len(store.comments_for_post(post_id)) for post_id in range(1, 6)}
+print(f"Comments on posts 1-5 (one sync, local lookups): {counts}")
 
 
 # =========================
@@ -6,6 +6,93 @@ Difficulty: Intermediate
 
 import requests
 
+import api_client
+import gazetteer
+import local_index
+import pagination
+import response_cache
+
+
+BASE_URL = "https://jsonplaceholder.typicode.com"
+
+# Only these fields are decoded for the printed views
+USER_FIELDS = ["name", "email", "phone", "website"]
+CRYPTO_FIELDS = [
+    "name",
+    "symbol",
+    "quotes.USD.price",
+    "quotes.USD.percent_change_24h",
+]
+
+# Suggested in the weather prompt; any gazetteer city works
+CITIES = ("delhi", "mumbai", "pune")
+
+
+# ======================================
+# Data helpers (cached, raise on failure)
+# ======================================
+def _get(url, params=None, fields=None):
+    return api_client.get_json(url, params=params, timeout=10,
+                               cache=response_cache.default_cache,
+                               fields=fields)
+
+
+def fetch_user(user_id, fields=None):
+    return _get(f"{BASE_URL}/users/{user_id}", fields=fields)
+
+
+def fetch_posts(user_id):
+    return _get(f"{BASE_URL}/posts", params={"userId": user_id})
+
+
+def fetch_crypto(coin_id, fields=None):
+    return _get(f"https://api.coinpaprika.com/v1/tickers/{coin_id}",
+                fields=fields)
+
+
+def fetch_weather(city):
+    # Snapped to the grid, so nearby lookups share one cached forecast
+    lat, lon = gazetteer.snap(*gazetteer.locate(city))
+    params = {
+        "latitude": lat,
+        "longitude": lon,
+        "current_weather": True
+    }
+    return _get("https://api.open-meteo.com/v1/forecast", params=params)
+
+
+def fetch_todos(status):
+    return _get(f"{BASE_URL}/todos", params={"completed": status})
+
+
+# ======================================
+# Item helpers (items arrive one by one). A whole list is streamed from
+# a single response (a fresh cached copy is used when there is one);
+# with limit= the pagination iterator asks for just that many. After
+# sync_local_data() they answer from local indexes instead.
+# ======================================
+local_mode = False
+
+
+def _iter_items(name, params, limit):
+    if limit is None:
+        return api_client.stream_json_items(f"{BASE_URL}/{name}",
+                                            params=params, timeout=10,
+                                            cache=response_cache.default_cache)
+    return pagination.iter_collection(name, params=params, limit=limit)
+
+
+def iter_posts(user_id, limit=None):
+    if local_mode:
+        return iter(local_index.default_store.posts_by_user(user_id)[:limit])
+    return _iter_items("posts", {"userId": user_id}, limit)
+
+
+def iter_todos(status, limit=None):
+    if local_mode:
+        return iter(local_index.default_store.todos_by_status(status)[:limit])
+    return _iter_items("todos", {"completed": status}, limit)
+
 
 # ======================================
 # Helper: Input validation for user ID
@@ -35,18 +122,17 @@ def get_user_info():
     if user_id is None:
         return
 
-    url = f"https://jsonplaceholder.typicode.com/users/{user_id}"
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        data = response.json()
-        print(f"\n--- User #{user_id} Info ---")
-        print(f"Name: {data['name']}")
-        print(f"Email: {data['email']}")
-        print(f"Phone: {data['phone']}")
-        print(f"Website: {data['website']}")
-    else:
+    try:
+        data = fetch_user(user_id, fields=USER_FIELDS)
+    except requests.RequestException:
         print("User not found!")
+        return
+
+    print(f"\n--- User #{user_id} Info ---")
+    print(f"Name: {data['name']}")
+    print(f"Email: {data['email']}")
+    print(f"Phone: {data['phone']}")
+    print(f"Website: {data['website']}")
 
 
 # ======================================
@@ -59,17 +145,19 @@ def search_posts():
     if user_id is None:
         return
 
-    url = "https://jsonplaceholder.typicode.com/posts"
-    params = {"userId": user_id}
-
-    response = requests.get(url, params=params)
-    posts = response.json()
+    found = 0
+    try:
+        for found, post in enumerate(iter_posts(user_id), 1):
+            if found == 1:
+                print(f"\n--- Posts by User #{user_id} ---")
+            print(f"{found}. {post['title']}")
+    except (requests.RequestException, ValueError) as e:
+        # Posts already printed stay on screen; say the list is cut short
+        where = f" after {found} posts" if found else ""
+        print(f"❌ Error: could not load posts{where} ({e})")
+        return
 
-    if posts:
-        print(f"\n--- Posts by User #{user_id} ---")
-        for i, post in enumerate(posts, 1):
-            print(f"{i}. {post['title']}")
-    else:
+    if not found:
         print("No posts found.")
 
 
@@ -81,18 +169,17 @@ def get_crypto_price():
     print("Available: btc-bitcoin, eth-ethereum, doge-dogecoin")
 
     coin_id = input("Enter coin ID: ").strip().lower()
-    url = f"https://api.coinpaprika.com/v1/tickers/{coin_id}"
 
-    response = requests.get(url)
-
-    if response.status_code == 200:
-        data = response.json()
-        usd = data["quotes"]["USD"]
-        print(f"\n{data['name']} ({data['symbol']})")
-        print(f"Price: ${usd['price']:,.2f}")
-        print(f"24h Change: {usd['percent_change_24h']:+.2f}%")
-    else:
+    try:
+        data = fetch_crypto(coin_id, fields=CRYPTO_FIELDS)
+    except requests.RequestException:
         print("Invalid coin ID!")
+        return
+
+    usd = data["quotes"]["USD"]
+    print(f"\n{data['name']} ({data['symbol']})")
+    print(f"Price: ${usd['price']:,.2f}")
+    print(f"24h Change: {usd['percent_change_24h']:+.2f}%")
 
 
 # =================================================
@@ -101,30 +188,18 @@ def get_crypto_price():
 def get_weather():
     print("\n=== Weather Checker ===\n")
 
-    cities = {
-        "delhi": (28.61, 77.23),
-        "mumbai": (19.07, 72.87),
-        "pune": (18.52, 73.85)
-    }
-
-    print("Available cities:", ", ".join(cities.keys()))
+    print("Try:", ", ".join(CITIES), "(or any city, or 'lat, lon')")
     city = input("Enter city name: ").strip().lower()
 
-    if city not in cities:
+    try:
+        weather = fetch_weather(city)["current_weather"]
+    except KeyError:
         print("City not available.")
         return
-
-    lat, lon = cities[city]
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": lat,
-        "longitude": lon,
-        "current_weather": True
-    }
-
-    response = requests.get(url, params=params)
-    data = response.json()
-    weather = data["current_weather"]
+    except LookupError as e:
+        # Not found, or ambiguous with the matching cities listed
+        print(e)
+        return
 
     print(f"\nWeather in {city.title()}:")
     print(f"Temperature: {weather['temperature']}°C")
@@ -143,17 +218,31 @@ def search_todos():
         print("Invalid input! Use true or false.")
         return
 
-    url = "https://jsonplaceholder.typicode.com/todos"
-    params = {"completed": status}
-
-    response = requests.get(url, params=params)
-    todos = response.json()
-
     print(f"\nShowing first 5 todos (completed={status}):")
-    for todo in todos[:5]:
+    for todo in iter_todos(status, limit=5):
         print(f"- {todo['title']}")
 
 
+# ======================================
+# Option 6: Sync data for local queries
+# ======================================
+def sync_local_data():
+    global local_mode
+    print("\n=== Sync Data Locally ===\n")
+
+    try:
+        report = local_index.default_store.sync(["posts", "todos"], force=True)
+    except (requests.RequestException, ValueError):
+        print("Sync failed, still querying the API.")
+        return
+
+    local_mode = True
+    for name, (added, changed, removed) in report.items():
+        print(f"{name}: +{added} new, {changed} changed, {removed} removed")
+    max_age = local_index.default_store.max_age
+    print(f"Post and todo searches now run locally (resync after {max_age}s).")
+
+
 # ======================================
 # Main Menu
 # ======================================
@@ -168,9 +257,10 @@ def main():
         print("3. Check crypto price")
         print("4. Check weather")
         print("5. Search todos")
-        print("6. Exit")
+        print("6. Sync data for local queries")
+        print("7. Exit")
 
-        choice = input("\nEnter choice (1-6): ")
+        choice = input("\nEnter choice (1-7): ")
 
         if choice == "1":
             get_user_info()
@@ -183,6 +273,8 @@ def main():
         elif choice == "5":
             search_todos()
         elif choice == "6":
+            sync_local_data()
+        elif choice == "7":
             print("\nGoodbye!")
             break
         else:
@@ -12,9 +12,11 @@ Learn:
 - Logging
 """
 
-import requests
+import asyncio
 import time
 import logging
+
+import aiohttp
 from requests.exceptions import (
     ConnectionError,
     Timeout,
@@ -22,6 +24,14 @@ from requests.exceptions import (
     RequestException
 )
 
+import api_client
+import async_client
+import circuit_breaker
+import metrics
+import models
+import response_cache
+import retry_policy
+
 # ---------------- LOGGING SETUP (Exercise 3) ----------------
 logging.basicConfig(
     level=logging.INFO,
@@ -29,42 +39,115 @@ logging.basicConfig(
 )
 
 # ---------------- SAFE API REQUEST WITH RETRY (Exercise 1) ----------------
-def safe_api_request(url, timeout=5, retries=3):
-    """Make an API request with retry and logging."""
+def safe_api_request(url, timeout=5, retries=3, params=None,
+                     cache=response_cache.default_cache, policy=None):
+    """
+    Make an API request with retry and logging.
+
+    Responses go through `cache` (pass cache=None to always hit the network).
+    Waits between attempts come from `policy` (retry_policy.default_policy
+    if None): jittered exponential backoff, Retry-After on 429/503, and a
+    shared retry budget.
+    """
+    policy = policy or retry_policy.default_policy
+    policy.record_request()
+
     for attempt in range(1, retries + 1):
         try:
             logging.info(f"Attempt {attempt}: Requesting {url}")
-            response = requests.get(url, timeout=timeout)
-            response.raise_for_status()
-            return {"success": True, "data": response.json()}
+            data = api_client.get_json(url, params=params, timeout=timeout,
+                                       cache=cache)
+            return {"success": True, "data": data}
+
+        except circuit_breaker.CircuitOpenError as e:
+            logging.error(f"Skipped: {e}")
+            break  # host is failing; don't wait on it
 
-        except ConnectionError:
+        except ConnectionError as e:
             logging.error("Connection failed")
+            decision = policy.decide(attempt, error=e, max_attempts=retries)
 
-        except Timeout:
+        except Timeout as e:
             logging.error(f"Request timed out after {timeout} seconds")
+            decision = policy.decide(attempt, error=e, max_attempts=retries)
 
         except HTTPError as e:
-            logging.error(f"HTTP Error: {e.response.status_code}")
-            break  # no retry for HTTP errors
+            status = e.response.status_code
+            logging.error(f"HTTP Error: {status}")
+            decision = policy.decide(
+                attempt, status=status, max_attempts=retries,
+                retry_after=e.response.headers.get("Retry-After"),
+            )
 
         except RequestException as e:
             logging.error(f"Request failed: {e}")
+            decision = policy.decide(attempt, error=e, max_attempts=retries)
 
-        time.sleep(1)
+        if not decision.retry:
+            break
+        metrics.count_retry(metrics.host_of(api_client.resolve(url)))
+        time.sleep(decision.delay)
+
+    return {"success": False, "error": "All retry attempts failed"}
+
+# ---------------- ASYNC SAFE API REQUEST ----------------
+async def safe_api_request_async(url, timeout=5, retries=3, params=None,
+                                 cache=response_cache.default_cache,
+                                 policy=None):
+    """Event-loop friendly safe_api_request: same result dict, never blocks."""
+    policy = policy or retry_policy.default_policy
+    policy.record_request()
+
+    for attempt in range(1, retries + 1):
+        try:
+            logging.info(f"Attempt {attempt}: Requesting {url}")
+            data = await async_client.get_json(url, params=params,
+                                               timeout=timeout, cache=cache)
+            return {"success": True, "data": data}
+
+        except circuit_breaker.CircuitOpenError as e:
+            logging.error(f"Skipped: {e}")
+            break  # host is failing; don't wait on it
+
+        except asyncio.TimeoutError as e:
+            logging.error(f"Request timed out after {timeout} seconds")
+            decision = policy.decide(attempt, error=e, max_attempts=retries)
+
+        except aiohttp.ClientConnectionError as e:
+            logging.error("Connection failed")
+            decision = policy.decide(attempt, error=e, max_attempts=retries)
+
+        except aiohttp.ClientResponseError as e:
+            logging.error(f"HTTP Error: {e.status}")
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            decision = policy.decide(attempt, status=e.status,
+                                     retry_after=retry_after,
+                                     max_attempts=retries)
+
+        except async_client.REQUEST_ERRORS as e:
+            logging.error(f"Request failed: {e}")
+            decision = policy.decide(attempt, error=e, max_attempts=retries)
+
+        if not decision.retry:
+            break
+        metrics.count_retry(metrics.host_of(api_client.resolve(url)))
+        await asyncio.sleep(decision.delay)
 
     return {"success": False, "error": "All retry attempts failed"}
 
 # ---------------- CRYPTO RESPONSE VALIDATION (Exercise 2) ----------------
-def validate_crypto_response(data):
-    """Validate crypto API response structure."""
-    if "quotes" not in data:
-        return False
+def parse_crypto_response(data):
+    """Decode a ticker into a models.CoinTicker, or None if it is invalid."""
+    try:
+        return models.CoinTicker.from_dict(data)
+    except models.ValidationError as e:
+        logging.error(str(e))
+        return None
 
-    if "USD" not in data["quotes"]:
-        return False
 
-    return True
+def validate_crypto_response(data):
+    """Validate crypto API response structure."""
+    return parse_crypto_response(data) is not None
 
 # ---------------- DEMO ERROR HANDLING ----------------
 def demo_error_handling():
@@ -100,12 +183,12 @@ def fetch_crypto_safely():
 
     url = f"https://api.coinpaprika.com/v1/tickers/{coin}"
     result = safe_api_request(url)
+    ticker = parse_crypto_response(result["data"]) if result["success"] else None
 
-    if result["success"] and validate_crypto_response(result["data"]):
-        usd = result["data"]["quotes"]["USD"]
-        print(f"\n{result['data']['name']} ({result['data']['symbol']})")
-        print(f"Price: ${usd['price']:,.2f}")
-        print(f"24h Change: {usd['percent_change_24h']:+.2f}%")
+    if ticker is not None:
+        print(f"\n{ticker.name} ({ticker.symbol})")
+        print(f"Price: ${ticker.price:,.2f}")
+        print(f"24h Change: {ticker.percent_change_24h:+.2f}%")
     else:
         print("Invalid crypto data or request failed")
 
@@ -116,18 +199,15 @@ def validate_json_response():
     url = "https://jsonplaceholder.typicode.com/users/1"
 
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-
-        required_fields = ["name", "email", "phone"]
-        missing = [f for f in required_fields if f not in data]
-
-        if missing:
-            print("Missing fields:", missing)
-        else:
-            print("All required fields present")
-            print(data["name"], data["email"], data["phone"])
+        data = api_client.get_json(url, timeout=5,
+                                   fields=models.User.projection())
+        user = models.User.from_dict(data)
+
+        print("All required fields present")
+        print(user.name, user.email, user.phone)
+
+    except models.ValidationError as e:
+        print("Missing fields:", e.missing or e.errors)
 
     except Exception as e:
         print("Error:", e)
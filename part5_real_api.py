@@ -5,23 +5,49 @@ Part 5: Real-World APIs - Weather & Crypto Dashboard
 Difficulty: Advanced
 """
 
+import asyncio
+import os
+import time
+
 import requests
 from datetime import datetime
 
-
-# ---------------- CITY COORDINATES ----------------
-CITIES = {
-    "delhi": (28.6139, 77.2090),
-    "mumbai": (19.0760, 72.8777),
-    "bangalore": (12.9716, 77.5946),
-    "chennai": (13.0827, 80.2707),
-    "kolkata": (22.5726, 88.3639),
-    "hyderabad": (17.3850, 78.4867),
-    "new york": (40.7128, -74.0060),
-    "london": (51.5074, -0.1278),
-    "tokyo": (35.6762, 139.6503),
-    "sydney": (-33.8688, 151.2093),
-}
+import api_client
+import async_client
+import columnar
+import fanout
+import gazetteer
+import models
+import refresher
+import response_cache
+import ticker_feed
+import weather_batch
+
+
+# ---------------- CITIES ----------------
+# Shown by the full dashboard. Any gazetteer name (or "lat, lon") works
+# for single lookups.
+CITIES = (
+    "delhi",
+    "mumbai",
+    "bangalore",
+    "chennai",
+    "kolkata",
+    "hyderabad",
+    "new york",
+    "london",
+    "tokyo",
+    "sydney",
+)
+
+# Degrees. Lookups inside one grid cell share a request and a cache
+# entry; None keeps exact coordinates.
+WEATHER_GRID = gazetteer.DEFAULT_GRID
+
+# Worker processes that decode and render the dashboard cards
+# (worker_pool); 0 does it all in this process.
+PROCESSES_ENV = "API_DASHBOARD_PROCESSES"
+DASHBOARD_PROCESSES = int(os.environ.get(PROCESSES_ENV) or 0)
 
 
 # ---------------- CRYPTO IDS ----------------
@@ -35,81 +61,483 @@ CRYPTO_IDS = {
 }
 
 
+# ---------------- TICKER FIELDS ----------------
+# Only the parts of a coinpaprika ticker that models.CoinTicker reads
+TICKER_FIELDS = models.CoinTicker.projection()
+
+
 # ---------------- WEATHER FUNCTIONS ----------------
-def get_weather(city_name):
-    city = city_name.lower().strip()
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
 
-    if city not in CITIES:
-        print("City not found!")
-        return None
 
-    lat, lon = CITIES[city]
+def city_coords(city_name):
+    """Grid-snapped (lat, lon) for a city name or "lat, lon". Raises LookupError."""
+    lat, lon = gazetteer.locate(city_name)
+    return gazetteer.snap(lat, lon, WEATHER_GRID)
 
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
+
+def location_label(city_name):
+    """Display name: the gazetteer's, or the nearest place to coordinates."""
+    try:
+        coords = gazetteer.parse_coordinates(city_name)
+        if coords is None:
+            return gazetteer.resolve(city_name).label
+        place, km = gazetteer.nearest(*coords)[0]
+    except LookupError:
+        return city_name.title()
+    return f"{coords[0]:g}, {coords[1]:g} ({km:.0f} km from {place.label})"
+
+
+def weather_params(city_name):
+    lat, lon = city_coords(city_name)
+    return {
         "latitude": lat,
         "longitude": lon,
         "current_weather": True,
-        "timezone": "auto"
     }
 
+
+def fetch_weather(city_name, batcher=None):
+    """
+    Fetch current weather for a known city. Raises on any failure.
+
+    Pass a weather_batch.WeatherBatcher to share the request with other
+    threads looking up cities at the same moment.
+    """
+    if batcher is not None:
+        return batcher.fetch(*city_coords(city_name))
+
+    return api_client.get_json(WEATHER_URL, params=weather_params(city_name),
+                               timeout=10, cache=response_cache.default_cache)
+
+
+async def fetch_weather_async(city_name):
+    return await async_client.get_json(WEATHER_URL,
+                                       params=weather_params(city_name),
+                                       timeout=10,
+                                       cache=response_cache.default_cache)
+
+
+def get_weather(city_name):
     try:
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return fetch_weather(city_name)
     except requests.RequestException as e:
         print("Weather Error:", e)
         return None
+    except LookupError as e:
+        # Not found, or ambiguous with the matching cities listed
+        print(e)
+        return None
+
+
+async def get_weather_async(city_name):
+    try:
+        return await fetch_weather_async(city_name)
+    except async_client.REQUEST_ERRORS as e:
+        print("Weather Error:", e)
+        return None
+    except LookupError as e:
+        # Not found, or ambiguous with the matching cities listed
+        print(e)
+        return None
+
+
+def get_weather_many(cities, max_workers=fanout.DEFAULT_MAX_WORKERS):
+    """
+    Fetch several cities using Open-Meteo multi-location requests.
+
+    Up to weather_batch.MAX_LOCATIONS cities share one request; larger
+    lists are split into chunks sent concurrently. Results keep the input
+    order; each successful "data" is the same dict get_weather returns.
+    """
+    cities = list(cities)
+    results = [None] * len(cities)
+    known = []
+    coords = []
+
+    for index, city_name in enumerate(cities):
+        try:
+            coords.append(city_coords(city_name))
+            known.append(index)
+        except LookupError as e:
+            results[index] = {"success": False, "error": str(e)}
+
+    batch = weather_batch.fetch_many(coords, max_workers=max_workers,
+                                     cache=response_cache.default_cache)
+    for index, result in zip(known, batch):
+        results[index] = result
+
+    for city_name, result in zip(cities, results):
+        result["item"] = city_name
+    return results
+
+
+def format_weather(city_name, weather):
+    """The weather card for a models.CurrentWeather record, as text."""
+    rule = "=" * 40
+    return (f"\n{rule}\n"
+            f" Weather in {location_label(city_name)}\n"
+            f"{rule}\n"
+            f" Temperature : {weather.temperature}°C\n"
+            f" Wind Speed  : {weather.windspeed} km/h\n"
+            f" Wind Dir    : {weather.winddirection}°\n"
+            f"{rule}")
+
+
+def print_weather(city_name, weather):
+    """Print a models.CurrentWeather record."""
+    print(format_weather(city_name, weather))
+
+
+def show_weather(city_name, data):
+    try:
+        print_weather(city_name, models.CurrentWeather.from_dict(data))
+    except models.ValidationError as e:
+        print("Weather Error:", e)
 
 
 def display_weather(city_name):
+    snapshot = live_snapshot("weather", city_name)
+    if snapshot is not None:
+        show_weather(city_name, snapshot.data)
+        print_age(snapshot)
+        return
+
     data = get_weather(city_name)
     if not data:
         return
 
-    weather = data["current_weather"]
-
-    print("\n" + "=" * 40)
-    print(f" Weather in {city_name.title()}")
-    print("=" * 40)
-    print(f" Temperature : {weather['temperature']}°C")
-    print(f" Wind Speed  : {weather['windspeed']} km/h")
-    print(f" Wind Dir    : {weather['winddirection']}°")
-    print("=" * 40)
+    show_weather(city_name, data)
 
 
 # ---------------- CRYPTO FUNCTIONS ----------------
-def get_crypto_price(coin_name):
+def ticker_url(coin_name):
     coin = coin_name.lower().strip()
     coin_id = CRYPTO_IDS.get(coin, coin)
+    return f"https://api.coinpaprika.com/v1/tickers/{coin_id}"
 
-    url = f"https://api.coinpaprika.com/v1/tickers/{coin_id}"
 
+def fetch_crypto_price(coin_name, fields=None):
+    """
+    Fetch the ticker for a coin name or coinpaprika ID. Raises on failure.
+
+    Pass fields=TICKER_FIELDS to decode only what the views print.
+    """
+    return api_client.get_json(ticker_url(coin_name), timeout=10,
+                               cache=response_cache.default_cache,
+                               fields=fields)
+
+
+async def fetch_crypto_price_async(coin_name, fields=None):
+    return await async_client.get_json(ticker_url(coin_name), timeout=10,
+                                       cache=response_cache.default_cache,
+                                       fields=fields)
+
+
+def get_crypto_price(coin_name, fields=None):
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.json()
+        return fetch_crypto_price(coin_name, fields=fields)
     except requests.RequestException as e:
         print("Crypto Error:", e)
         return None
 
 
+async def get_crypto_price_async(coin_name, fields=None):
+    try:
+        return await fetch_crypto_price_async(coin_name, fields=fields)
+    except async_client.REQUEST_ERRORS as e:
+        print("Crypto Error:", e)
+        return None
+
+
+def get_crypto_prices_many(coins, max_workers=fanout.DEFAULT_MAX_WORKERS,
+                           fields=None):
+    """Fetch several tickers concurrently. Results keep the input order."""
+    return fanout.map_ordered(
+        lambda coin: fetch_crypto_price(coin, fields=fields),
+        coins,
+        max_workers=max_workers,
+    )
+
+
+def format_crypto(ticker):
+    """The price card for a models.CoinTicker record, as text."""
+    rule = "=" * 40
+    return (f"\n{rule}\n"
+            f" {ticker.name} ({ticker.symbol})\n"
+            f"{rule}\n"
+            f" Price       : ${ticker.price:,.2f}\n"
+            f" Market Cap  : ${ticker.market_cap:,.0f}\n"
+            f" 24h Change  : {ticker.percent_change_24h:+.2f}%\n"
+            f"{rule}")
+
+
+def print_crypto(ticker):
+    """Print a models.CoinTicker record."""
+    print(format_crypto(ticker))
+
+
+def show_crypto(data):
+    try:
+        print_crypto(models.CoinTicker.from_dict(data))
+    except models.ValidationError as e:
+        print("Crypto Error:", e)
+
+
 def display_crypto(coin_name):
-    data = get_crypto_price(coin_name)
+    snapshot = live_snapshot("crypto", coin_name)
+    if snapshot is not None:
+        show_crypto(snapshot.data)
+        print_age(snapshot)
+        return
+
+    data = get_crypto_price(coin_name, fields=TICKER_FIELDS)
 
     if not data:
         print("Coin not found!")
         return
 
-    usd = data["quotes"]["USD"]
+    show_crypto(data)
+
+
+# ---------------- LIVE REFRESH ----------------
+# Not shorter than the cache TTLs, so each background refresh gets new data
+WEATHER_REFRESH = 60
+CRYPTO_REFRESH = 15
+
+# Enough workers for every city to wait on the batcher at once
+LIVE_WORKERS = 16
+
+live = None  # a refresher.Refresher while live mode is on
+
+# Cities come due together, so their refreshes share one batched request
+_live_batcher = weather_batch.WeatherBatcher()
+
+
+def start_live(cities=None, coins=None, weather_every=WEATHER_REFRESH,
+               crypto_every=CRYPTO_REFRESH):
+    """Keep the given cities and coins (default: all of them) warm."""
+    global live
+    if live is None:
+        live = refresher.Refresher(max_workers=LIVE_WORKERS)
+        live.start()
+
+    for city in CITIES if cities is None else cities:
+        city = city.lower().strip()
+        live.watch(("weather", city),
+                   lambda city=city: fetch_weather(city, batcher=_live_batcher),
+                   weather_every)
+    for coin in CRYPTO_IDS if coins is None else coins:
+        coin = coin.lower().strip()
+        live.watch(("crypto", coin),
+                   lambda coin=coin: fetch_crypto_price(coin, fields=TICKER_FIELDS),
+                   crypto_every)
+    return live
+
+
+def stop_live():
+    global live
+    if live is not None:
+        live.stop()
+        live = None
+
+
+def live_snapshot(kind, name):
+    """The warm snapshot for ("weather"|"crypto", name), or None."""
+    if live is None:
+        return None
+    snapshot = live.get((kind, name.lower().strip()))
+    if snapshot is None or snapshot.data is None:
+        return None
+    return snapshot
+
+
+def format_age(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f}s ago"
+    return f"{seconds // 60:.0f}m {seconds % 60:.0f}s ago"
+
+
+def print_age(snapshot):
+    line = f" Updated {format_age(snapshot.age)}"
+    if snapshot.error:
+        line += f" (last refresh failed: {snapshot.error})"
+    elif snapshot.refreshing:
+        line += " (refreshing...)"
+    print(line)
+
+
+# ---------------- PRICE WATCH ----------------
+# How each ticker field prints when it changes
+CHANGE_FORMATS = {
+    "price": ("Price", "${:,.2f}"),
+    "market_cap": ("Market Cap", "${:,.0f}"),
+    "percent_change_24h": ("24h Change", "{:+.2f}%"),
+    "rank": ("Rank", "#{}"),
+}
+
+
+def format_changes(update):
+    """A ticker_feed.Update as text: the full card first, then changes only."""
+    ticker = update.ticker
+    if update.initial:
+        return format_crypto(ticker)
+    parts = []
+    for name, value in update.changes.items():
+        label, fmt = CHANGE_FORMATS.get(name, (name, "{}"))
+        before = update.previous.get(name)
+        old = "?" if before is None else fmt.format(before)
+        parts.append(f"{label} {old} -> {fmt.format(value)}")
+    return f" {ticker.symbol}: " + ", ".join(parts)
+
+
+def watch_prices(coins=None, interval=CRYPTO_REFRESH):
+    """Print coins once, then only what changes, until Ctrl+C."""
+    feed = ticker_feed.TickerFeed(
+        lambda coin: fetch_crypto_price(coin, fields=TICKER_FIELDS),
+        interval=interval)
+    print(f"Watching prices (checked every {interval}s); Ctrl+C to stop.")
+    try:
+        with feed.subscribe(CRYPTO_IDS if coins is None else coins,
+                            lambda update: print(format_changes(update))):
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        feed.stop()
+
+
+# ---------------- MULTI VIEW ----------------
+def display_dashboard(cities, coins, max_workers=fanout.DEFAULT_MAX_WORKERS,
+                      processes=None):
+    """
+    Fetch all cities (batched) and coins in one concurrent round, then
+    print. With `processes` (default DASHBOARD_PROCESSES) the cards are
+    fetched on an asyncio loop and rendered in that many worker processes.
+    """
+    cities = list(cities)
+    coins = list(coins)
+    if processes is None:
+        processes = DASHBOARD_PROCESSES
+
+    # Live mode with everything warm: print the snapshots, no round trip
+    if (all(live_snapshot("weather", city) for city in cities)
+            and all(live_snapshot("crypto", coin) for coin in coins)):
+        for city in cities:
+            display_weather(city)
+        for coin in coins:
+            display_crypto(coin)
+        return
+
+    if processes and display_cards_in_processes(cities, coins, processes):
+        return
 
-    print("\n" + "=" * 40)
-    print(f" {data['name']} ({data['symbol']})")
-    print("=" * 40)
-    print(f" Price       : ${usd['price']:,.2f}")
-    print(f" Market Cap  : ${usd['market_cap']:,.0f}")
-    print(f" 24h Change  : {usd['percent_change_24h']:+.2f}%")
-    print("=" * 40)
+    calls = [lambda: get_weather_many(cities, max_workers=max_workers)]
+    calls += [lambda c=c: fetch_crypto_price(c, fields=TICKER_FIELDS)
+              for c in coins]
+    results = fanout.run_ordered(calls, max_workers=max_workers)
+
+    weather = results[0]
+    if weather["success"]:
+        weather_results = weather["data"]
+    else:
+        weather_results = [weather] * len(cities)
+
+    for city, result in zip(cities, weather_results):
+        if result["success"]:
+            show_weather(city, result["data"])
+        else:
+            print(f"\n{city.title()}: {result['error']}")
+
+    for coin, result in zip(coins, results[1:]):
+        if result["success"]:
+            show_crypto(result["data"])
+        else:
+            print(f"\n{coin}: {result['error']}")
+
+
+def display_cards_in_processes(cities, coins, processes):
+    """
+    Dashboard cards rendered by worker_pool; False if the pool could not
+    start (the caller then renders in-process).
+    """
+    import worker_pool  # imports this module, so not at the top
+
+    async def render():
+        async with worker_pool.WorkerPool(processes=processes) as pool:
+            return await asyncio.gather(
+                worker_pool.render_weather_many(pool, cities),
+                worker_pool.render_crypto_many(pool, coins))
+
+    try:
+        weather, crypto = asyncio.run(render())
+    except OSError as e:
+        print(f"Worker processes unavailable ({e}), rendering here.")
+        return False
+
+    for result in weather:
+        if result["success"]:
+            print(result["data"])
+        else:
+            print(f"\n{result['item'].title()}: {result['error']}")
+    for result in crypto:
+        if result["success"]:
+            print(result["data"])
+        else:
+            print(f"\n{result['item']}: {result['error']}")
+    return True
+
+
+# ---------------- COMPARISON TABLES ----------------
+def compare_cryptos(coins, max_workers=fanout.DEFAULT_MAX_WORKERS):
+    """Fetch tickers concurrently and return them as a columnar table."""
+    results = get_crypto_prices_many(coins, max_workers=max_workers,
+                                     fields=TICKER_FIELDS)
+    return columnar.ticker_table(r["data"] for r in results if r["success"])
+
+
+def compare_cities(cities, max_workers=fanout.DEFAULT_MAX_WORKERS):
+    """Fetch readings (batched) and return them as a columnar table."""
+    ok = [r for r in get_weather_many(cities, max_workers=max_workers)
+          if r["success"]]
+    return columnar.weather_table([r["item"] for r in ok],
+                                  [r["data"] for r in ok])
+
+
+def display_comparison(cities, coins):
+    tickers = compare_cryptos(coins).sort("percent_change_24h", descending=True)
+    print("\n=== Crypto Ranking (24h change) ===\n")
+    print(tickers.format({
+        "symbol": ("Coin", ""),
+        "price": ("Price ($)", ",.2f"),
+        "market_cap": ("Market Cap ($)", ",.0f"),
+        "percent_change_24h": ("24h %", "+.2f"),
+    }))
+    if len(tickers):
+        print(f"\nTotal market cap: ${tickers.sum('market_cap'):,.0f}")
+    _report_skipped(len(coins) - len(tickers), "coins")
+
+    weather = compare_cities(cities).sort("temperature", descending=True)
+    print("\n=== City Temperatures ===\n")
+    print(weather.format({
+        "city": ("City", ""),
+        "temperature": ("Temp (°C)", ".1f"),
+        "windspeed": ("Wind (km/h)", ".1f"),
+    }))
+    # Ranked on readings that have a temperature, like max()/min()
+    ranked = weather.dropna("temperature")
+    if len(ranked):
+        print(f"\nHottest: {ranked['city'][0].title()} "
+              f"({ranked.max('temperature')}°C), coldest: "
+              f"{ranked['city'][len(ranked) - 1].title()} "
+              f"({ranked.min('temperature')}°C)")
+    _report_skipped(len(cities) - len(weather), "cities")
+
+
+def _report_skipped(count, what):
+    if count > 0:
+        print(f"({count} of the {what} left out: request failed or data invalid)")
 
 
 # ---------------- DASHBOARD ----------------
@@ -124,12 +552,16 @@ def dashboard():
         print("1. Check Weather")
         print("2. Check Crypto Price")
         print("3. Quick Dashboard (Delhi + Bitcoin)")
-        print("4. Exit")
+        print("4. Full Dashboard (all cities + cryptos)")
+        print("5. Compare (ranked tables)")
+        print(f"6. Live Refresh ({'on' if live else 'off'})")
+        print("7. Watch Prices (changes only)")
+        print("8. Exit")
 
-        choice = input("Choose (1-4): ").strip()
+        choice = input("Choose (1-8): ").strip()
 
         if choice == "1":
-            print("Available cities:", ", ".join(CITIES.keys()))
+            print("Any city, e.g.", ", ".join(CITIES[:5]), "- or 'lat, lon'")
             city = input("Enter city: ")
             display_weather(city)
 
@@ -139,10 +571,27 @@ def dashboard():
             display_crypto(coin)
 
         elif choice == "3":
-            display_weather("delhi")
-            display_crypto("bitcoin")
+            display_dashboard(["delhi"], ["bitcoin"])
 
         elif choice == "4":
+            display_dashboard(CITIES, CRYPTO_IDS.keys())
+
+        elif choice == "5":
+            display_comparison(CITIES, CRYPTO_IDS.keys())
+
+        elif choice == "6":
+            if live is None:
+                start_live()
+                print("Live refresh on: views now show warm data and its age.")
+            else:
+                stop_live()
+                print("Live refresh off.")
+
+        elif choice == "7":
+            watch_prices()
+
+        elif choice == "8":
+            stop_live()
             print("Goodbye! 👋")
             break
 
@@ -156,7 +605,7 @@ if __name__ == "__main__":
 
 # --- CHALLENGE EXERCISES ---
 #
-# Exercise 1: Add more cities to the CITIES dictionary
+# Exercise 1: Add more cities to gazetteer.csv
 #             Find coordinates at: https://www.latlong.net/
 #
 # Exercise 2: Create a function that compares prices of multiple cryptos
@@ -0,0 +1,107 @@
+"""
+Rate Limiter: Per-Host Token Buckets
+====================================
+
+Client-side throttling so we stay under coinpaprika / open-meteo limits
+instead of being throttled by them.
+
+Each limited host has a token bucket refilled at `rate` tokens per second,
+holding at most `burst`. A caller reserves a token and then waits until
+its reservation comes due, so concurrent callers are served in order and
+total throughput sits right at the allowed ceiling. acquire() sleeps the
+thread; acquire_async() awaits asyncio.sleep and never blocks the loop.
+"""
+
+import asyncio
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+# ---------------- TOKEN BUCKET ----------------
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+        self.granted = 0
+        self.waited = 0.0
+
+    def _reserve(self, tokens, timeout):
+        """Take `tokens` now and return how long to wait, or None if too long."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst,
+                               self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = max(0.0, (tokens - self._tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                return None
+
+            self._tokens -= tokens
+            self.granted += tokens
+            self.waited += wait
+            return wait
+
+    def try_acquire(self, tokens=1):
+        return self._reserve(tokens, timeout=0.0) is not None
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until `tokens` are available. False if timeout would pass."""
+        wait = self._reserve(tokens, timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, tokens=1, timeout=None):
+        wait = self._reserve(tokens, timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def stats(self):
+        return {"rate": self.rate, "burst": self.burst,
+                "granted": self.granted, "waited_seconds": round(self.waited, 3)}
+
+
+# ---------------- PER-HOST REGISTRY ----------------
+_limiters = {}
+_lock = threading.Lock()
+
+
+def _host(url_or_host):
+    if "://" in url_or_host:
+        return urlsplit(url_or_host).hostname or ""
+    return url_or_host.lower()
+
+
+def set_limit(host, rate, burst=None):
+    """Limit requests to `host` (a hostname or any URL on it)."""
+    with _lock:
+        _limiters[_host(host)] = TokenBucket(rate, burst)
+
+
+def remove_limit(host):
+    with _lock:
+        _limiters.pop(_host(host), None)
+
+
+def limiter_for(url):
+    """Return the TokenBucket for the URL's host, or None if unlimited."""
+    return _limiters.get(_host(url))
+
+
+def stats():
+    with _lock:
+        return {host: bucket.stats() for host, bucket in _limiters.items()}
@@ -0,0 +1,247 @@
+"""
+Refresher: Keep a Watch List Warm in the Background
+===================================================
+
+A background scheduler that refreshes each watched entry (a city's
+weather, a coin's ticker, ...) on its own interval, so views read a warm
+snapshot instead of waiting for a round trip.
+
+- stale-while-revalidate: get() never blocks. It returns the last good
+  data with its age, and if that data is older than the interval it only
+  triggers a refresh in the background.
+- stale-if-error: a failed refresh keeps the previous data. The error is
+  reported alongside, and the entry is retried sooner.
+- coalescing: every watcher of the same key shares one entry, and a key
+  is never refreshed twice at the same time.
+
+on_refresh(key, data), if given, is called on the worker thread after
+each successful refresh, e.g. to push changes (see ticker_feed). The key
+counts as refreshing until it returns, so calls for one key never
+overlap and arrive in refresh order.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_ERROR_RETRY = 5.0
+
+
+class Snapshot:
+    __slots__ = ("key", "data", "error", "age", "refreshing")
+
+    def __init__(self, key, data, error, age, refreshing):
+        self.key = key
+        self.data = data
+        self.error = error
+        self.age = age
+        self.refreshing = refreshing
+
+    def __repr__(self):
+        age = "never" if self.age is None else f"{self.age:.1f}s"
+        return f"Snapshot({self.key!r}, age={age}, error={self.error!r})"
+
+
+class _Entry:
+    __slots__ = ("key", "fetch", "interval", "watchers", "data", "error",
+                 "updated_at", "next_due", "refreshing", "refreshes", "failures")
+
+    def __init__(self, key, fetch, interval, now):
+        self.key = key
+        self.fetch = fetch
+        self.interval = interval
+        self.watchers = 1
+        self.data = None
+        self.error = None
+        self.updated_at = None
+        self.next_due = now
+        self.refreshing = False
+        self.refreshes = 0
+        self.failures = 0
+
+
+class Refresher:
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS,
+                 error_retry=DEFAULT_ERROR_RETRY, on_refresh=None):
+        self.error_retry = error_retry
+        self.on_refresh = on_refresh
+        self.max_workers = max_workers
+        self._entries = {}
+        self._cond = threading.Condition()
+        self._pool = None       # created by start(), shut down by stop()
+        self._thread = None
+        self._stopped = False
+
+    # ---- watch list ----
+    def watch(self, key, fetch, interval):
+        """
+        Keep `key` warm by calling fetch() every `interval` seconds. Watching
+        a key again adds a watcher and keeps the shorter interval.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._entries[key] = _Entry(key, fetch, interval, time.monotonic())
+            else:
+                entry.watchers += 1
+                if interval < entry.interval:
+                    entry.interval = interval
+                    entry.next_due = min(entry.next_due,
+                                         self._updated(entry) + interval)
+            self._cond.notify()
+
+    def unwatch(self, key):
+        """Drop one watcher; the entry goes away with its last watcher."""
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.watchers -= 1
+                if entry.watchers <= 0:
+                    del self._entries[key]
+
+    def keys(self):
+        with self._cond:
+            return list(self._entries)
+
+    # ---- reads ----
+    def get(self, key):
+        """The current snapshot of `key` (never blocks), or None if unwatched."""
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            now = time.monotonic()
+            age = None if entry.updated_at is None else now - entry.updated_at
+            if age is not None and age > entry.interval and not entry.refreshing:
+                entry.next_due = now  # stale: revalidate in the background
+                self._cond.notify()
+            return Snapshot(key, entry.data, entry.error, age, entry.refreshing)
+
+    def refresh(self, key):
+        """Ask for a refresh of `key` now (no-op while one is running)."""
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is not None and not entry.refreshing:
+                entry.next_due = time.monotonic()
+                self._cond.notify()
+
+    def wait_ready(self, keys=None, timeout=None):
+        """Block until every key has data or an error; True if all did."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                entries = [self._entries[k] for k in (keys or self._entries)
+                           if k in self._entries]
+                if all(e.updated_at is not None or e.error for e in entries):
+                    return True
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+
+    # ---- scheduler ----
+    def start(self):
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="refresher")
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name="refresher-scheduler")
+            self._thread.start()
+
+    def stop(self):
+        """Stop scheduling; refreshes already running finish on their own."""
+        with self._cond:
+            self._stopped = True
+            thread, self._thread = self._thread, None
+            pool, self._pool = self._pool, None
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join()
+        if pool is not None:
+            # No wait: stop() may be called from an on_refresh callback
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _updated(self, entry):
+        if entry.updated_at is None:
+            return time.monotonic()
+        return entry.updated_at
+
+    def _run(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                wait = None
+                for entry in self._entries.values():
+                    if entry.refreshing:
+                        continue
+                    if entry.next_due <= now:
+                        entry.refreshing = True
+                        future = self._pool.submit(self._refresh, entry)
+                        future.add_done_callback(
+                            lambda f, entry=entry: self._cancelled(f, entry))
+                    else:
+                        due_in = entry.next_due - now
+                        wait = due_in if wait is None else min(wait, due_in)
+                self._cond.wait(wait)
+
+    def _cancelled(self, future, entry):
+        # stop() drops queued refreshes; let a later start() schedule them
+        if future.cancelled():
+            with self._cond:
+                entry.refreshing = False
+                self._cond.notify_all()
+
+    def _refresh(self, entry):
+        try:
+            data = entry.fetch()
+        except Exception as e:
+            with self._cond:
+                entry.error = str(e) or type(e).__name__
+                entry.failures += 1
+                retry_in = min(entry.interval, self.error_retry)
+                entry.next_due = time.monotonic() + retry_in
+                entry.refreshing = False
+                self._cond.notify_all()
+            return
+
+        with self._cond:
+            entry.data = data
+            entry.error = None
+            entry.updated_at = time.monotonic()
+            entry.refreshes += 1
+            entry.next_due = entry.updated_at + entry.interval
+            self._cond.notify_all()
+
+        try:
+            if self.on_refresh is not None:
+                self.on_refresh(entry.key, data)
+        finally:
+            # Only now can the next refresh of this key start
+            with self._cond:
+                entry.refreshing = False
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            return {
+                key: {
+                    "interval": entry.interval,
+                    "watchers": entry.watchers,
+                    "age": (None if entry.updated_at is None
+                            else now - entry.updated_at),
+                    "refreshes": entry.refreshes,
+                    "failures": entry.failures,
+                    "error": entry.error,
+                }
+                for key, entry in self._entries.items()
+            }
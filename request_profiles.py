@@ -0,0 +1,66 @@
+"""
+Request Profiles: Per-Endpoint Query Defaults
+=============================================
+
+Some APIs can trim their own answers: coinpaprika returns only the quote
+currencies asked for with `quotes=`. A profile holds such parameters for
+one endpoint, and api_client / async_client add them to every matching
+request, so each fetcher gets the smaller payload without spelling the
+parameters out. The caller's own parameters always win.
+
+Compression is negotiated separately, in the clients' session headers.
+"""
+
+from urllib.parse import parse_qsl, urlsplit
+
+
+# ---------------- PROFILES ----------------
+# Matched against "host/path"; the longest matching prefix wins.
+DEFAULT_PROFILES = {
+    "api.coinpaprika.com/v1/tickers": {"quotes": "USD"},
+}
+
+_profiles = dict(DEFAULT_PROFILES)
+
+
+def set_profile(prefix, params):
+    """Use `params` as the defaults for URLs under `prefix` (None removes it)."""
+    if params is None:
+        _profiles.pop(prefix, None)
+    else:
+        _profiles[prefix] = dict(params)
+
+
+def reset():
+    _profiles.clear()
+    _profiles.update(DEFAULT_PROFILES)
+
+
+def profile_for(url):
+    """The default params for `url`, or None."""
+    parts = urlsplit(url)
+    target = parts.netloc.lower() + parts.path
+    best, found = -1, None
+    for prefix, params in _profiles.items():
+        if target.startswith(prefix) and len(prefix) > best:
+            best, found = len(prefix), params
+    return found
+
+
+def apply(url, params=None):
+    """
+    Return `params` with the profile defaults for `url` filled in.
+
+    Parameters already in the URL's query string or in `params` are left
+    alone. Non-dict params (lists of pairs, strings) are passed through.
+    """
+    defaults = profile_for(url)
+    if not defaults or (params is not None and not isinstance(params, dict)):
+        return params
+
+    given = {name for name, _ in
+             parse_qsl(urlsplit(url).query, keep_blank_values=True)}
+    merged = {name: value for name, value in defaults.items()
+              if name not in given}
+    merged.update(params or {})
+    return merged
@@ -0,0 +1,350 @@
+"""
+Response Cache: TTL + LRU with Conditional GETs
+===============================================
+
+In-memory cache for parsed JSON responses.
+
+- Per-endpoint TTLs: JSONPlaceholder users/posts barely change, coinpaprika
+  tickers are fine a few seconds old.
+- Bounded memory: least recently used entries are evicted once either the
+  entry count or the total body size goes over its limit.
+- Revalidation: stale entries keep their ETag / Last-Modified, so the next
+  request is a conditional GET and a 304 answer counts as a cache hit.
+- Isolation: an entry keeps its own copy of the data and hands out copies
+  (CacheEntry.value()), so a caller changing a result cannot change what
+  later callers get.
+
+An optional disk_cache.DiskCache second tier keeps entries across restarts
+and shares them between worker processes. Set API_CACHE_PATH to turn it on
+for the default cache, or call enable_disk_cache().
+
+api_client.get_json() does the HTTP side; this module only stores entries.
+async_client uses get_async(), store_async() and revalidated_async(),
+which run the disk tier's SQLite calls in a worker thread so the event
+loop never waits on the database.
+"""
+
+import asyncio
+import copy
+import functools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import disk_cache
+import json_decode
+
+
+# ---------------- DEFAULT TTLS (seconds) ----------------
+# Matched against "host/path"; the longest matching prefix wins.
+DEFAULT_TTLS = {
+    "jsonplaceholder.typicode.com": 3600,
+    "api.coinpaprika.com/v1/tickers": 5,
+    "api.open-meteo.com/v1/forecast": 60,
+}
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+CACHE_PATH_ENV = "API_CACHE_PATH"
+
+
+# ---------------- KEYS ----------------
+def make_key(url, params=None):
+    """Normalize a URL plus params into a stable cache key."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+
+    if params:
+        items = params.items() if hasattr(params, "items") else params
+        for name, value in items:
+            if isinstance(value, (list, tuple)):
+                query.extend((name, str(v)) for v in value)
+            elif value is not None:
+                query.append((name, str(value)))
+
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or "/",
+        urlencode(sorted(query)),
+        "",
+    ))
+
+
+# ---------------- ENTRY ----------------
+class CacheEntry:
+    __slots__ = ("key", "data", "size", "etag", "last_modified", "expires_at")
+
+    def __init__(self, key, data, size, etag=None, last_modified=None,
+                 expires_at=0.0):
+        self.key = key
+        self.data = data
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    def value(self):
+        """A private copy of the data, safe for the caller to change."""
+        return copy.deepcopy(self.data)
+
+    def is_fresh(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        return now < self.expires_at
+
+    def validators(self):
+        """Headers for a conditional GET."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+# ---------------- CACHE ----------------
+class ResponseCache:
+    def __init__(self, ttls=None, default_ttl=0, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, disk=None):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk = disk
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.evictions = 0
+        self.disk_hits = 0
+
+    # ---- policy ----
+    def ttl_for(self, key):
+        parts = urlsplit(key)
+        target = parts.netloc + parts.path
+        best, ttl = -1, self.default_ttl
+        for prefix, seconds in self.ttls.items():
+            if target.startswith(prefix) and len(prefix) > best:
+                best, ttl = len(prefix), seconds
+        return ttl
+
+    # ---- lookups ----
+    def get(self, key, revalidate=False):
+        """
+        Return (entry, fresh). A fresh entry counts as a hit; a stale one is
+        returned so the caller can revalidate it. revalidate=True reports
+        every entry as stale, for callers with a tighter staleness bound
+        than the TTL.
+
+        A stale memory entry is only returned after the disk tier, which
+        another process may have refreshed, has no fresh one either.
+        """
+        found = self._get_memory(key, revalidate)
+        if not self._check_disk(found, revalidate):
+            return found or (None, False)
+        loaded = self._load_from_disk(key, revalidate,
+                                      fresh_only=found is not None)
+        return found if loaded[0] is None and found is not None else loaded
+
+    async def get_async(self, key, revalidate=False):
+        """get() for coroutines: a disk lookup runs in a worker thread."""
+        found = self._get_memory(key, revalidate)
+        if not self._check_disk(found, revalidate):
+            return found or (None, False)
+        loaded = await asyncio.to_thread(self._load_from_disk, key, revalidate,
+                                         found is not None)
+        return found if loaded[0] is None and found is not None else loaded
+
+    def _check_disk(self, found, revalidate):
+        # Memory missed, or holds a stale entry the disk may have refreshed
+        # (under revalidate=True nothing on disk counts as fresh either)
+        if self.disk is None:
+            return False
+        return found is None or not (found[1] or revalidate)
+
+    def _get_memory(self, key, revalidate=False):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            fresh = entry.is_fresh() and not revalidate
+            if fresh:
+                self.hits += 1
+            return entry, fresh
+
+    def _load_from_disk(self, key, revalidate=False, fresh_only=False):
+        # fresh_only: a stale row is ignored, keeping the memory entry
+        row = self.disk.get(key)
+        if row is None:
+            return None, False
+
+        try:
+            data = json_decode.loads(row["body"])
+        except ValueError:
+            self.disk.delete(key)
+            return None, False
+
+        remaining = row["expires_at"] - time.time()
+        entry = CacheEntry(key, data, len(row["body"]), row["etag"],
+                           row["last_modified"], time.monotonic() + remaining)
+        fresh = remaining > 0 and not revalidate
+        if fresh_only and not fresh:
+            return None, False
+
+        with self._lock:
+            self.disk_hits += 1
+            if fresh:
+                self.hits += 1
+            self._insert(entry)
+        return entry, fresh
+
+    def store(self, key, data, size, headers=None, body=None):
+        """
+        Cache a fresh 200 response. `size` is the body length in bytes; pass
+        the raw `body` as well to write it through to the disk tier.
+        """
+        entry, write = self._store(key, data, size, headers, body)
+        if write is not None:
+            write()
+        return entry
+
+    async def store_async(self, key, data, size, headers=None, body=None):
+        entry, write = self._store(key, data, size, headers, body)
+        if write is not None:
+            await asyncio.to_thread(write)
+        return entry
+
+    def _store(self, key, data, size, headers, body):
+        # Returns (entry, disk write to run or None)
+        headers = headers or {}
+        ttl = self.ttl_for(key)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+
+        with self._lock:
+            self.misses += 1
+            if ttl <= 0 and not (etag or last_modified):
+                return None, None
+            if size > self.max_bytes:
+                return None, None
+
+            # The caller keeps `data`; the entry gets its own copy
+            entry = CacheEntry(key, copy.deepcopy(data), size, etag,
+                               last_modified, time.monotonic() + ttl)
+            self._insert(entry)
+
+        if self.disk is None or body is None:
+            return entry, None
+        return entry, functools.partial(self.disk.put, key, body,
+                                        time.time() + ttl, etag, last_modified)
+
+    def revalidated(self, entry, headers=None):
+        """A 304 came back: extend the entry and count it as a hit."""
+        write = self._revalidated(entry, headers)
+        if write is not None:
+            write()
+
+    async def revalidated_async(self, entry, headers=None):
+        write = self._revalidated(entry, headers)
+        if write is not None:
+            await asyncio.to_thread(write)
+
+    def _revalidated(self, entry, headers):
+        headers = headers or {}
+        ttl = self.ttl_for(entry.key)
+        with self._lock:
+            self.hits += 1
+            self.revalidations += 1
+            entry.expires_at = time.monotonic() + ttl
+            entry.etag = headers.get("ETag", entry.etag)
+            entry.last_modified = headers.get("Last-Modified", entry.last_modified)
+
+        if self.disk is None:
+            return None
+        return functools.partial(self.disk.touch, entry.key, time.time() + ttl,
+                                 headers.get("ETag"), headers.get("Last-Modified"))
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    # ---- housekeeping ----
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk is not None:
+            self.disk.clear()
+
+    def _insert(self, entry):
+        self._remove(entry.key)
+        self._entries[entry.key] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    def _remove(self, key):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old.size
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._bytes > self.max_bytes):
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidations": self.revalidations,
+                "evictions": self.evictions,
+                "disk_hits": self.disk_hits,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+default_cache = ResponseCache()
+
+
+def enable_disk_cache(path, max_bytes=None, cache=None):
+    """Attach a persistent disk tier to `cache` (the default cache if None)."""
+    cache = default_cache if cache is None else cache
+    if max_bytes is None:
+        max_bytes = disk_cache.DEFAULT_MAX_BYTES
+    cache.disk = disk_cache.DiskCache(path, max_bytes=max_bytes)
+    return cache.disk
+
+
+if os.environ.get(CACHE_PATH_ENV):
+    try:
+        enable_disk_cache(os.environ[CACHE_PATH_ENV])
+    except sqlite3.Error as e:
+        # An unusable file only costs the disk tier, not the process
+        logging.getLogger(__name__).warning(
+            "Disk cache %s disabled: %s", os.environ[CACHE_PATH_ENV], e)
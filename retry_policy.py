@@ -0,0 +1,198 @@
+"""
+Retry Policy: Backoff, Jitter, Budgets and Retry-After
+======================================================
+
+Decides whether a failed attempt should be retried and how long to wait.
+
+- Exponential backoff with full jitter: wait a random time between 0 and
+  min(max_delay, base_delay * 2 ** (attempt - 1)), so workers that failed
+  together do not retry together.
+- Retry budget: a per-process token bucket. Every request deposits `ratio`
+  tokens and every retry spends one, so retries stay a bounded share of
+  traffic even when a whole host is down.
+- Retry-After: honoured on 429/503 (seconds or an HTTP date).
+- Only idempotent methods are retried on 5xx and transport errors.
+
+Every decision is counted (see stats()), logged at DEBUG level and passed
+to the optional on_decision callback.
+"""
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+RETRY_AFTER_STATUSES = (429, 503)
+
+
+# ---------------- RETRY-AFTER ----------------
+def parse_retry_after(value, now=None):
+    """Return the Retry-After delay in seconds, or None if unparseable."""
+    if value is None:
+        return None
+
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+
+    now = now or datetime.now(timezone.utc)
+    return max((when - now).total_seconds(), 0.0)
+
+
+# ---------------- RETRY BUDGET ----------------
+class RetryBudget:
+    """Token bucket that caps retries as a share of total requests."""
+
+    def __init__(self, ratio=0.2, min_per_second=1.0, max_tokens=10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.max_tokens,
+            self._tokens + (now - self._updated) * self.min_per_second,
+        )
+        self._updated = now
+
+    def record_request(self):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    @property
+    def tokens(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+# ---------------- DECISIONS ----------------
+class RetryDecision:
+    __slots__ = ("retry", "delay", "reason")
+
+    def __init__(self, retry, delay=0.0, reason=""):
+        self.retry = retry
+        self.delay = delay
+        self.reason = reason
+
+    def __repr__(self):
+        return (f"RetryDecision(retry={self.retry}, delay={self.delay:.3f}, "
+                f"reason={self.reason!r})")
+
+
+class RetryPolicy:
+    """
+    Default retry rules. Subclass and override decide() or backoff() to
+    plug in different behaviour.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=10.0,
+                 max_retry_after=60.0, retry_statuses=RETRY_STATUSES,
+                 budget=None, on_decision=None, rng=random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.retry_statuses = tuple(retry_statuses)
+        self.budget = RetryBudget() if budget is None else budget
+        self.on_decision = on_decision
+        self.rng = rng
+
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        """Full jitter: uniform in [0, min(max_delay, base * 2^(attempt-1))]."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return self.rng() * ceiling
+
+    def record_request(self):
+        """Call once per logical request so the budget can grow."""
+        self.budget.record_request()
+        self._count("requests")
+
+    def decide(self, attempt, status=None, error=None, retry_after=None,
+               method="GET", max_attempts=None):
+        """
+        Decide what to do after `attempt` failed.
+
+        Pass the HTTP `status` for error responses, or the transport `error`
+        for connection failures and timeouts.
+        """
+        limit = self.max_attempts if max_attempts is None else max_attempts
+        decision = self._decide(attempt, limit, status, error, retry_after,
+                                method.upper())
+
+        self._count(decision.reason)
+        logger.debug("retry attempt=%s status=%s error=%s -> %r",
+                     attempt, status, type(error).__name__ if error else None,
+                     decision)
+        if self.on_decision is not None:
+            self.on_decision(attempt, status, error, decision)
+        return decision
+
+    def _decide(self, attempt, limit, status, error, retry_after, method):
+        if status is not None and status not in self.retry_statuses:
+            return RetryDecision(False, reason="give_up_status")
+        if method not in IDEMPOTENT_METHODS and status != 429:
+            return RetryDecision(False, reason="give_up_not_idempotent")
+
+        if attempt >= limit:
+            return RetryDecision(False, reason="give_up_attempts")
+
+        delay = self.backoff(attempt)
+        reason = "retry_status" if status is not None else "retry_error"
+
+        if status in RETRY_AFTER_STATUSES:
+            wait = parse_retry_after(retry_after)
+            if wait is not None:
+                if wait > self.max_retry_after:
+                    return RetryDecision(False, reason="give_up_retry_after")
+                delay, reason = wait, "retry_after"
+
+        if not self.budget.try_spend():
+            return RetryDecision(False, reason="give_up_budget")
+
+        return RetryDecision(True, delay, reason)
+
+    # ---- instrumentation ----
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+        counts["budget_tokens"] = round(self.budget.tokens, 3)
+        return counts
+
+
+default_policy = RetryPolicy()
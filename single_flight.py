@@ -0,0 +1,156 @@
+"""
+Single Flight: Coalesce Duplicate In-Flight Calls
+=================================================
+
+When many callers ask for the same thing at the same moment (user 3, the
+btc-bitcoin ticker, ...), only the first one, the leader, runs the call.
+Everyone else waits for the leader's result (or exception) and gets its
+own copy of it, so one caller changing what it got cannot surprise the
+others. Once the call finishes the key is free again, so this is
+coalescing, not caching.
+
+Callers only share a call when everything that shapes its outcome
+matches: flight_key() folds the cache, timeout, headers and other
+options into the key.
+
+- SingleFlight      : for threads
+- AsyncSingleFlight : for coroutines on an event loop
+"""
+
+import asyncio
+import copy
+import threading
+
+
+def flight_key(key, cache=None, options=None):
+    """`key` plus the cache and request options (timeout, headers, ...)."""
+    parts = [key, f"cache={None if cache is None else id(cache)}"]
+    for name, value in sorted((options or {}).items()):
+        if isinstance(value, dict):
+            value = sorted(value.items())
+        parts.append(f"{name}={value!r}")
+    return "|".join(parts)
+
+
+def _private(result):
+    # Decoded JSON: plain dicts and lists, cheap enough to copy
+    return copy.deepcopy(result)
+
+
+def _private_error(error):
+    try:
+        return copy.copy(error)
+    except Exception:
+        return error
+
+
+# ---------------- THREADS ----------------
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.deduplicated = 0
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers using the same key."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.deduplicated += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise _private_error(call.error) from None
+            return _private(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "deduplicated": self.deduplicated,
+                "in_flight": len(self._calls),
+            }
+
+
+# ---------------- ASYNCIO ----------------
+class AsyncSingleFlight:
+    def __init__(self):
+        self._tasks = {}
+        self.calls = 0
+        self.deduplicated = 0
+
+    async def do(self, key, coro_fn):
+        """Await coro_fn() once for all concurrent callers using the same key."""
+        loop = asyncio.get_running_loop()
+        self.calls += 1
+
+        task = self._tasks.get(key)
+        leader = not (task is not None and task.get_loop() is loop
+                      and not task.done())
+        if leader:
+            task = loop.create_task(coro_fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        else:
+            self.deduplicated += 1
+
+        # shield: a cancelled waiter must not cancel the shared call
+        if leader:
+            return await asyncio.shield(task)
+        try:
+            result = await asyncio.shield(task)
+        except Exception as e:
+            raise _private_error(e) from None
+        return _private(result)
+
+    def _forget(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved even if nobody awaited it
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self._tasks),
+        }
+
+
+default_group = SingleFlight()
+default_async_group = AsyncSingleFlight()
+
+
+def stats():
+    """Counters for the default groups used by api_client/async_client."""
+    return {"threads": default_group.stats(), "asyncio": default_async_group.stats()}
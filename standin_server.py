@@ -0,0 +1,445 @@
+"""
+Stand-In Server: Local Replica of the Public APIs
+=================================================
+
+A small threaded HTTP(S) server answering the same paths, with the same
+payload shapes, as the three APIs the parts use:
+
+    JSONPlaceholder : /users, /users/<id>, /posts, /posts/<id>,
+                      /posts/<id>/comments, /todos, /comments
+                      (field filters, _start/_limit, _page/_limit)
+    Open-Meteo      : /v1/forecast (single and multi-location; each
+                      location's reading depends on its coordinates)
+    coinpaprika     : /v1/tickers/<id> (ids in COIN_IDS, others are 404)
+
+Knobs for benchmarks: fixed latency plus random jitter, occasional
+stalls (a share of requests held for extra seconds, the slow tail that
+hedging targets), an error rate (503 responses), and padding bytes
+added to every object to grow payloads. Responses carry an ETag and
+honour If-None-Match; bodies are gzip/deflate compressed when the client
+accepts it (--no-compress turns that off), and tickers honour
+coinpaprika's quotes= filter.
+
+Run it directly and point the parts at it:
+
+    python standin_server.py --port 8080 --latency 0.02
+    API_REDIRECTS=jsonplaceholder.typicode.com=http://127.0.0.1:8080,\\
+    api.open-meteo.com=http://127.0.0.1:8080,\\
+    api.coinpaprika.com=http://127.0.0.1:8080 python part5_real_api.py
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import re
+import ssl
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+HOSTS = ("jsonplaceholder.typicode.com", "api.open-meteo.com",
+         "api.coinpaprika.com")
+
+
+# ---------------- PAYLOADS ----------------
+_WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do "
+          "eiusmod tempor incididunt ut labore et dolore magna aliqua").split()
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def build_dataset(seed=0):
+    """JSONPlaceholder-shaped collections (10/100/200/500 items)."""
+    rng = random.Random(seed)
+    cities = ("Gwenborough", "Wisokyburgh", "McKenziehaven", "South Elvis",
+              "Roscoeview", "South Christy", "Howemouth", "Aliyaview",
+              "Bartholomebury", "Lebsackbury")
+    users = [{
+        "id": i,
+        "name": f"User {i}",
+        "username": f"user{i}",
+        "email": f"user{i}@example.com",
+        "address": {
+            "street": f"{rng.randint(1, 999)} {_sentence(rng, 1).title()} St",
+            "suite": f"Apt. {rng.randint(100, 999)}",
+            "city": cities[i - 1],
+            "zipcode": f"{rng.randint(10000, 99999)}",
+            "geo": {"lat": f"{rng.uniform(-90, 90):.4f}",
+                    "lng": f"{rng.uniform(-180, 180):.4f}"},
+        },
+        "phone": f"1-770-736-{rng.randint(1000, 9999)}",
+        "website": f"user{i}.org",
+        "company": {"name": f"Company {i}",
+                    "catchPhrase": _sentence(rng, 4),
+                    "bs": _sentence(rng, 3)},
+    } for i in range(1, 11)]
+    posts = [{"userId": (i - 1) // 10 + 1, "id": i,
+              "title": _sentence(rng, 6), "body": _sentence(rng, 30)}
+             for i in range(1, 101)]
+    todos = [{"userId": (i - 1) // 20 + 1, "id": i,
+              "title": _sentence(rng, 5), "completed": rng.random() < 0.45}
+             for i in range(1, 201)]
+    comments = [{"postId": (i - 1) // 5 + 1, "id": i,
+                 "name": _sentence(rng, 5), "email": f"c{i}@example.com",
+                 "body": _sentence(rng, 25)}
+                for i in range(1, 501)]
+    return {"users": users, "posts": posts, "todos": todos,
+            "comments": comments}
+
+
+def forecast(lat, lon, rng):
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "generationtime_ms": round(rng.uniform(0.01, 0.1), 6),
+        "utc_offset_seconds": 0,
+        "timezone": "GMT",
+        "timezone_abbreviation": "GMT",
+        "elevation": round(rng.uniform(0, 500), 1),
+        "current_weather_units": {
+            "time": "iso8601", "interval": "seconds",
+            "temperature": "°C", "windspeed": "km/h",
+            "winddirection": "°", "is_day": "", "weathercode": "wmo code",
+        },
+        "current_weather": {
+            "time": time.strftime("%Y-%m-%dT%H:%M", time.gmtime()),
+            "interval": 900,
+            "temperature": round(rng.uniform(-10, 40), 1),
+            "windspeed": round(rng.uniform(0, 40), 1),
+            "winddirection": rng.randint(0, 359),
+            "is_day": 1,
+            "weathercode": rng.choice((0, 1, 2, 3, 45, 61, 80)),
+        },
+    }
+
+
+# Units of each quote currency per US dollar
+QUOTE_RATES = {"USD": 1.0, "EUR": 0.92, "GBP": 0.79, "JPY": 151.0,
+               "INR": 83.0, "BTC": 1 / 65000, "ETH": 1 / 3400}
+
+
+def _quote(usd, rate):
+    return {name: value * rate if name in ("price", "volume_24h", "market_cap",
+                                           "ath_price") else value
+            for name, value in usd.items()}
+
+
+# The coins the stand-in knows; any other id gets coinpaprika's 404
+COIN_IDS = (
+    "btc-bitcoin",
+    "eth-ethereum",
+    "usdt-tether",
+    "bnb-binance-coin",
+    "sol-solana",
+    "xrp-xrp",
+    "doge-dogecoin",
+    "ada-cardano",
+    "dot-polkadot",
+    "ltc-litecoin",
+)
+
+
+def ticker(coin_id, rng, quotes=("USD",)):
+    symbol, _, name = coin_id.partition("-")
+    price = rng.uniform(0.05, 70000)
+    usd = {
+        "price": price,
+        "volume_24h": price * rng.uniform(1e5, 1e7),
+        "volume_24h_change_24h": rng.uniform(-20, 20),
+        "market_cap": price * rng.uniform(1e6, 1e9),
+        "market_cap_change_24h": rng.uniform(-10, 10),
+        "ath_price": price * rng.uniform(1, 3),
+        "ath_date": "2021-11-10T16:51:15Z",
+        "percent_from_price_ath": rng.uniform(-90, 0),
+    }
+    for window in ("15m", "30m", "1h", "6h", "12h", "24h", "7d", "30d", "1y"):
+        usd[f"percent_change_{window}"] = round(rng.uniform(-15, 15), 2)
+    return {
+        "id": coin_id,
+        "name": name.replace("-", " ").title() or coin_id,
+        "symbol": symbol.upper(),
+        "rank": rng.randint(1, 100),
+        "circulating_supply": rng.randint(10**6, 10**11),
+        "total_supply": rng.randint(10**6, 10**11),
+        "max_supply": 0,
+        "beta_value": round(rng.uniform(0.5, 1.5), 4),
+        "first_data_at": "2010-07-17T00:00:00Z",
+        "last_updated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "quotes": {currency: _quote(usd, QUOTE_RATES[currency])
+                   for currency in quotes},
+    }
+
+
+# ---------------- HANDLER ----------------
+_ITEM = re.compile(r"^/(users|posts|todos|comments)/(\d+)$")
+_NESTED = re.compile(r"^/posts/(\d+)/comments$")
+_TICKER = re.compile(r"^/v1/tickers/([\w.-]+)$")
+
+
+# Smaller bodies are sent as they are, like most CDNs do
+MIN_COMPRESS_SIZE = 256
+
+
+class Settings:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, padding=0,
+                 seed=0, compress=True, stall_rate=0.0, stall=1.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self.padding = padding
+        self.seed = seed
+        self.compress = compress
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = -1  # buffer headers + body into one write
+
+    server_version = "StandIn/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        settings = server.settings
+        parts = urlsplit(self.path)
+        if parts.path == "/__stats":
+            return self._send(200, server.stats(), internal=True)
+        server.count("requests")
+
+        delay = settings.latency + (random.uniform(0, settings.jitter)
+                                    if settings.jitter else 0)
+        if settings.stall_rate and random.random() < settings.stall_rate:
+            server.count("stalls")
+            delay += settings.stall
+        if delay:
+            time.sleep(delay)
+
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        if settings.error_rate and random.random() < settings.error_rate:
+            server.count("errors")
+            return self._send(503, {"error": "Service Unavailable"},
+                              {"Retry-After": "1"})
+
+        try:
+            status, payload = self._route(parts.path, query)
+        except (ValueError, KeyError) as e:
+            status, payload = 400, {"error": str(e)}
+        self._send(status, payload)
+
+    # ---- routing ----
+    def _route(self, path, query):
+        data = self.server.dataset
+        seed = self.server.settings.seed
+        rng = random.Random(f"{seed}:{path}")
+
+        if path == "/v1/forecast":
+            lats = query["latitude"].split(",")
+            lons = query["longitude"].split(",")
+            if len(lats) != len(lons):
+                raise ValueError("latitude and longitude lists differ in length")
+            # Seeded per location, so a city reads the same alone or batched
+            out = []
+            for lat, lon in zip(map(float, lats), map(float, lons)):
+                place = random.Random(f"{seed}:{path}:{lat:.4f},{lon:.4f}")
+                out.append(forecast(lat, lon, place))
+            return 200, out[0] if len(out) == 1 else out
+
+        match = _TICKER.match(path)
+        if match:
+            if match.group(1) not in COIN_IDS:
+                return 404, {"error": "id not found"}
+            quotes = query.get("quotes", "USD").upper().split(",")
+            for currency in quotes:
+                if currency not in QUOTE_RATES:
+                    raise ValueError(f"Unsupported quote {currency}")
+            return 200, ticker(match.group(1), rng, quotes)
+
+        match = _ITEM.match(path)
+        if match:
+            name, item_id = match.group(1), int(match.group(2))
+            for item in data[name]:
+                if item["id"] == item_id:
+                    return 200, item
+            return 404, {}
+
+        match = _NESTED.match(path)
+        if match:
+            query["postId"] = match.group(1)
+            path = "/comments"
+
+        name = path.strip("/")
+        if name not in data:
+            return 404, {"error": f"Unknown path {path}"}
+        return 200, _select(data[name], query)
+
+    def _send(self, status, payload, headers=None, internal=False):
+        """Send a JSON answer; internal ones are not padded, compressed or counted."""
+        settings = self.server.settings
+        if not internal and settings.padding and status == 200:
+            payload = _pad(payload, "x" * settings.padding)
+
+        body = json.dumps(payload).encode()
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+
+        encoding = None
+        if not internal and settings.compress and len(body) >= MIN_COMPRESS_SIZE:
+            encoding = _pick_encoding(self.headers.get("Accept-Encoding", ""))
+            if encoding == "gzip":
+                body = gzip.compress(body, compresslevel=6, mtime=0)
+            elif encoding == "deflate":
+                body = zlib.compress(body, 6)
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+        if not internal:
+            self.server.count("bytes", len(body))
+
+
+def _pick_encoding(accept_encoding):
+    """gzip or deflate if the client accepts it (q=0 excluded), else None."""
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        coding, _, weight = item.partition(";")
+        weight = weight.strip()
+        try:
+            q = float(weight[2:]) if weight.startswith("q=") else 1.0
+        except ValueError:
+            q = 0.0
+        if q > 0:
+            accepted.add(coding.strip())
+    for coding in ("gzip", "deflate"):
+        if coding in accepted or "*" in accepted:
+            return coding
+    return None
+
+
+def _select(items, query):
+    filters = {k: v for k, v in query.items() if not k.startswith("_")}
+    if filters:
+        items = [item for item in items
+                 if all(str(item.get(k)).lower() == v.lower()
+                        for k, v in filters.items())]
+
+    limit = int(query["_limit"]) if "_limit" in query else None
+    if "_start" in query:
+        start = int(query["_start"])
+    elif "_page" in query:
+        start = (int(query["_page"]) - 1) * (limit or 10)
+    else:
+        start = 0
+    end = None if limit is None else start + limit
+    return items[start:end]
+
+
+def _pad(payload, filler):
+    if isinstance(payload, list):
+        return [_pad(item, filler) for item in payload]
+    if isinstance(payload, dict) and payload:
+        return dict(payload, _padding=filler)
+    return payload
+
+
+# ---------------- SERVER ----------------
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, settings=None, certfile=None, keyfile=None):
+        super().__init__(address, StandInHandler)
+        self.settings = settings or Settings()
+        self.dataset = build_dataset(self.settings.seed)
+        self.scheme = "http"
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            # Handshakes happen in the handler threads, not in accept()
+            self.socket = context.wrap_socket(self.socket, server_side=True,
+                                              do_handshake_on_connect=False)
+            self.scheme = "https"
+        self._counters = {"requests": 0, "errors": 0, "stalls": 0, "bytes": 0}
+        self._counter_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"{self.scheme}://{host}:{port}"
+
+    def count(self, name, amount=1):
+        with self._counter_lock:
+            self._counters[name] += amount
+
+    def stats(self):
+        with self._counter_lock:
+            return dict(self._counters)
+
+
+def start(host="127.0.0.1", port=0, settings=None, certfile=None, keyfile=None):
+    """Start a server on a background thread and return it (see .url)."""
+    server = StandInServer((host, port), settings, certfile, keyfile)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the public APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="extra random delay, up to this many seconds")
+    parser.add_argument("--stall-rate", type=float, default=0.0,
+                        help="share of requests held for --stall seconds (0-1)")
+    parser.add_argument("--stall", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of requests answered with 503 (0-1)")
+    parser.add_argument("--padding", type=int, default=0,
+                        help="bytes of filler added to every object")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-compress", action="store_true",
+                        help="never compress response bodies")
+    parser.add_argument("--certfile", help="serve HTTPS with this certificate")
+    parser.add_argument("--keyfile")
+    args = parser.parse_args(argv)
+
+    settings = Settings(args.latency, args.jitter, args.error_rate,
+                        args.padding, args.seed, compress=not args.no_compress,
+                        stall_rate=args.stall_rate, stall=args.stall)
+    server = StandInServer((args.host, args.port), settings,
+                           args.certfile, args.keyfile)
+    print(f"Stand-in server on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
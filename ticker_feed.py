@@ -0,0 +1,329 @@
+"""
+Ticker Feed: Price Changes Pushed to Subscribers
+================================================
+
+Polls each watched coin once, however many views are watching it, and
+tells subscribers only what changed.
+
+- One poll per coin per interval (a refresher.Refresher entry per coin),
+  shared by every subscriber of that coin.
+- Each new snapshot is compared with the previous one. An identical
+  payload stops there: no record is built and nobody is called. Otherwise
+  the models.CoinTicker fields are diffed and an Update carrying only
+  the changed fields goes out.
+- Subscribers are callbacks (subscribe()) or async iterators (updates()).
+  A new subscriber first gets the current ticker in full (initial=True).
+
+    feed = ticker_feed.TickerFeed(
+        lambda coin: part5.fetch_crypto_price(coin, fields=part5.TICKER_FIELDS))
+    with feed.subscribe(["bitcoin", "ethereum"], print):
+        ...
+    async for update in feed.updates(["bitcoin"]):
+        print(update.changes)          # {"price": 64210.5, ...}
+
+Callbacks run on the feed's worker threads. Updates for one coin arrive in
+order; different coins may be delivered at the same time. An async
+iterator that falls behind gets its pending updates for a coin merged
+into one, so a slow consumer never builds up a backlog.
+"""
+
+import asyncio
+import logging
+import threading
+from dataclasses import fields
+
+import models
+import refresher
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 15
+DEFAULT_MAX_WORKERS = 4
+
+TICKER_FIELDS = tuple(f.name for f in fields(models.CoinTicker))
+
+
+# ---------------- UPDATES ----------------
+class Update:
+    __slots__ = ("coin", "ticker", "changes", "previous", "initial")
+
+    def __init__(self, coin, ticker, changes, previous, initial=False):
+        self.coin = coin
+        self.ticker = ticker        # the full models.CoinTicker now
+        self.changes = changes      # {field: new value}, changed fields only
+        self.previous = previous    # {field: old value} for the same fields
+        self.initial = initial
+
+    def merge(self, later):
+        """One update covering this one followed by `later`."""
+        changes = dict(self.changes)
+        changes.update(later.changes)
+        previous = dict(later.previous)
+        previous.update(self.previous)
+        # A field that went back to where it started did not change
+        for name in [n for n in changes if n in previous
+                     and previous[n] == changes[n]]:
+            del changes[name], previous[name]
+        return Update(later.coin, later.ticker, changes, previous,
+                      self.initial or later.initial)
+
+    def __repr__(self):
+        flag = ", initial" if self.initial else ""
+        return f"Update({self.coin!r}, {self.changes!r}{flag})"
+
+
+def diff(coin, old, new):
+    """The Update from ticker `old` (None at first) to ticker `new`."""
+    if old is None:
+        changes = {name: getattr(new, name) for name in TICKER_FIELDS}
+        return Update(coin, new, changes, {}, initial=True)
+
+    changes, previous = {}, {}
+    for name in TICKER_FIELDS:
+        before, after = getattr(old, name), getattr(new, name)
+        if before != after:
+            changes[name] = after
+            previous[name] = before
+    return Update(coin, new, changes, previous)
+
+
+# ---------------- SUBSCRIPTIONS ----------------
+class Subscription:
+    """Delivers updates for `coins` to a callback until closed."""
+
+    def __init__(self, feed, coins, callback):
+        self.feed = feed
+        self.coins = coins
+        self.callback = callback
+        self.closed = False
+
+    def deliver(self, update):
+        self.callback(update)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.feed._remove(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class UpdateStream(Subscription):
+    """An async iterator of updates, bound to the loop that created it."""
+
+    def __init__(self, feed, coins):
+        super().__init__(feed, coins, None)
+        self._loop = asyncio.get_running_loop()
+        self._pending = {}          # coin -> Update, oldest coin first
+        self._ready = asyncio.Event()
+
+    def deliver(self, update):
+        try:
+            self._loop.call_soon_threadsafe(self._add, update)
+        except RuntimeError:        # the loop is gone
+            self.close()
+
+    def _add(self, update):
+        earlier = self._pending.pop(update.coin, None)
+        if earlier is not None:
+            update = earlier.merge(update)
+            if not update.changes and not update.initial:
+                return
+        self._pending[update.coin] = update
+        self._ready.set()
+
+    def close(self):
+        super().close()
+        # Wake a reader waiting in __anext__ (from any thread)
+        if not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._ready.set)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._pending:
+            if self.closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        return self._pending.pop(next(iter(self._pending)))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+# ---------------- FEED ----------------
+class _Coin:
+    __slots__ = ("data", "ticker", "subscribers", "order")
+
+    def __init__(self):
+        self.data = None
+        self.ticker = None
+        self.subscribers = []
+        # Held from diffing to delivering, so one coin's updates (and a
+        # new subscriber's initial card) go out in order. Taken before
+        # the feed's lock, never after it.
+        self.order = threading.RLock()
+
+
+class TickerFeed:
+    def __init__(self, fetch, interval=DEFAULT_INTERVAL,
+                 max_workers=DEFAULT_MAX_WORKERS):
+        """fetch(coin) returns a coin's ticker payload (a decoded dict)."""
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.fetch = fetch
+        self.interval = interval
+        self._refresher = refresher.Refresher(max_workers=max_workers,
+                                              on_refresh=self._on_refresh)
+        self._coins = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+        self.polls = 0
+        self.unchanged = 0
+        self.changed = 0
+        self.invalid = 0
+        self.deliveries = 0
+
+    # ---- subscribing ----
+    def subscribe(self, coins, callback):
+        """Call callback(update) for changes to `coins`; returns a Subscription."""
+        return self._add(Subscription(self, _names(coins), callback))
+
+    def updates(self, coins):
+        """An async iterator (UpdateStream) of changes to `coins`."""
+        return self._add(UpdateStream(self, _names(coins)))
+
+    def _add(self, subscription):
+        for coin in subscription.coins:
+            while not self._add_coin(subscription, coin):
+                pass  # the coin was dropped meanwhile; watch it afresh
+
+        with self._lock:
+            if not self._started:
+                self._refresher.start()
+                self._started = True
+        return subscription
+
+    def _add_coin(self, subscription, coin):
+        with self._lock:
+            state = self._coins.get(coin)
+            if state is None:
+                state = self._coins[coin] = _Coin()
+                self._refresher.watch(
+                    coin, lambda: self.fetch(coin), self.interval)
+
+        # The initial card goes out before any later change to the coin
+        with state.order:
+            with self._lock:
+                if self._coins.get(coin) is not state:
+                    return False
+                state.subscribers.append(subscription)
+                ticker = state.ticker
+            if ticker is not None:
+                self._deliver(subscription, diff(coin, None, ticker))
+        return True
+
+    def _remove(self, subscription):
+        with self._lock:
+            for coin in subscription.coins:
+                state = self._coins.get(coin)
+                if state is None or subscription not in state.subscribers:
+                    continue
+                state.subscribers.remove(subscription)
+                if not state.subscribers:
+                    del self._coins[coin]
+                    self._refresher.unwatch(coin)
+
+    # ---- polling ----
+    def _on_refresh(self, coin, data):
+        with self._lock:
+            state = self._coins.get(coin)
+        if state is None:
+            return
+
+        with state.order:
+            with self._lock:
+                if self._coins.get(coin) is not state:
+                    return
+                self.polls += 1
+                if data == state.data:
+                    self.unchanged += 1
+                    return
+                try:
+                    ticker = models.CoinTicker.from_dict(data)
+                except models.ValidationError as e:
+                    self.invalid += 1
+                    logger.warning("Ignoring ticker for %s: %s", coin, e)
+                    return
+
+                update = diff(coin, state.ticker, ticker)
+                state.data, state.ticker = data, ticker
+                if not update.changes:
+                    self.unchanged += 1
+                    return
+                self.changed += 1
+                subscribers = list(state.subscribers)
+
+            for subscription in subscribers:
+                self._deliver(subscription, update)
+
+    def _deliver(self, subscription, update):
+        if subscription.closed:
+            return
+        try:
+            subscription.deliver(update)
+        except Exception:
+            logger.exception("Ticker subscriber failed on %s", update.coin)
+        else:
+            with self._lock:
+                self.deliveries += 1
+
+    # ---- reads ----
+    def latest(self, coin):
+        """The last models.CoinTicker seen for `coin`, or None."""
+        with self._lock:
+            state = self._coins.get(coin.lower().strip())
+            return None if state is None else state.ticker
+
+    def refresh(self, coin=None):
+        """Poll `coin` (default: every watched coin) now."""
+        for key in [coin.lower().strip()] if coin else self._refresher.keys():
+            self._refresher.refresh(key)
+
+    def stop(self):
+        self._refresher.stop()
+        with self._lock:
+            self._started = False
+
+    def stats(self):
+        failures = sum(entry["failures"]
+                       for entry in self._refresher.stats().values())
+        with self._lock:
+            return {
+                "coins": len(self._coins),
+                "subscribers": len({id(s) for state in self._coins.values()
+                                    for s in state.subscribers}),
+                "polls": self.polls,
+                "changed": self.changed,
+                "unchanged": self.unchanged,
+                "invalid": self.invalid,
+                "failures": failures,
+                "deliveries": self.deliveries,
+            }
+
+
+def _names(coins):
+    if isinstance(coins, str):
+        coins = [coins]
+    return tuple(dict.fromkeys(coin.lower().strip() for coin in coins))
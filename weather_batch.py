@@ -0,0 +1,223 @@
+"""
+Weather Batch: Multi-Location Open-Meteo Requests
+=================================================
+
+Open-Meteo's forecast endpoint accepts comma-separated latitude/longitude
+lists and answers with one JSON object per location, in request order.
+This module groups city lookups into such multi-location requests and
+splits the array back out, so each caller still receives the same dict a
+single-location request would return.
+
+- fetch_locations(): one request for up to MAX_LOCATIONS coordinates
+- fetch_many()     : any number of coordinates, chunked and sent concurrently
+- WeatherBatcher   : collects lookups from many threads and flushes them
+                     together when the batch is full or max_wait has passed
+"""
+
+import copy
+import threading
+from concurrent.futures import Future
+
+import api_client
+import fanout
+import json_decode
+import response_cache
+
+
+WEATHER_URL = "https://api.open-meteo.com/v1/forecast"
+MAX_LOCATIONS = 50
+
+# Times come back in GMT; nothing here shows them, and skipping
+# timezone=auto spares Open-Meteo a per-location timezone lookup
+DEFAULT_PARAMS = {
+    "current_weather": True,
+}
+
+
+# ---------------- SINGLE REQUEST ----------------
+def _join(values):
+    return ",".join(repr(float(v)) for v in values)
+
+
+def fetch_locations(coords, params=None, timeout=10):
+    """Fetch weather for a list of (lat, lon) pairs with one request."""
+    coords = list(coords)
+    if not coords:
+        return []
+    if len(coords) > MAX_LOCATIONS:
+        raise ValueError(f"At most {MAX_LOCATIONS} locations per request")
+
+    query = dict(DEFAULT_PARAMS if params is None else params)
+    query["latitude"] = _join(lat for lat, _ in coords)
+    query["longitude"] = _join(lon for _, lon in coords)
+
+    response = api_client.get(WEATHER_URL, params=query, timeout=timeout)
+    response.raise_for_status()
+    data = api_client.decode_body(response)
+
+    # A single location comes back as an object, several as an array
+    if isinstance(data, dict):
+        data = [data]
+
+    if len(data) != len(coords):
+        raise ValueError(
+            f"Expected {len(coords)} locations, got {len(data)}"
+        )
+    return data
+
+
+# ---------------- MANY REQUESTS ----------------
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def location_key(coord, params=None):
+    """Cache key of the equivalent single-location request."""
+    query = dict(DEFAULT_PARAMS if params is None else params)
+    query["latitude"], query["longitude"] = coord
+    return response_cache.make_key(WEATHER_URL, query)
+
+
+def fetch_many(coords, max_batch=MAX_LOCATIONS, params=None, timeout=10,
+               max_workers=fanout.DEFAULT_MAX_WORKERS, cache=None):
+    """
+    Fetch any number of (lat, lon) pairs in as few requests as possible.
+
+    Returns one {"success": ..., "data"/"error": ...} dict per coordinate,
+    in input order. Duplicate coordinates share a single slot upstream,
+    but each gets its own copy of the data.
+    With a cache, fresh single-location entries are served without a
+    request and every fetched location is stored under its own key.
+    """
+    coords = [tuple(c) for c in coords]
+    by_coords = {}
+    unique = []
+
+    for coord in dict.fromkeys(coords):
+        if cache is not None:
+            entry, fresh = cache.get(location_key(coord, params))
+            if fresh:
+                by_coords[coord] = {"success": True, "data": entry.value()}
+                continue
+        unique.append(coord)
+
+    chunks = list(_chunks(unique, min(max_batch, MAX_LOCATIONS)))
+
+    calls = [
+        lambda chunk=chunk: fetch_locations(chunk, params=params, timeout=timeout)
+        for chunk in chunks
+    ]
+    chunk_results = fanout.run_ordered(calls, max_workers=max_workers)
+
+    for chunk, result in zip(chunks, chunk_results):
+        for index, coord in enumerate(chunk):
+            if result["success"]:
+                location = result["data"][index]
+                by_coords[coord] = {"success": True, "data": location}
+                if cache is not None:
+                    body = json_decode.dumps(location)
+                    cache.store(location_key(coord, params), location,
+                                len(body), body=body)
+            else:
+                by_coords[coord] = {"success": False, "error": result["error"]}
+
+    results = []
+    seen = set()
+    for coord in coords:
+        result = dict(by_coords[coord])
+        if coord in seen and "data" in result:
+            result["data"] = copy.deepcopy(result["data"])
+        seen.add(coord)
+        results.append(result)
+    return results
+
+
+# ---------------- BATCHER ----------------
+class WeatherBatcher:
+    """
+    Coalesce concurrent single-city lookups into multi-location requests.
+
+    submit() returns a Future right away. Pending lookups are sent together
+    as soon as max_batch of them are queued, or max_wait seconds after the
+    first one arrived, whichever comes first. Either way the request runs
+    on its own thread, never on the submitting one.
+    """
+
+    def __init__(self, max_batch=MAX_LOCATIONS, max_wait=0.02, params=None,
+                 timeout=10):
+        if not 1 <= max_batch <= MAX_LOCATIONS:
+            raise ValueError(f"max_batch must be between 1 and {MAX_LOCATIONS}")
+
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.params = params
+        self.timeout = timeout
+        self.requests_sent = 0
+        self.lookups = 0
+
+        self._pending = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def submit(self, lat, lon):
+        future = Future()
+        batch = None
+
+        with self._lock:
+            self.lookups += 1
+            self._pending.append(((lat, lon), future))
+
+            if len(self._pending) >= self.max_batch:
+                batch = self._take()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.max_wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+        if batch:
+            # A full batch goes out at once, but not on the caller's thread
+            sender = threading.Thread(target=self._send, args=(batch,),
+                                      daemon=True)
+            sender.start()
+        return future
+
+    def fetch(self, lat, lon):
+        """Blocking lookup that still shares its request with other callers."""
+        return self.submit(lat, lon).result()
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+
+    def _take(self):
+        batch, self._pending = self._pending, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _send(self, batch):
+        waiters = {}
+        for coord, future in batch:
+            waiters.setdefault(coord, []).append(future)
+
+        with self._lock:
+            self.requests_sent += 1
+
+        try:
+            data = fetch_locations(list(waiters), params=self.params,
+                                   timeout=self.timeout)
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+
+        for location, futures in zip(data, waiters.values()):
+            # Repeats of a coordinate each get their own copy
+            futures[0].set_result(location)
+            for future in futures[1:]:
+                future.set_result(copy.deepcopy(location))
@@ -0,0 +1,203 @@
+"""
+Worker Pool: Decode and Render in Worker Processes
+==================================================
+
+At high request rates the JSON decoding, validation and card formatting
+keep one core busy, and the GIL stops threads from spreading that work.
+This module splits it: I/O stays in an asyncio front end (async_client),
+and a process pool does the CPU work.
+
+Response bodies never get pickled. The pool owns one shared memory block
+cut into fixed-size slots. Each body is copied into a free slot, and the
+worker is told only (task, offset, length). It reads the bytes from the
+shared block, runs the task and sends back the small result. A slot is
+handed out again only after its worker has finished. Bodies larger than
+a slot are sent to the worker the ordinary way.
+
+    async with worker_pool.WorkerPool(processes=4) as pool:
+        card = await pool.fetch(url, "weather_card", "delhi", params=...)
+
+Tasks are functions of (body, arg) listed in TASKS, run in the workers.
+render_weather_many() and render_crypto_many() cover the dashboard cards
+(part5 with API_DASHBOARD_PROCESSES=N); batch_cli --processes uses the
+"record" task.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import async_client
+import json_decode
+import models
+import part5_real_api as part5
+
+
+DEFAULT_SLOT_SIZE = 256 * 1024
+SLOTS_PER_PROCESS = 4
+
+
+# ---------------- TASKS (run in the workers) ----------------
+def _weather_card(body, city_name):
+    return part5.format_weather(city_name, models.CurrentWeather.from_json(body))
+
+
+def _crypto_card(body, coin_name):
+    return part5.format_crypto(models.CoinTicker.from_json(body))
+
+
+def _record(body, arg):
+    """
+    Decode (only `fields`, if given), check against a models record class
+    and return the data re-encoded as compact JSON. arg = (class name or
+    None, fields or None).
+    """
+    record, fields = arg
+    projection = json_decode.as_projection(fields)
+    data = projection.decode(body) if projection else json_decode.loads(body)
+    if record is not None:
+        cls = getattr(models, record)
+        if isinstance(data, list):
+            cls.many(data)
+        else:
+            cls.from_dict(data)
+    return json_decode.dumps(data)
+
+
+TASKS = {
+    "weather_card": _weather_card,
+    "crypto_card": _crypto_card,
+    "record": _record,
+}
+
+_arena = None
+
+
+def _attach(name):
+    global _arena
+    _arena = shared_memory.SharedMemory(name=name)
+
+
+def _run_slot(task, offset, length, arg):
+    return TASKS[task](_arena.buf[offset:offset + length].tobytes(), arg)
+
+
+def _run_bytes(task, body, arg):
+    return TASKS[task](body, arg)
+
+
+# ---------------- POOL ----------------
+class WorkerPool:
+    def __init__(self, processes=None, slot_size=DEFAULT_SLOT_SIZE, slots=None,
+                 mp_context=None):
+        self.processes = processes or os.cpu_count() or 1
+        self.slot_size = slot_size
+        self.slots = slots or self.processes * SLOTS_PER_PROCESS
+        self.mp_context = mp_context
+        self.shared = 0   # bodies passed through a slot
+        self.copied = 0   # bodies too big for a slot, pickled instead
+
+        self._executor = None
+        self._memory = None
+        self._free = None
+        self._loop = None
+
+    def start(self):
+        """Create the shared block and the processes (needs a running loop)."""
+        if self._executor is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._memory = shared_memory.SharedMemory(
+            create=True, size=self.slots * self.slot_size)
+        self._free = asyncio.Queue()
+        for slot in range(self.slots):
+            self._free.put_nowait(slot)
+        self._executor = ProcessPoolExecutor(
+            self.processes, mp_context=self.mp_context,
+            initializer=_attach, initargs=(self._memory.name,))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._memory is not None:
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    async def process(self, task, body, arg=None):
+        """Run TASKS[task](body, arg) in a worker and return its result."""
+        if task not in TASKS:
+            raise ValueError(f"Unknown task {task!r}")
+        self.start()
+
+        if len(body) > self.slot_size:
+            self.copied += 1
+            future = self._executor.submit(_run_bytes, task, body, arg)
+            return await asyncio.wrap_future(future)
+
+        slot = await self._free.get()
+        try:
+            offset = slot * self.slot_size
+            self._memory.buf[offset:offset + len(body)] = body
+            future = self._executor.submit(_run_slot, task, offset, len(body), arg)
+        except BaseException:
+            self._free.put_nowait(slot)
+            raise
+
+        # Free the slot when the worker is done with it, not when the
+        # caller stops waiting (it may be cancelled first)
+        future.add_done_callback(
+            lambda _: self._loop.call_soon_threadsafe(self._free.put_nowait, slot))
+        self.shared += 1
+        return await asyncio.wrap_future(future)
+
+    async def fetch(self, url, task, arg=None, params=None, timeout=10):
+        """GET `url` in the front end, then process the body in a worker."""
+        body = await async_client.get_bytes(url, params=params, timeout=timeout)
+        return await self.process(task, body, arg)
+
+    def stats(self):
+        return {"processes": self.processes, "slots": self.slots,
+                "slot_size": self.slot_size, "shared": self.shared,
+                "copied": self.copied}
+
+
+# ---------------- DASHBOARD CARDS ----------------
+async def _card(pool, url, task, item, params=None):
+    # Anything a worker raises (a bad payload, BrokenProcessPool) fails
+    # this card only, not the whole gather()
+    try:
+        data = await pool.fetch(url, task, item, params=params)
+    except Exception as e:
+        return {"success": False, "error": str(e) or type(e).__name__,
+                "item": item}
+    return {"success": True, "data": data, "item": item}
+
+
+async def render_weather_many(pool, cities):
+    """Weather cards (text) for many cities, as result dicts in input order."""
+    async def one(city):
+        try:
+            params = part5.weather_params(city)
+        except LookupError as e:
+            return {"success": False, "error": str(e), "item": city}
+        return await _card(pool, part5.WEATHER_URL, "weather_card", city, params)
+
+    return await asyncio.gather(*(one(city) for city in cities))
+
+
+async def render_crypto_many(pool, coins):
+    """Price cards (text) for many coins, as result dicts in input order."""
+    return await asyncio.gather(*(
+        _card(pool, part5.ticker_url(coin), "crypto_card", coin)
+        for coin in coins
+    ))